@@ -0,0 +1,191 @@
+# sriaas_clinic/api/bulk_print.py
+"""
+Bulk print for "Sales Invoice New" / "Patient Encounter New".
+
+- enqueue_bulk_print (whitelisted): takes a list of names or list filters, queues a job
+- run_bulk_print (background): pre-resolves shared print context once, then a pool of
+  worker processes renders batches of documents. For a merged PDF each worker renders
+  the batch's HTML (served from the render cache when possible) and converts it with a
+  single get_pdf call; the batch PDFs are merged in order. For a zip each document gets
+  its own (cached) PDF. The result is stored as a private File, with progress published
+  while it runs.
+"""
+import atexit
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+
+PRINT_FORMATS = {
+    "Sales Invoice": "Sales Invoice New",
+    "Patient Encounter": "Patient Encounter New",
+}
+OUTPUTS = ("pdf", "zip")
+MAX_DOCS = 1000
+MAX_WORKERS = 4
+BATCH_SIZE = 50  # documents per worker task (one wkhtmltopdf run for merged output)
+PAGE_BREAK = '<div style="page-break-after: always;"></div>'
+DONE_EVENT = "sr_bulk_print_done"
+
+@frappe.whitelist()
+def enqueue_bulk_print(doctype: str, names=None, filters=None, output: str = "pdf"):
+    """Queue a bulk print; pass either `names` (list) or `filters` (list/dict filters)."""
+    if doctype not in PRINT_FORMATS:
+        frappe.throw(_("Bulk print is only available for: {0}").format(", ".join(PRINT_FORMATS)))
+    if output not in OUTPUTS:
+        frappe.throw(_("Output must be one of: {0}").format(", ".join(OUTPUTS)))
+    frappe.has_permission(doctype, "print", throw=True)
+
+    names = _resolve_names(doctype, frappe.parse_json(names) if names else None,
+                           frappe.parse_json(filters) if filters else None)
+    if not names:
+        frappe.throw(_("No documents to print."))
+    if len(names) > MAX_DOCS:
+        frappe.throw(_("Too many documents ({0}). Bulk print is limited to {1} per job.").format(len(names), MAX_DOCS))
+
+    job = frappe.enqueue(
+        "sriaas_clinic.api.bulk_print.run_bulk_print",
+        queue="long",
+        timeout=60 * 60,
+        doctype=doctype,
+        names=names,
+        output=output,
+    )
+    return {"job_id": getattr(job, "id", None), "count": len(names)}
+
+def _resolve_names(doctype: str, names, filters) -> list[str]:
+    """Permission-aware list of names; keeps the caller's order when names are given."""
+    if names:
+        allowed = set(frappe.get_list(doctype, filters={"name": ["in", names]}, pluck="name", limit_page_length=0))
+        return [n for n in dict.fromkeys(names) if n in allowed]
+    return frappe.get_list(
+        doctype,
+        filters=filters or {},
+        pluck="name",
+        order_by="name asc",
+        limit_page_length=MAX_DOCS + 1,
+    )
+
+def run_bulk_print(doctype: str, names: list[str], output: str = "pdf"):
+    """Background job: render all documents in parallel and store a merged PDF / zip."""
+    print_format = PRINT_FORMATS[doctype]
+    user = frappe.session.user
+    total = len(names)
+
+    _prewarm_context(doctype, names)
+
+    workers = max(1, min(MAX_WORKERS, os.cpu_count() or 1, total))
+    size = max(1, min(BATCH_SIZE, -(-total // workers)))
+    batches = [names[i:i + size] for i in range(0, total, size)]
+    task = _render_pdfs if output == "zip" else _render_batch
+
+    results, failed, done = {}, [], 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(frappe.local.site, frappe.local.sites_path, user),
+    ) as pool:
+        futures = {pool.submit(task, doctype, batch, print_format): idx for idx, batch in enumerate(batches)}
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            try:
+                results[idx], errors = fut.result()
+            except Exception:
+                results[idx], errors = None, {n: frappe.get_traceback() for n in batches[idx]}
+            for name, tb in errors.items():
+                failed.append(name)
+                frappe.log_error(title=f"Bulk print failed: {doctype} {name}", message=tb)
+            done += len(batches[idx])
+            frappe.publish_progress(
+                done * 100 / total,
+                title=_("Bulk Print"),
+                description=_("{0} of {1} rendered").format(done, total),
+            )
+
+    if output == "zip":
+        ordered = [item for idx in range(len(batches)) for item in (results.get(idx) or [])]
+        content, ext, printed = _zip(ordered), "zip", len(ordered)
+    else:
+        ordered = [(idx, results[idx]) for idx in range(len(batches)) if results.get(idx)]
+        content, ext, printed = _merge(ordered), "pdf", total - len(failed)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": f"{frappe.scrub(print_format)}-{now_datetime().strftime('%Y%m%d-%H%M%S')}.{ext}",
+        "is_private": 1,
+        "content": content,
+    }).insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    result = {"file_url": file_doc.file_url, "printed": printed, "failed": failed}
+    frappe.publish_realtime(DONE_EVENT, result, user=user)
+    return result
+
+def _prewarm_context(doctype: str, names: list[str]):
+    """Resolve shared (per-company) print context once so workers read it from cache."""
+    if doctype != "Sales Invoice":
+        return  # only "Sales Invoice New" reads the company context
+    from .print_context import get_company_context
+
+    for company in frappe.get_all(doctype, filters={"name": ["in", names]}, distinct=True, pluck="company"):
+        get_company_context(company)
+
+# ---------------- worker process ----------------
+
+def _init_worker(site: str, sites_path: str, user: str):
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user(user)
+    atexit.register(frappe.destroy)  # close the DB connection when the pool shuts down
+
+def _render_batch(doctype: str, names: list[str], print_format: str):
+    """One PDF for the batch: per-document HTML (cached for submitted docs), one get_pdf call."""
+    from frappe.utils.pdf import get_pdf
+
+    from .print_cache import get_print_html
+
+    pages, errors = [], {}
+    for name in names:
+        try:
+            pages.append(get_print_html(doctype, name, print_format=print_format))
+        except Exception:
+            errors[name] = frappe.get_traceback()
+    return (get_pdf(PAGE_BREAK.join(pages)) if pages else None), errors
+
+def _render_pdfs(doctype: str, names: list[str], print_format: str):
+    """(name, pdf) per document for zip output; previously printed docs come from the render cache."""
+    from .print_cache import get_print_pdf
+
+    pdfs, errors = [], {}
+    for name in names:
+        try:
+            pdfs.append((name, get_print_pdf(doctype, name, print_format=print_format)))
+        except Exception:
+            errors[name] = frappe.get_traceback()
+    return pdfs, errors
+
+# ---------------- output ----------------
+
+def _merge(items) -> bytes:
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for _name, pdf in items:
+        for page in PdfReader(io.BytesIO(pdf)).pages:
+            writer.add_page(page)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+def _zip(items) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, pdf in items:
+            zf.writestr(f"{name.replace('/', '-')}.pdf", pdf)
+    return buf.getvalue()
@@ -0,0 +1,202 @@
+# sriaas_clinic/api/campaign_attribution.py
+"""
+Campaign -> revenue attribution (UTM / click id -> CRM Lead -> Patient -> Encounter -> Invoice).
+
+SR Campaign Attribution (setup/masters.py) holds one row per submitted Sales Invoice with
+the links resolved once:
+- lead: the latest CRM Lead created before the invoice whose phone (else email) match key
+  (api/dedupe.py) equals the patient's (else the customer's)
+- encounter: SI.source_encounter when set, else the patient's latest encounter up to the
+  posting date; plus the SI order source and encounter source
+- the lead's sr_utm_* / sr_gclid / sr_fbclid and the invoice's net / grand total
+on_sales_invoice_submit / _cancel keep it current, on_lead_update (refresh_leads for bulk
+merges) re-resolves a lead's invoices when its UTM / source data changes; rebuild_campaign_attribution() redoes
+everything with the same INSERT ... SELECT. get_campaign_revenue (whitelisted) serves
+revenue and ROAS per campaign (ad spend is passed in).
+"""
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, now
+
+DT = "SR Campaign Attribution"
+
+# group_by values -> SQL expression over the attribution table `a`
+GROUPS = {
+    "sr_utm_campaign": "a.sr_utm_campaign",
+    "sr_utm_campaign_id": "a.sr_utm_campaign_id",
+    "sr_utm_source": "a.sr_utm_source",
+    "sr_utm_medium": "a.sr_utm_medium",
+    "sr_lead_source": "a.sr_lead_source",
+    "sr_order_source": "a.sr_order_source",
+    "sr_encounter_source": "a.sr_encounter_source",
+    "click_id": "CASE WHEN IFNULL(a.sr_gclid, '') != '' THEN 'Google Ads'"
+                " WHEN IFNULL(a.sr_fbclid, '') != '' THEN 'Meta Ads' ELSE '' END",
+}
+LEAD_FIELDS = ("sr_utm_source", "sr_utm_medium", "sr_utm_campaign", "sr_utm_campaign_id", "sr_gclid", "sr_fbclid")
+
+def _enabled() -> bool:
+    return frappe.db.table_exists(DT)
+
+def _lead_subquery(key: str) -> str:
+    """Latest lead created before the invoice with the same match key as the patient / customer."""
+    return f"""(
+        SELECT l.name FROM `tabCRM Lead` l
+        WHERE l.{key} = COALESCE(p.{key}, c.{key}) AND l.creation <= si.creation
+        ORDER BY l.creation DESC LIMIT 1
+    )"""
+
+def _encounter_expr() -> str:
+    latest = """(
+        SELECT e.name FROM `tabPatient Encounter` e
+        WHERE e.patient = si.patient AND e.docstatus < 2 AND e.encounter_date <= si.posting_date
+        ORDER BY e.encounter_date DESC, e.creation DESC LIMIT 1
+    )"""
+    if frappe.db.has_column("Sales Invoice", "source_encounter"):
+        return f"COALESCE(NULLIF(si.source_encounter, ''), {latest})"
+    return latest
+
+def _refresh(invoices: list[str] | None = None):
+    """(Re)write attribution rows for `invoices` (all submitted invoices when None)."""
+    keyed = frappe.db.has_column("CRM Lead", "sr_phone_key") and frappe.db.has_column("Patient", "sr_phone_key")
+    lead_expr = (
+        f"COALESCE({_lead_subquery('sr_phone_key')}, {_lead_subquery('sr_email_key')})" if keyed else "NULL"
+    )
+    order_source = "IFNULL(si.sr_si_order_source, '')" if frappe.db.has_column("Sales Invoice", "sr_si_order_source") else "''"
+    lead_cols = ", ".join(f"IFNULL(ld.`{f}`, '')" for f in LEAD_FIELDS)
+
+    params = {"now": now(), "user": frappe.session.user}
+    scope = ""
+    if invoices is not None:
+        params["invoices"] = tuple(invoices)
+        scope = "AND si.name IN %(invoices)s"
+        frappe.db.sql(f"DELETE FROM `tab{DT}` WHERE sr_sales_invoice IN %(invoices)s", params)
+    else:
+        frappe.db.sql(f"DELETE FROM `tab{DT}`")
+
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{DT}` (
+            name, creation, modified, owner, modified_by, docstatus, idx,
+            sr_sales_invoice, sr_posting_date, sr_company, sr_patient, sr_customer,
+            sr_net_revenue, sr_grand_total,
+            sr_order_source, sr_encounter, sr_encounter_source, sr_lead, sr_lead_source,
+            {", ".join(LEAD_FIELDS)}
+        )
+        SELECT si.name, %(now)s, %(now)s, %(user)s, %(user)s, 0, 0,
+               si.name, si.posting_date, si.company, si.patient, si.customer,
+               si.base_net_total, si.base_grand_total,
+               {order_source}, enc.name, IFNULL(enc.sr_encounter_source, ''), ld.name, IFNULL(ld.source, ''),
+               {lead_cols}
+        FROM (
+            SELECT si.*, {lead_expr} AS lead_name, {_encounter_expr()} AS encounter_name
+            FROM `tabSales Invoice` si
+            LEFT JOIN `tabPatient` p ON p.name = si.patient
+            LEFT JOIN `tabCustomer` c ON c.name = si.customer
+            WHERE si.docstatus = 1 {scope}
+        ) si
+        LEFT JOIN `tabCRM Lead` ld ON ld.name = si.lead_name
+        LEFT JOIN `tabPatient Encounter` enc ON enc.name = si.encounter_name
+        """,
+        params,
+    )
+
+# ---------------- incremental ----------------
+
+def on_sales_invoice_submit(doc, method=None):
+    """Sales Invoice.on_submit."""
+    if _enabled():
+        _refresh([doc.name])
+
+def on_sales_invoice_cancel(doc, method=None):
+    """Sales Invoice.on_cancel."""
+    if _enabled():
+        frappe.db.delete(DT, {"sr_sales_invoice": doc.name})
+
+def on_lead_update(doc, method=None):
+    """CRM Lead.on_update: invoices attributed to the lead pick up its new UTM / source values."""
+    if doc.get_doc_before_save() is None or not any(doc.has_value_changed(f) for f in (*LEAD_FIELDS, "source")):
+        return
+    refresh_leads([doc.name])
+
+def refresh_leads(leads):
+    """Re-resolve every invoice attributed to one of `leads` (bulk lead merges in api/lead_ingest.py)."""
+    if not _enabled() or not leads:
+        return
+    invoices = frappe.get_all(DT, filters={"sr_lead": ["in", list(leads)]}, pluck="sr_sales_invoice")
+    if invoices:
+        _refresh(invoices)
+
+def rebuild_campaign_attribution():
+    """
+    Recompute every row (e.g. after lead UTM data was corrected or imported).
+      bench --site <site> execute sriaas_clinic.api.campaign_attribution.rebuild_campaign_attribution
+    """
+    if not _enabled():
+        return 0
+    _refresh()
+    frappe.db.commit()
+    return frappe.db.count(DT)
+
+# ---------------- report ----------------
+
+@frappe.whitelist()
+def get_campaign_revenue(
+    from_date: str,
+    to_date: str,
+    group_by: str = "sr_utm_campaign",
+    company: str | None = None,
+    spend=None,
+) -> dict:
+    """
+    Revenue per campaign bucket for invoices posted between from_date and to_date.
+    spend: optional {bucket: ad spend} (JSON) -> ROAS = net revenue / spend.
+    Returns {"group_by", "rows": [{"group", "invoices", "patients", "net_revenue",
+    "grand_total", "spend", "roas"}], "total_net_revenue", "attributed_net_revenue"};
+    group "" collects invoices without a lead / value.
+    """
+    frappe.has_permission(DT, "read", throw=True)
+    if group_by not in GROUPS:
+        frappe.throw(_("Cannot group by {0}").format(group_by))
+    spend = frappe.parse_json(spend) if isinstance(spend, str) else (spend or {})
+
+    conditions = ["a.sr_posting_date BETWEEN %(from)s AND %(to)s"]
+    params = {"from": getdate(from_date), "to": getdate(to_date)}
+    if company:
+        conditions.append("a.sr_company = %(company)s")
+        params["company"] = company
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT IFNULL({GROUPS[group_by]}, '') AS grp,
+               COUNT(*) AS invoices,
+               COUNT(DISTINCT a.sr_patient) AS patients,
+               SUM(a.sr_net_revenue) AS net_revenue,
+               SUM(a.sr_grand_total) AS grand_total,
+               SUM(IF(IFNULL(a.sr_lead, '') != '', a.sr_net_revenue, 0)) AS attributed
+        FROM `tab{DT}` a
+        WHERE {" AND ".join(conditions)}
+        GROUP BY grp
+        ORDER BY net_revenue DESC
+        """,
+        params,
+        as_dict=True,
+    )
+
+    out = []
+    for r in rows:
+        cost = flt(spend.get(r.grp)) if r.grp else 0
+        out.append({
+            "group": r.grp,
+            "invoices": r.invoices,
+            "patients": r.patients,
+            "net_revenue": flt(r.net_revenue),
+            "grand_total": flt(r.grand_total),
+            "spend": cost or None,
+            "roas": round(flt(r.net_revenue) / cost, 4) if cost else None,
+        })
+    return {
+        "group_by": group_by,
+        "rows": out,
+        "total_net_revenue": sum(flt(r.net_revenue) for r in rows),
+        "attributed_net_revenue": sum(flt(r.attributed) for r in rows),
+    }
@@ -0,0 +1,181 @@
+# sriaas_clinic/api/clinical_history.py
+"""
+Clinical history for the "Clinical History" modal (public/js/clinical_history_modal.js).
+
+- get_clinical_history (whitelisted): one page of a patient's encounters that have
+  clinical notes, oldest first. Note-less encounters are filtered in SQL, only the
+  columns the modal shows are returned, and paging is keyset based: pass back
+  `next_cursor` to get the following page.
+- download_clinical_history_pdf (whitelisted): the full history as a PDF, cached on disk
+  (see print_cache). The key is derived on every request from the patient's `modified`,
+  the encounters the user may read and their latest `modified`, so any edit,
+  cancellation, new or deleted encounter yields a new key (and users with different
+  permissions get separate files); superseded files age out of the LRU cache.
+Encounters are limited to those frappe.get_list returns for the user (User Permissions,
+permission query conditions).
+"""
+import hashlib
+
+import frappe
+from frappe.utils import cint, strip_html_tags
+
+from . import print_cache
+
+NOTE_FIELDS = ("sr_complaints", "sr_observations", "sr_investigations", "sr_notes")
+PATIENT_FIELDS = ("name", "patient_name", "sex", "mobile", "mobile_no", "sr_patient_id")
+DEFAULT_PAGE_LENGTH = 20
+MAX_PAGE_LENGTH = 100
+NULL_DATE = "0001-01-01"  # sort key for encounters without encounter_date
+PDF_TEMPLATE = "sriaas_clinic/templates/clinical_history.html"
+
+def _has_text_sql(field: str) -> str:
+    """SQL predicate: field has text once tags / &nbsp; are stripped (Text Editor fields hold HTML)."""
+    return f"TRIM(REGEXP_REPLACE(IFNULL(pe.`{field}`, ''), '<[^>]*>|&nbsp;', '')) != ''"
+
+NOTES_CONDITION = "(" + " OR ".join(_has_text_sql(f) for f in NOTE_FIELDS) + ")"
+
+def _clean(text) -> str:
+    return strip_html_tags(text or "").replace("&nbsp;", " ").strip()
+
+def _patient_header(patient: str) -> dict:
+    valid = set(frappe.get_meta("Patient").get_valid_columns())
+    fields = [f for f in PATIENT_FIELDS if f in valid]
+    return frappe.db.get_value("Patient", patient, fields, as_dict=True) or {"name": patient}
+
+def _encode_cursor(row) -> str:
+    return frappe.as_json([str(row.sort_date), str(row.creation), row.name], indent=None)
+
+def _decode_cursor(cursor):
+    vals = frappe.parse_json(cursor) if isinstance(cursor, str) else cursor
+    if not isinstance(vals, (list, tuple)) or len(vals) != 3:
+        frappe.throw(frappe._("Invalid cursor."))
+    return vals
+
+def _fetch(patient: str, allowed: list[str], cursor=None, limit: int | None = None) -> tuple[list, str | None]:
+    """(encounters, next_cursor) oldest first, among the `allowed` encounters; `limit=None` returns everything."""
+    if not allowed:
+        return [], None
+    conditions = ["pe.patient = %(patient)s", "pe.name IN %(allowed)s", "pe.docstatus < 2", NOTES_CONDITION]
+    params = {"patient": patient, "allowed": tuple(allowed), "null_date": NULL_DATE}
+    if cursor:
+        params["c_date"], params["c_creation"], params["c_name"] = _decode_cursor(cursor)
+        conditions.append(
+            "(IFNULL(pe.encounter_date, %(null_date)s), pe.creation, pe.name)"
+            " > (%(c_date)s, %(c_creation)s, %(c_name)s)"
+        )
+    limit_sql = ""
+    if limit:
+        params["limit"] = limit + 1
+        limit_sql = "LIMIT %(limit)s"
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT pe.name, pe.encounter_date, pe.practitioner, pe.practitioner_name, pe.creation,
+               IFNULL(pe.encounter_date, %(null_date)s) AS sort_date,
+               {", ".join(f"pe.`{f}`" for f in NOTE_FIELDS)}
+        FROM `tabPatient Encounter` pe
+        WHERE {" AND ".join(conditions)}
+        ORDER BY sort_date ASC, pe.creation ASC, pe.name ASC
+        {limit_sql}
+        """,
+        params,
+        as_dict=True,
+    )
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+
+    encounters = []
+    for r in rows:
+        enc = {
+            "name": r.name,
+            "encounter_date": r.encounter_date,
+            "practitioner_name": r.practitioner_name or r.practitioner,
+        }
+        for f in NOTE_FIELDS:
+            enc[f] = _clean(r.get(f))
+        encounters.append(enc)
+    return encounters, next_cursor
+
+def _check_access(patient: str) -> list[str]:
+    """
+    Names of the patient's encounters the user may read. frappe.get_list applies User
+    Permissions and permission query conditions, which the raw SQL above does not.
+    """
+    if not patient:
+        frappe.throw(frappe._("Patient is required."))
+    frappe.has_permission("Patient", "read", patient, throw=True)
+    frappe.has_permission("Patient Encounter", "read", throw=True)
+    return frappe.get_list(
+        "Patient Encounter",
+        filters={"patient": patient, "docstatus": ["<", 2]},
+        pluck="name",
+        order_by="name asc",
+        limit_page_length=0,
+    )
+
+@frappe.whitelist()
+def get_clinical_history(patient: str, cursor=None, page_length: int = DEFAULT_PAGE_LENGTH, with_patient: int = 0):
+    """
+    One page of encounters with notes for `patient`.
+    Returns {"encounters": [...], "next_cursor": str | None, "patient": {...} (first page only)}.
+    """
+    allowed = _check_access(patient)
+    page_length = min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+
+    encounters, next_cursor = _fetch(patient, allowed, cursor, page_length)
+    out = {"encounters": encounters, "next_cursor": next_cursor}
+    if cint(with_patient):
+        out["patient"] = _patient_header(patient)
+    return out
+
+# ---------------- PDF (cached) ----------------
+
+def _pdf_key(patient: str, allowed: list[str]) -> str:
+    """
+    Cache key from (patient, patient modified, the encounters the user may read, their latest
+    modified, language): users with different permissions never share a file.
+    """
+    latest, patient_modified = frappe.db.sql(
+        """
+        SELECT MAX(pe.modified), (SELECT modified FROM `tabPatient` WHERE name = %(patient)s)
+        FROM `tabPatient Encounter` pe
+        WHERE pe.patient = %(patient)s AND pe.name IN %(allowed)s
+        """,
+        {"patient": patient, "allowed": tuple(allowed) or ("",)},
+    )[0]
+    raw = "|".join(str(p) for p in (
+        "clinical_history", patient, patient_modified or "", latest or "", frappe.local.lang, *allowed,
+    ))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _render_pdf(patient: str, allowed: list[str]) -> bytes:
+    from frappe.utils.pdf import get_pdf
+
+    encounters, _cursor = _fetch(patient, allowed)
+    html = frappe.render_template(PDF_TEMPLATE, {
+        "patient": frappe._dict(_patient_header(patient)),
+        "encounters": [frappe._dict(e) for e in encounters],
+    })
+    return get_pdf(html)
+
+def get_clinical_history_pdf(patient: str) -> bytes:
+    """PDF bytes; reprints come from the disk cache until the history changes."""
+    allowed = _check_access(patient)
+
+    key = _pdf_key(patient, allowed)
+    pdf = print_cache.get(key, "pdf")
+    if pdf is None:
+        pdf = _render_pdf(patient, allowed)
+        print_cache.put(key, "pdf", pdf)
+    return pdf
+
+@frappe.whitelist()
+def download_clinical_history_pdf(patient: str):
+    """Stream the clinical history PDF (opened in a new tab by the modal's Print button)."""
+    frappe.local.response.filename = f"clinical-history-{patient.replace('/', '-')}.pdf"
+    frappe.local.response.filecontent = get_clinical_history_pdf(patient)
+    frappe.local.response.type = "pdf"
+    frappe.local.response.display_content_as = "inline"
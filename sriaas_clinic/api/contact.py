@@ -1,6 +1,8 @@
 # sriaas_clinic/api/contact.py
 import frappe
 
+from sriaas_clinic.api.dedupe import set_match_keys
+
 def _clean_spaces(s: str) -> str:
     # remove all whitespace (space, tab, newline)
     return ''.join(s.split()) if isinstance(s, str) else s
@@ -37,3 +39,6 @@ def normalize_phoneish_fields(doc, method=None):
                 c = _clean_spaces(row.whatsapp)
                 if c != getattr(row, "whatsapp"):
                     row.whatsapp = c
+
+    # duplicate-match keys (api/dedupe.py)
+    set_match_keys(doc)
@@ -1,24 +1,30 @@
 # sriaas_clinic/api/crm_lead.py
 import frappe
 
+from sriaas_clinic.api.dedupe import set_match_keys
+
 def _clean_spaces(s: str) -> str:
     return ''.join(s.split()) if isinstance(s, str) else s
 
+# Phone-like fields on CRM Lead (also used by api/lead_ingest.py)
+PHONE_FIELDS = (
+    "mobile", "mobile_no",
+    "phone", "phone_no",
+    "whatsapp_no",
+    "alternate_phone",
+    "sr_mobile_no", "sr_whatsapp_no",
+)
+
 def normalize_phoneish_fields(doc, method=None):
     """
     Strip whitespace from phone-like fields on CRM Lead.
     Runs on CRM Lead.before_save. Idempotent.
     """
-    CANDIDATE_FIELDS = (
-        "mobile", "mobile_no",
-        "phone", "phone_no",
-        "whatsapp_no",
-        "alternate_phone",
-        "sr_mobile_no", "sr_whatsapp_no",
-    )
-
-    for field in CANDIDATE_FIELDS:
+    for field in PHONE_FIELDS:
         val = doc.get(field)
         cleaned = _clean_spaces(val)
         if cleaned != val:
             doc.set(field, cleaned)
+
+    # duplicate-match keys (api/dedupe.py)
+    set_match_keys(doc)
@@ -1,6 +1,8 @@
 # sriaas_clinic/api/customer.py
 import frappe
 
+from sriaas_clinic.api.dedupe import set_match_keys
+
 PREFIX = "CUST-"
 
 # ----------------------------
@@ -47,3 +49,6 @@ def normalize_phoneish_fields(doc, method=None):
         cleaned = _clean_spaces(val)
         if cleaned != val:
             doc.set(field, cleaned)  # before_save: no extra DB write
+
+    # duplicate-match keys (api/dedupe.py)
+    set_match_keys(doc)
@@ -0,0 +1,106 @@
+# sriaas_clinic/api/dedupe.py
+"""
+Normalized, indexed match keys for finding duplicate people by phone / email.
+
+- sr_phone_key: last 10 digits of the first usable phone field (>= MIN_PHONE_DIGITS digits)
+- sr_email_key: lower-cased, trimmed email
+Both are kept on CRM Lead, Patient, Customer and Contact (setup/match_keys.py creates and
+backfills them; the before_save normalizers call set_match_keys) and carry a search index.
+find_matches() resolves any number of keys against all four doctypes in one query.
+"""
+import re
+
+import frappe
+
+MIN_PHONE_DIGITS = 7
+PHONE_KEY_LEN = 10
+
+# doctype -> (phone fields in priority order, email fields)
+KEY_SOURCES = {
+    "CRM Lead": (("mobile_no", "phone"), ("email",)),
+    "Patient": (("mobile", "phone"), ("email",)),
+    "Customer": (("mobile_no",), ("email_id",)),
+    "Contact": (("mobile_no", "phone"), ("email_id",)),
+}
+
+def phone_key(value) -> str | None:
+    digits = re.sub(r"[^0-9]", "", str(value or ""))  # ASCII digits only, like the SQL below
+    return digits[-PHONE_KEY_LEN:] if len(digits) >= MIN_PHONE_DIGITS else None
+
+def email_key(value) -> str | None:
+    return (value or "").strip().lower() or None
+
+def keys_for(doctype: str, values) -> tuple[str | None, str | None]:
+    """(phone key, email key) for a doc or dict of `doctype`."""
+    phone_fields, email_fields = KEY_SOURCES[doctype]
+    pk = next((k for k in (phone_key(values.get(f)) for f in phone_fields) if k), None)
+    ek = next((k for k in (email_key(values.get(f)) for f in email_fields) if k), None)
+    return pk, ek
+
+def set_match_keys(doc):
+    """Called from the doctype's before_save normalizer (after phone cleanup)."""
+    doc.sr_phone_key, doc.sr_email_key = keys_for(doc.doctype, doc)
+
+# ---------------- SQL (backfill) ----------------
+
+def _sql_phone(field: str) -> str:
+    digits = f"REGEXP_REPLACE(IFNULL(`{field}`, ''), '[^0-9]', '')"
+    return f"CASE WHEN CHAR_LENGTH({digits}) >= {MIN_PHONE_DIGITS} THEN RIGHT({digits}, {PHONE_KEY_LEN}) END"
+
+def _sql_email(field: str) -> str:
+    # str.strip() also drops tabs / newlines, TRIM() only spaces
+    trimmed = f"REGEXP_REPLACE(IFNULL(`{field}`, ''), '^[[:space:]]+|[[:space:]]+$', '')"
+    return f"NULLIF(LOWER({trimmed}), '')"
+
+def key_expressions(doctype: str) -> tuple[str, str]:
+    """SQL expressions equal to keys_for() over the doctype's existing columns."""
+    phone_fields, email_fields = KEY_SOURCES[doctype]
+    phones = [_sql_phone(f) for f in phone_fields if frappe.db.has_column(doctype, f)]
+    emails = [_sql_email(f) for f in email_fields if frappe.db.has_column(doctype, f)]
+    phone_sql = f"COALESCE({', '.join(phones)}, NULL)" if phones else "NULL"
+    email_sql = f"COALESCE({', '.join(emails)}, NULL)" if emails else "NULL"
+    return phone_sql, email_sql
+
+def backfill_keys(doctype: str, names=None) -> int:
+    """Set-based (re)compute of both keys (of `names` only, if given); only rows whose keys differ are written."""
+    if not (frappe.db.has_column(doctype, "sr_phone_key") and frappe.db.has_column(doctype, "sr_email_key")):
+        return 0
+    phone_sql, email_sql = key_expressions(doctype)
+    scope = "AND name IN %(names)s" if names is not None else ""
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{doctype}`
+        SET sr_phone_key = {phone_sql}, sr_email_key = {email_sql}
+        WHERE (NOT (sr_phone_key <=> {phone_sql}) OR NOT (sr_email_key <=> {email_sql})) {scope}
+        """,
+        {"names": tuple(names or ("",))},
+    )
+    return frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+
+# ---------------- lookup ----------------
+
+def find_matches(phone_keys, email_keys, doctypes=None) -> list[dict]:
+    """
+    Every row of `doctypes` (default: all KEY_SOURCES) whose phone or email key is in the
+    given sets, oldest first: [{"doctype", "name", "phone_key", "email_key"}].
+    One query regardless of how many keys are passed.
+    """
+    phone_keys = tuple({k for k in phone_keys if k}) or ("",)
+    email_keys = tuple({k for k in email_keys if k}) or ("",)
+    parts = []
+    for dt in doctypes or KEY_SOURCES:
+        if not frappe.db.has_column(dt, "sr_phone_key"):
+            continue
+        for col, param in (("sr_phone_key", "phones"), ("sr_email_key", "emails")):
+            parts.append(
+                f"SELECT '{dt}' AS doctype, name, sr_phone_key AS phone_key, sr_email_key AS email_key, creation"
+                f" FROM `tab{dt}` WHERE {col} IN %({param})s"
+            )
+    if not parts:
+        return []
+    rows = frappe.db.sql(
+        " UNION ".join(parts) + " ORDER BY creation ASC",
+        {"phones": phone_keys, "emails": email_keys},
+        as_dict=True,
+    )
+    return rows
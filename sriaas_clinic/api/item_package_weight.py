@@ -1,7 +1,10 @@
 # sriaas_clinic/api/item_package_weight.py
 import frappe
 
+from .sales_invoice_weight import invalidate_item_weights, sync_invoices_for_items
+
 DIVISOR = 5000.0  # per your formula: (L*W*H)/5000 with L/W/H in cm
+BATCH_SIZE = 500  # rows per UPDATE in bulk recalculation
 
 def _f(v):
     """Safe float cast (handles None / '1,234.5' in imports)."""
@@ -14,6 +17,17 @@ def _f(v):
     except Exception:
         return 0.0
 
+def _compute(L, W, H, dead):
+    """Return (vol_weight, applied_weight) rounded to field precision (3 dp)."""
+    L, W, H, dead = _f(L), _f(W), _f(H), _f(dead)
+
+    vol = 0.0
+    if L and W and H:
+        vol = (L * W * H) / DIVISOR
+
+    applied = max(dead, vol)
+    return round(vol, 3), round(applied, 3)
+
 def calculate_pkg_weights(doc, method=None):
     """
     Fills:
@@ -25,17 +39,74 @@ def calculate_pkg_weights(doc, method=None):
       - length/width/height in cm
       - weights in kg
     """
-    L = _f(doc.get("sr_pkg_length"))
-    W = _f(doc.get("sr_pkg_width"))
-    H = _f(doc.get("sr_pkg_height"))
-    dead = _f(doc.get("sr_pkg_dead_weight"))
+    doc.sr_pkg_vol_weight, doc.sr_pkg_applied_weight = _compute(
+        doc.get("sr_pkg_length"),
+        doc.get("sr_pkg_width"),
+        doc.get("sr_pkg_height"),
+        doc.get("sr_pkg_dead_weight"),
+    )
 
-    vol = 0.0
-    if L and W and H:
-        vol = (L * W * H) / DIVISOR
+def recalculate_all_pkg_weights(batch_size: int = BATCH_SIZE, dry_run: bool = False) -> dict:
+    """
+    Bulk recompute volumetric/applied weight for every Item without re-saving them.
 
-    applied = max(dead, vol)
+    - one SELECT for all Items (dimensions + current weights)
+    - weights computed for all rows in a single pass
+    - only rows whose stored values differ are written, `batch_size` rows per UPDATE
+    - cached item weights and open Sales Invoice weight rollups are refreshed for changed Items
+
+    Use after a catalog-wide dimension import or a change to DIVISOR:
+      bench --site <site> execute sriaas_clinic.api.item_package_weight.recalculate_all_pkg_weights
+    """
+    rows = frappe.db.sql(
+        """
+        SELECT name, sr_pkg_length, sr_pkg_width, sr_pkg_height, sr_pkg_dead_weight,
+               sr_pkg_vol_weight, sr_pkg_applied_weight
+        FROM `tabItem`
+        """,
+        as_dict=True,
+    )
+
+    computed = [
+        (r.name, *_compute(r.sr_pkg_length, r.sr_pkg_width, r.sr_pkg_height, r.sr_pkg_dead_weight))
+        for r in rows
+    ]
+    changed = [
+        (name, vol, applied)
+        for r, (name, vol, applied) in zip(rows, computed, strict=True)
+        if round(_f(r.sr_pkg_vol_weight), 3) != vol or round(_f(r.sr_pkg_applied_weight), 3) != applied
+    ]
+
+    if not dry_run:
+        for i in range(0, len(changed), batch_size):
+            batch = changed[i:i + batch_size]
+            _write_batch(batch)
+            names = [name for name, _vol, _applied in batch]
+            invalidate_item_weights(names)
+            sync_invoices_for_items(names)
+        frappe.db.commit()
+
+    return {"scanned": len(rows), "changed": len(changed), "dry_run": bool(dry_run)}
+
+def _write_batch(batch):
+    """Single UPDATE ... CASE for a batch of (name, vol, applied) rows."""
+    vol_case = " ".join(["WHEN %s THEN %s"] * len(batch))
+    applied_case = " ".join(["WHEN %s THEN %s"] * len(batch))
+    in_clause = ", ".join(["%s"] * len(batch))
+
+    params = []
+    for name, vol, _applied in batch:
+        params += [name, vol]
+    for name, _vol, applied in batch:
+        params += [name, applied]
+    params += [name for name, _vol, _applied in batch]
 
-    # round per your field precision (3 dp for weights)
-    doc.sr_pkg_vol_weight = round(vol, 3)
-    doc.sr_pkg_applied_weight = round(applied, 3)
+    frappe.db.sql(
+        f"""
+        UPDATE `tabItem`
+        SET sr_pkg_vol_weight = CASE name {vol_case} END,
+            sr_pkg_applied_weight = CASE name {applied_case} END
+        WHERE name IN ({in_clause})
+        """,
+        tuple(params),
+    )
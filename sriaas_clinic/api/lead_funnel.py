@@ -0,0 +1,247 @@
+# sriaas_clinic/api/lead_funnel.py
+"""
+Lead funnel analytics from CRM Lead's status_change_log.
+
+SR Lead Funnel (setup/masters.py) holds one row per status interval of a lead: the
+status, the status it moved to, when it entered/left and the dwell time, plus the
+lead's dimensions (pipeline, disposition, source, UTM campaign, created on).
+- on_lead_update (CRM Lead.on_update): rewrites the lead's rows only when its status
+  log or a dimension changed, from the in-memory document (no log query)
+- refresh_leads(leads): the same rewrite set-based for many leads (bulk lead ingest)
+- rebuild_lead_funnel(): set-based full rebuild (INSERT ... SELECT over all logs)
+- get_lead_funnel (whitelisted): per-stage reach, conversion to a later stage (by CRM
+  Lead Status position) and median dwell time for leads created in a date range
+"""
+import frappe
+from frappe import _
+from frappe.utils import add_days, get_datetime, getdate, now, time_diff_in_seconds
+
+DT = "SR Lead Funnel"
+LEAD_DT = "CRM Lead"
+LOG_DT = "CRM Status Change Log"
+
+# SR Lead Funnel column -> CRM Lead field
+DIMENSIONS = {
+    "sr_lead_pipeline": "sr_lead_pipeline",
+    "sr_lead_disposition": "sr_lead_disposition",
+    "sr_source": "source",
+    "sr_utm_campaign": "sr_utm_campaign",
+}
+FACT_FIELDS = [
+    "name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+    "sr_lead", "sr_status", "sr_next_status", "sr_seq", "sr_is_current",
+    "sr_entered_on", "sr_exited_on", "sr_dwell_seconds",
+    "sr_lead_created", *DIMENSIONS,
+]
+
+def _enabled() -> bool:
+    return frappe.db.table_exists(DT)
+
+# ---------------- incremental ----------------
+
+def _facts(doc) -> list[tuple]:
+    """Fact rows for one lead; names follow the log rows so rebuilds give the same names."""
+    ts, user = now(), frappe.session.user
+    dims = [doc.get(f) or "" for f in DIMENSIONS.values()]
+    log = sorted(doc.get("status_change_log") or [], key=lambda r: r.idx)
+    if not log:
+        return [(f"LF-{doc.name}", ts, ts, user, user, 0, 0,
+                 doc.name, doc.get("status") or "", "", 0, 1,
+                 doc.creation, None, None, doc.creation, *dims)]
+
+    rows = []
+    for seq, r in enumerate(log):
+        current = not r.get("to")
+        dwell = r.get("duration")
+        if dwell is None and r.get("from_date") and r.get("to_date"):
+            dwell = time_diff_in_seconds(r.to_date, r.from_date)
+        rows.append((r.name, ts, ts, user, user, 0, seq,
+                     doc.name, r.get("from") or "", r.get("to") or "", seq, int(current),
+                     r.get("from_date"), None if current else r.get("to_date"),
+                     None if current else int(dwell or 0), doc.creation, *dims))
+    return rows
+
+def _write_lead(doc):
+    frappe.db.delete(DT, {"sr_lead": doc.name})
+    frappe.db.bulk_insert(DT, FACT_FIELDS, _facts(doc))
+
+def on_lead_update(doc, method=None):
+    """CRM Lead.on_update: only leads whose status log or a dimension changed are rewritten."""
+    if not _enabled():
+        return
+    before = doc.get_doc_before_save()
+    if before is not None:
+        changed = doc.has_value_changed("status") or len(before.get("status_change_log") or []) != len(doc.get("status_change_log") or [])
+        dims_changed = any(doc.has_value_changed(f) for f in DIMENSIONS.values())
+        if not changed and not dims_changed:
+            return
+        if not changed:
+            frappe.db.sql(
+                f"""UPDATE `tab{DT}` SET {", ".join(f"{col} = %({col})s" for col in DIMENSIONS)}
+                    WHERE sr_lead = %(lead)s""",
+                {"lead": doc.name, **{col: doc.get(f) or "" for col, f in DIMENSIONS.items()}},
+            )
+            return
+    _write_lead(doc)
+
+def on_lead_trash(doc, method=None):
+    """CRM Lead.on_trash."""
+    if _enabled():
+        frappe.db.delete(DT, {"sr_lead": doc.name})
+
+# ---------------- set-based ----------------
+
+def _insert_facts(scope: str = "", params: dict | None = None):
+    """INSERT ... SELECT the fact rows of every lead `l` matching `scope` (AND ...)."""
+    dims_select = ", ".join(f"IFNULL(l.`{f}`, '')" for f in DIMENSIONS.values())
+    cols = ", ".join(f"`{c}`" for c in FACT_FIELDS)
+    params = {**(params or {}), "now": now(), "user": frappe.session.user, "lead_dt": LEAD_DT}
+    seconds = "TIMESTAMPDIFF(SECOND, s.from_date, s.to_date)"
+    if frappe.db.has_column(LOG_DT, "duration"):
+        seconds = f"IFNULL(s.duration, {seconds})"
+
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{DT}` ({cols})
+        SELECT s.name, %(now)s, %(now)s, %(user)s, %(user)s, 0, s.idx - 1,
+               l.name, IFNULL(s.`from`, ''), IFNULL(s.`to`, ''), s.idx - 1,
+               IF(IFNULL(s.`to`, '') = '', 1, 0),
+               s.from_date,
+               IF(IFNULL(s.`to`, '') = '', NULL, s.to_date),
+               IF(IFNULL(s.`to`, '') = '', NULL, {seconds}),
+               l.creation, {dims_select}
+        FROM `tab{LOG_DT}` s
+        JOIN `tab{LEAD_DT}` l ON l.name = s.parent
+        WHERE s.parenttype = %(lead_dt)s AND s.parentfield = 'status_change_log' {scope}
+        """,
+        params,
+    )
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{DT}` ({cols})
+        SELECT CONCAT('LF-', l.name), %(now)s, %(now)s, %(user)s, %(user)s, 0, 0,
+               l.name, IFNULL(l.status, ''), '', 0, 1,
+               l.creation, NULL, NULL, l.creation, {dims_select}
+        FROM `tab{LEAD_DT}` l
+        WHERE NOT EXISTS (
+            SELECT 1 FROM `tab{LOG_DT}` s
+            WHERE s.parent = l.name AND s.parenttype = %(lead_dt)s AND s.parentfield = 'status_change_log'
+        ) {scope}
+        """,
+        params,
+    )
+
+def refresh_leads(leads):
+    """Rewrite the rows of `leads` with two INSERT ... SELECT statements."""
+    leads = tuple({n for n in (leads or []) if n})
+    if not _enabled() or not leads:
+        return
+    frappe.db.sql(f"DELETE FROM `tab{DT}` WHERE sr_lead IN %(leads)s", {"leads": leads})
+    _insert_facts("AND l.name IN %(leads)s", {"leads": leads})
+
+def rebuild_lead_funnel():
+    """
+    Recompute SR Lead Funnel for every lead with two INSERT ... SELECT statements.
+      bench --site <site> execute sriaas_clinic.api.lead_funnel.rebuild_lead_funnel
+    """
+    if not _enabled():
+        return 0
+    frappe.db.sql(f"DELETE FROM `tab{DT}`")
+    _insert_facts()
+    frappe.db.commit()
+    return frappe.db.count(DT)
+
+# ---------------- report ----------------
+
+def _stage_order() -> list[str]:
+    """CRM Lead Status by position when available."""
+    if frappe.db.table_exists("CRM Lead Status") and frappe.db.has_column("CRM Lead Status", "position"):
+        return frappe.get_all("CRM Lead Status", order_by="position asc", pluck="name")
+    return []
+
+@frappe.whitelist()
+def get_lead_funnel(
+    from_date: str,
+    to_date: str,
+    pipeline: str | None = None,
+    disposition: str | None = None,
+    source: str | None = None,
+    utm_campaign: str | None = None,
+    group_by: str | None = None,
+) -> dict:
+    """
+    Funnel for leads created between from_date and to_date (inclusive).
+    Returns {"leads", "stages": [{"status", "reached", "advanced", "conversion",
+    "share_of_leads", "median_dwell_seconds", ["group"]}]}; group_by is one of
+    DIMENSIONS to split every stage by that dimension. "advanced" counts leads that moved
+    from the stage to a later one in CRM Lead Status position order (moves back or
+    sideways don't count); without a position order any move counts.
+    """
+    frappe.has_permission(DT, "read", throw=True)
+    if group_by and group_by not in DIMENSIONS:
+        frappe.throw(_("Cannot group by {0}").format(group_by))
+
+    conditions = ["f.sr_lead_created >= %(from)s", "f.sr_lead_created < %(to)s"]
+    params = {"from": get_datetime(getdate(from_date)), "to": get_datetime(add_days(getdate(to_date), 1))}
+    for col, val in (("sr_lead_pipeline", pipeline), ("sr_lead_disposition", disposition),
+                     ("sr_source", source), ("sr_utm_campaign", utm_campaign)):
+        if val:
+            conditions.append(f"f.{col} = %({col})s")
+            params[col] = val
+    where = " AND ".join(conditions)
+    group_col = f"f.{group_by}" if group_by else "''"
+
+    stage_order = _stage_order()
+    if stage_order:
+        placeholders = ", ".join(f"%(stage_{i})s" for i in range(len(stage_order)))
+        params.update({f"stage_{i}": s for i, s in enumerate(stage_order)})
+        moved = f"FIELD(f.sr_next_status, {placeholders}) > FIELD(f.sr_status, {placeholders})"
+    else:
+        moved = "f.sr_next_status != ''"
+
+    leads = frappe.db.sql(f"SELECT COUNT(DISTINCT f.sr_lead) FROM `tab{DT}` f WHERE {where}", params)[0][0]
+
+    counts = frappe.db.sql(
+        f"""
+        SELECT {group_col} AS grp, f.sr_status AS status,
+               COUNT(DISTINCT f.sr_lead) AS reached,
+               COUNT(DISTINCT IF({moved}, f.sr_lead, NULL)) AS advanced,
+               AVG(f.sr_seq) AS avg_seq
+        FROM `tab{DT}` f
+        WHERE {where}
+        GROUP BY grp, f.sr_status
+        """,
+        params,
+        as_dict=True,
+    )
+    medians = {
+        (r.grp, r.status): r.median_dwell
+        for r in frappe.db.sql(
+            f"""
+            SELECT DISTINCT {group_col} AS grp, f.sr_status AS status,
+                   MEDIAN(f.sr_dwell_seconds) OVER (PARTITION BY {group_col}, f.sr_status) AS median_dwell
+            FROM `tab{DT}` f
+            WHERE {where} AND f.sr_is_current = 0
+            """,
+            params,
+            as_dict=True,
+        )
+    }
+
+    order = {s: i for i, s in enumerate(stage_order)}
+    counts.sort(key=lambda r: (r.grp or "", order.get(r.status, len(order)), r.avg_seq or 0))
+
+    stages = []
+    for r in counts:
+        row = {
+            "status": r.status,
+            "reached": r.reached,
+            "advanced": r.advanced,
+            "conversion": round(r.advanced / r.reached, 4) if r.reached else 0,
+            "share_of_leads": round(r.reached / leads, 4) if leads else 0,
+            "median_dwell_seconds": medians.get((r.grp, r.status)),
+        }
+        if group_by:
+            row["group"] = r.grp
+        stages.append(row)
+    return {"leads": leads, "stages": stages}
@@ -0,0 +1,412 @@
+# sriaas_clinic/api/lead_ingest.py
+"""
+Batch web-to-lead ingestion for CRM Lead (landing pages / ad forms).
+
+ingest_leads (whitelisted) takes a list of lead dicts with the tracking fields from
+setup/crm_lead.py (sr_utm_*, sr_gclid, sr_fbclid, sr_ip_address, sr_landing_page, ...):
+- every row is cleaned and validated up front (field allowlist, phone whitespace, email,
+  Lead Source) with one query for the whole batch
+- mode="sync": valid rows are handled in chunks, one commit per chunk. New leads are
+  built in memory through the hooks insert() runs first (before_insert, validate,
+  before_save), named from one naming series read per chunk and written with one
+  bulk_insert per table; a row that fails validation is reported and skipped. No
+  after_insert / on_update hooks run for them: their funnel rows (api/lead_funnel.py)
+  are written set-based per chunk
+- mode="queue": valid rows are handed to a background job; when too many rows are
+  already waiting the call is refused with HTTP 429 so the sender can back off
+- dedupe: every lead's phone / email match key (api/dedupe.py) is looked up against CRM
+  Lead, Patient, Customer and Contact in one query for the whole batch, then
+    "attach" inserts it with sr_duplicate_of / sr_matched_patient set,
+    "merge"  fills the blank fields of the existing lead instead of inserting (collected
+             per chunk and written with one UPDATE, then match keys / funnel /
+             attribution of the merged leads are refreshed set-based),
+    "skip"   reports it as a duplicate, "off" does no lookup
+Both return one result per input row, in input order.
+"""
+from functools import partial
+
+import frappe
+from frappe import _
+from frappe.model.naming import NamingSeries, get_default_naming_series
+from frappe.utils import cint, now, validate_email_address
+
+from sriaas_clinic.api import campaign_attribution, lead_funnel
+from sriaas_clinic.api import dedupe as _dedupe
+from sriaas_clinic.api.crm_lead import PHONE_FIELDS, _clean_spaces, normalize_phoneish_fields
+
+DT = "CRM Lead"
+MAX_BATCH = 1000
+CHUNK_SIZE = 50
+QUEUE = "short"
+MAX_PENDING = 5000  # rows waiting in background jobs before queue mode refuses more
+PENDING_KEY = "sr_lead_ingest_pending"
+PENDING_TTL = 60 * 60  # counter self-heals if a worker dies mid-job
+DEDUPE_POLICIES = ("attach", "merge", "skip", "off")
+MATCH_DOCTYPES = ("Patient", "Customer", "Contact")  # checked after CRM Lead, in this order
+
+# fields a landing page may set; anything else in a row is ignored
+ALLOWED_FIELDS = (
+    "first_name", "last_name", "email", "mobile_no", "phone", "source",
+    "sr_lead_country", "sr_lead_message",
+    # tracking (setup/crm_lead.py, Meta tab)
+    "sr_ip_address", "sr_vpn_status", "sr_landing_page", "sr_remote_location", "sr_user_agent",
+    "sr_utm_source", "sr_utm_medium", "sr_utm_campaign", "sr_utm_campaign_id",
+    "sr_utm_term", "sr_utm_adgroup_id", "sr_gclid", "sr_fbclid",
+)
+
+# ---------------- validation ----------------
+
+def _clean(row: dict) -> dict:
+    lead = {}
+    for field in ALLOWED_FIELDS:
+        val = row.get(field)
+        if val is None:
+            continue
+        val = val.strip() if isinstance(val, str) else val
+        if field in PHONE_FIELDS:
+            val = _clean_spaces(val)
+        if val not in ("", None):
+            lead[field] = val
+    return lead
+
+def _validate(rows: list) -> list[tuple[dict | None, str | None]]:
+    """[(lead, None) | (None, error)] per input row."""
+    sources = {r.get("source") for r in rows if isinstance(r, dict) and r.get("source")}
+    source_dt = "SR Lead Source" if frappe.db.exists("DocType", "SR Lead Source") else "Lead Source"
+    known_sources = set(
+        frappe.get_all(source_dt, filters={"name": ["in", list(sources)]}, pluck="name")
+    ) if sources else set()
+
+    out = []
+    for row in rows:
+        if not isinstance(row, dict):
+            out.append((None, _("Row must be an object")))
+            continue
+        lead = _clean(row)
+        if not (lead.get("mobile_no") or lead.get("email")):
+            out.append((None, _("Mobile No or Email is required")))
+            continue
+        if lead.get("email") and not validate_email_address(lead["email"]):
+            out.append((None, _("Invalid email: {0}").format(lead["email"])))
+            continue
+        if lead.get("source") and lead["source"] not in known_sources:
+            out.append((None, _("Unknown Lead Source: {0}").format(lead["source"])))
+            continue
+        out.append((lead, None))
+    return out
+
+# ---------------- dedupe ----------------
+
+def _find_existing(leads: list[tuple[int, dict]], policy: str) -> tuple[dict, dict]:
+    """
+    ({doctype: {("p" | "e", key): name}}, {lead name: field values}) for the batch:
+    oldest record wins per key; lead values are only loaded for "merge".
+    """
+    if policy == "off" or not leads:
+        return {}, {}
+    keys = [_dedupe.keys_for(DT, lead) for _idx, lead in leads]
+    found = {}
+    for r in _dedupe.find_matches([pk for pk, _ek in keys], [ek for _pk, ek in keys]):
+        bucket = found.setdefault(r.doctype, {})
+        if r.phone_key:
+            bucket.setdefault(("p", r.phone_key), r.name)
+        if r.email_key:
+            bucket.setdefault(("e", r.email_key), r.name)
+
+    values = {}
+    if policy == "merge" and found.get(DT):
+        values = {
+            r.name: r
+            for r in frappe.get_all(
+                DT, filters={"name": ["in", list(set(found[DT].values()))]}, fields=["name", *ALLOWED_FIELDS]
+            )
+        }
+    return found, values
+
+def _match(found: dict, doctype: str, pk, ek):
+    bucket = found.get(doctype) or {}
+    return (pk and bucket.get(("p", pk))) or (ek and bucket.get(("e", ek))) or None
+
+def _remember(found: dict, values: dict, name: str, lead: dict, pk, ek):
+    """Later rows of the same batch match leads created / merged earlier in it."""
+    bucket = found.setdefault(DT, {})
+    if pk:
+        bucket.setdefault(("p", pk), name)
+    if ek:
+        bucket.setdefault(("e", ek), name)
+    values.setdefault(name, frappe._dict()).update(lead)
+
+def _forget(found: dict, values: dict, names):
+    """Drop leads that were never written (their chunk failed) from the batch lookups."""
+    for bucket in found.values():
+        for key in [k for k, n in bucket.items() if n in names]:
+            del bucket[key]
+    for name in names:
+        values.pop(name, None)
+
+def _merge(name: str, lead: dict, values: dict, new: dict, fills: dict) -> list[str]:
+    """
+    Fill the existing lead's blank fields; returns the fields filled. A lead of the current
+    chunk (`new`) is updated in memory, others are collected in `fills` for _write_fills.
+    """
+    current = values.setdefault(name, frappe._dict())
+    updates = {f: v for f, v in lead.items() if not current.get(f)}
+    current.update(updates)
+    if updates:
+        if name in new:
+            new[name].update(updates)
+            normalize_phoneish_fields(new[name])  # match keys for later rows of the batch
+        else:
+            fills.setdefault(name, {}).update(updates)
+    return list(updates)
+
+def _write_fills(fills: dict):
+    """
+    {lead: {field: value}} as one UPDATE with a CASE per field; a field filled since the
+    batch was read keeps its value. Then the merged leads' match keys, funnel rows and
+    attributed invoices are refreshed set-based.
+    """
+    names = list(fills)
+    params = {"names": tuple(names), "now": now(), "user": frappe.session.user}
+    params.update({f"n{i}": name for i, name in enumerate(names)})
+    sets = []
+    for field in sorted({f for updates in fills.values() for f in updates}):
+        whens = []
+        for i, name in enumerate(names):
+            if field in fills[name]:
+                params[f"{field}_{i}"] = fills[name][field]
+                whens.append(f"WHEN %(n{i})s THEN %({field}_{i})s")
+        sets.append(
+            f"`{field}` = IF(IFNULL(`{field}`, '') = '', CASE name {' '.join(whens)} ELSE `{field}` END, `{field}`)"
+        )
+    frappe.db.sql(
+        f"""UPDATE `tab{DT}` SET {", ".join(sets)}, modified = %(now)s, modified_by = %(user)s
+            WHERE name IN %(names)s""",
+        params,
+    )
+    _dedupe.backfill_keys(DT, names)
+    lead_funnel.refresh_leads(names)
+    attributed = (*campaign_attribution.LEAD_FIELDS, "source")
+    campaign_attribution.refresh_leads([n for n in names if any(f in fills[n] for f in attributed)])
+
+# ---------------- insert ----------------
+
+def _lead_series() -> dict | None:
+    """
+    CRM Lead's naming series counter, read FOR UPDATE once per chunk so new leads are named
+    in memory; None when the doctype is named another way (set_new_name names each lead).
+    """
+    if not (frappe.get_meta(DT).autoname or "").startswith("naming_series:"):
+        return None
+    series = NamingSeries(frappe.new_doc(DT).get("naming_series") or get_default_naming_series(DT))
+    prefix = series.get_prefix()
+    row = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", prefix)
+    current = cint(row[0][0]) if row else 0
+    return {"prefix": prefix, "digits": series.series.count("#"), "exists": bool(row),
+            "start": current, "current": current}
+
+def _next_name(series: dict | None) -> str | None:
+    if series is None:
+        return None
+    series["current"] += 1
+    return f"{series['prefix']}{series['current']:0{series['digits']}d}"
+
+def _save_series(series: dict | None):
+    if series is None or series["current"] == series["start"]:
+        return
+    if series["exists"]:
+        frappe.db.sql("UPDATE `tabSeries` SET `current` = %s WHERE `name` = %s", (series["current"], series["prefix"]))
+    else:
+        frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (series["prefix"], series["current"]))
+
+def _build_lead(values: dict, series: dict | None):
+    """A named, unsaved CRM Lead that went through the hooks insert() runs before writing."""
+    doc = frappe.new_doc(DT)
+    doc.update(values)
+    doc.flags.sr_ingest = True
+    for method in ("before_insert", "before_validate", "validate", "before_save"):
+        doc.run_method(method)
+    doc.set_new_name(set_name=_next_name(series))
+    return doc
+
+def _write_leads(docs: list):
+    """
+    One bulk_insert per table (CRM Lead, status log, ...) and a set-based funnel refresh.
+    Campaign attribution only links leads created before an invoice, so new leads change
+    no existing attribution rows.
+    """
+    rows = {}
+    for doc in docs:
+        doc.set_user_and_timestamp()
+        doc.set_parent_in_children()
+        for d in (doc, *doc.get_all_children()):
+            rows.setdefault(d.doctype, []).append(d.get_valid_dict(convert_dates_to_str=True))
+    for doctype, dicts in rows.items():
+        fields = list(dicts[0])
+        frappe.db.bulk_insert(doctype, fields, [tuple(d.get(f) for f in fields) for d in dicts])
+    lead_funnel.refresh_leads([doc.name for doc in docs])
+
+def _ingest_row(idx: int, lead: dict, policy: str, found: dict, values: dict, new: dict, fills: dict,
+                series) -> dict:
+    pk, ek = _dedupe.keys_for(DT, lead)
+    existing_lead = _match(found, DT, pk, ek)
+    other = next(((dt, n) for dt in MATCH_DOCTYPES if (n := _match(found, dt, pk, ek))), None)
+
+    if policy == "skip" and (existing_lead or other):
+        dt, name = (DT, existing_lead) if existing_lead else other
+        return {"index": idx, "status": "duplicate", "duplicate_of": {"doctype": dt, "name": name}}
+
+    if policy == "merge" and existing_lead:
+        fields = _merge(existing_lead, lead, values, new, fills)
+        return {"index": idx, "status": "merged", "name": existing_lead, "fields": fields}
+
+    links = {}
+    if policy in ("attach", "merge"):
+        links = {"sr_duplicate_of": existing_lead, "sr_matched_patient": _match(found, "Patient", pk, ek)}
+    doc = _build_lead({**lead, **links}, series)
+    new[doc.name] = doc
+    _remember(found, values, doc.name, lead, pk, ek)
+    result = {"index": idx, "status": "created", "name": doc.name}
+    if existing_lead or other:
+        result["duplicate_of"] = {"doctype": DT, "name": existing_lead} if existing_lead else {"doctype": other[0], "name": other[1]}
+    return result
+
+def _insert_chunk(chunk: list[tuple[int, dict]], policy: str, found: dict, values: dict) -> list[dict]:
+    """
+    Rows in input order, then the chunk's new leads and blank-field fills in one write;
+    if that fails every row depending on it fails.
+    """
+    series = _lead_series()
+    results, new, fills = [], {}, {}
+    for idx, lead in chunk:
+        try:
+            results.append(_ingest_row(idx, lead, policy, found, values, new, fills, series))
+        except Exception as e:
+            frappe.clear_last_message()
+            results.append({"index": idx, "status": "error", "error": str(e)})
+
+    if new or fills:
+        frappe.db.savepoint("sr_lead_ingest_chunk")
+        try:
+            if new:
+                _save_series(series)
+                _write_leads(list(new.values()))
+            if fills:
+                _write_fills(fills)
+        except Exception as e:
+            frappe.db.rollback(save_point="sr_lead_ingest_chunk")
+            frappe.clear_last_message()
+            _forget(found, values, new)
+            results = [
+                {"index": r["index"], "status": "error", "error": str(e)}
+                if r.get("name") in new or (r.get("duplicate_of") or {}).get("name") in new
+                or (r["status"] == "merged" and r["name"] in fills) else r
+                for r in results
+            ]
+    frappe.db.commit()
+    return results
+
+def insert_leads(leads: list[tuple[int, dict]], dedupe: str = "attach") -> list[dict]:
+    """Insert (index, lead) pairs, committing every CHUNK_SIZE rows; duplicates per `dedupe`."""
+    found, values = _find_existing(leads, dedupe)
+    results = []
+    for i in range(0, len(leads), CHUNK_SIZE):
+        results += _insert_chunk(leads[i:i + CHUNK_SIZE], dedupe, found, values)
+    return results
+
+def run_ingest_job(leads: list, dedupe: str = "attach"):
+    """Background job for queue mode."""
+    try:
+        leads = [(idx, lead) for idx, lead in leads]
+        results = insert_leads(leads, dedupe)
+        failed = [r for r in results if r["status"] == "error"]
+        if failed:
+            frappe.log_error(
+                title="SR lead ingest: rows failed",
+                message=frappe.as_json(failed),
+            )
+    finally:
+        _release(len(leads))
+
+# ---------------- backpressure ----------------
+
+def _pending_key() -> str:
+    return frappe.cache().make_key(PENDING_KEY)
+
+def _reserve(n: int) -> bool:
+    """Atomically add n waiting rows; False (and nothing reserved) if over MAX_PENDING."""
+    cache = frappe.cache()
+    key = _pending_key()
+    cache.set(key, 0, ex=PENDING_TTL, nx=True)  # TTL from creation only, so a stuck count still expires
+    pending = cache.incrby(key, n)
+    if pending > MAX_PENDING:
+        cache.decrby(key, n)
+        return False
+    return True
+
+def _release(n: int):
+    cache = frappe.cache()
+    if cache.decrby(_pending_key(), n) < 0:
+        cache.delete(_pending_key())
+
+def _enqueue_job(leads: list, dedupe: str):
+    """after_commit: push the job; if the push fails its slots are given back and it is logged."""
+    try:
+        frappe.enqueue(
+            "sriaas_clinic.api.lead_ingest.run_ingest_job",
+            queue=QUEUE,
+            leads=leads,
+            dedupe=dedupe,
+        )
+    except Exception:
+        _release(len(leads))
+        frappe.log_error(title="SR lead ingest: enqueue failed", message=frappe.get_traceback())
+
+# ---------------- API ----------------
+
+@frappe.whitelist(methods=["POST"])
+def ingest_leads(leads, mode: str = "sync", dedupe: str = "attach") -> dict:
+    """
+    leads: list of dicts (or JSON). mode: "sync" | "queue". dedupe: see DEDUPE_POLICIES.
+    Returns {"mode", "received", "accepted", "failed", "results": [{"index", "status", ...}]};
+    status is "created" / "merged" / "duplicate" / "error" (sync) or "queued" / "error" (queue).
+    """
+    frappe.has_permission(DT, "create", throw=True)
+    if mode not in ("sync", "queue"):
+        frappe.throw(_("Mode must be sync or queue"))
+    if dedupe not in DEDUPE_POLICIES:
+        frappe.throw(_("dedupe must be one of: {0}").format(", ".join(DEDUPE_POLICIES)))
+
+    rows = frappe.parse_json(leads) if isinstance(leads, str) else leads
+    if not isinstance(rows, list):
+        frappe.throw(_("leads must be a list"))
+    if len(rows) > MAX_BATCH:
+        frappe.throw(_("At most {0} leads per call.").format(MAX_BATCH))
+
+    checked = _validate(rows)
+    valid = [(i, lead) for i, (lead, err) in enumerate(checked) if lead]
+    results = {i: {"index": i, "status": "error", "error": err} for i, (lead, err) in enumerate(checked) if err}
+
+    if mode == "queue":
+        if valid:
+            if not _reserve(len(valid)):
+                raise frappe.TooManyRequestsError(
+                    _("Lead queue is full, retry in a minute.")
+                )
+            # the job is only pushed on commit: a rolled back request must give its slots back
+            frappe.db.after_commit.add(partial(_enqueue_job, valid, dedupe))
+            frappe.db.after_rollback.add(partial(_release, len(valid)))
+        for i, _lead in valid:
+            results[i] = {"index": i, "status": "queued"}
+    else:
+        for r in insert_leads(valid, dedupe):
+            results[r["index"]] = r
+
+    ordered = [results[i] for i in range(len(rows))]
+    return {
+        "mode": mode,
+        "received": len(rows),
+        "accepted": sum(1 for r in ordered if r["status"] != "error"),
+        "failed": sum(1 for r in ordered if r["status"] == "error"),
+        "results": ordered,
+    }
@@ -0,0 +1,56 @@
+# sriaas_clinic/api/master_data.py
+"""
+Small SR masters (created in setup/masters.py) shipped to the desk in the boot payload.
+
+- frappe.boot.sr_masters = {"version": str, "masters": {doctype: [rows]}}
+- the bundle is built once, cached in redis and dropped when any of the masters changes;
+  open desks are told the new version over realtime and refetch it (get_master_bundle)
+- client side: public/js/sr_masters.js (sriaas_clinic.masters.get / count)
+"""
+import hashlib
+
+import frappe
+
+# doctype -> columns sent to the client
+BOOT_MASTERS = {
+    "SR Lead Disposition": ("name", "sr_lead_status", "is_active"),
+    "SR Sales Type": ("name",),
+    "SR Delivery Type": ("name",),
+    "SR Lead Source": ("name",),
+    "SR Encounter Status": ("name",),
+    "SR State": ("name", "sr_abbr", "sr_is_union_territory"),
+    "SR Practitioner Pathy": ("name",),
+}
+CACHE_KEY = "sr_master_bundle"
+CHANGED_EVENT = "sr_masters_changed"
+
+def _build() -> dict:
+    masters = {}
+    for doctype, fields in BOOT_MASTERS.items():
+        if not frappe.db.table_exists(doctype):
+            continue
+        masters[doctype] = frappe.get_all(doctype, fields=list(fields), order_by="name asc")
+    version = hashlib.sha1(frappe.as_json(masters, indent=None).encode("utf-8")).hexdigest()[:12]
+    return {"version": version, "masters": masters}
+
+@frappe.whitelist()
+def get_master_bundle() -> dict:
+    """{"version", "masters"}; cached until one of BOOT_MASTERS changes."""
+    bundle = frappe.cache().get_value(CACHE_KEY)
+    if bundle is None:
+        bundle = _build()
+        frappe.cache().set_value(CACHE_KEY, bundle)
+    return bundle
+
+def boot_session(bootinfo):
+    """extend_bootinfo: attach the bundle for desk users."""
+    if frappe.session.user == "Guest":
+        return
+    bootinfo.sr_masters = get_master_bundle()
+
+def on_master_change(doc, method=None, *args):
+    """doc_events of each BOOT_MASTERS doctype (on_update / on_trash / after_rename)."""
+    if doc.doctype not in BOOT_MASTERS:
+        return
+    frappe.cache().delete_value(CACHE_KEY)
+    frappe.publish_realtime(CHANGED_EVENT, after_commit=True)
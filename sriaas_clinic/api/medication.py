@@ -0,0 +1,94 @@
+# sriaas_clinic/api/medication.py
+"""
+Medication class rules for the three Patient Encounter prescription tables.
+
+- CLASS_FILTERS: allowed Medication.medication_class per child table (also shipped to the
+  desk through boot, so pe_medication_filters.js uses the same rules)
+- get_medication_class_map (whitelisted): {medication: class} with a version; the browser
+  keeps it in localStorage and refetches only when the boot version changes
+- validate_prescription_classes: Patient Encounter.validate, checks every prescription row
+  server-side with one query
+"""
+import hashlib
+
+import frappe
+from frappe import _
+
+# Patient Encounter child table fieldname -> allowed Medication.medication_class values
+CLASS_FILTERS = {
+    "drug_prescription": ["Ayurvedic Medicine", "Ayurvedic"],
+    "sr_homeopathy_drug_prescription": ["Homeopathic Medicine", "Homeopathic"],
+    "sr_allopathy_drug_prescription": ["Allopathic Medicine", "Allopathic"],
+}
+TABLE_LABELS = {
+    "drug_prescription": "Ayurvedic",
+    "sr_homeopathy_drug_prescription": "Homeopathy",
+    "sr_allopathy_drug_prescription": "Allopathy",
+}
+
+MAP_CACHE_KEY = "sr_medication_class_map"
+VERSION_CACHE_KEY = "sr_medication_class_map_version"
+
+# ---------------- versioned map ----------------
+
+def get_map_version() -> str:
+    """Short hash of (count, last modified) of Medication; cached until a Medication changes."""
+    version = frappe.cache().get_value(VERSION_CACHE_KEY)
+    if version is None:
+        count, latest = frappe.db.sql("SELECT COUNT(*), MAX(modified) FROM `tabMedication`")[0]
+        version = hashlib.sha1(f"{count}|{latest}".encode()).hexdigest()[:12]
+        frappe.cache().set_value(VERSION_CACHE_KEY, version)
+    return version
+
+@frappe.whitelist()
+def get_medication_class_map() -> dict:
+    """{"version": str, "map": {medication: medication_class}} for every Medication with a class."""
+    data = frappe.cache().get_value(MAP_CACHE_KEY)
+    if data is None or data.get("version") != get_map_version():
+        rows = frappe.db.sql(
+            "SELECT name, medication_class FROM `tabMedication` WHERE IFNULL(medication_class, '') != ''"
+        )
+        data = {"version": get_map_version(), "map": dict(rows)}
+        frappe.cache().set_value(MAP_CACHE_KEY, data)
+    return data
+
+def clear_medication_class_map(doc=None, method=None):
+    """Medication.on_update / on_trash / after_rename: bump the version on next read."""
+    frappe.cache().delete_value([MAP_CACHE_KEY, VERSION_CACHE_KEY])
+
+def boot_session(bootinfo):
+    """extend_bootinfo: rules + current map version (the map itself is fetched lazily)."""
+    if frappe.session.user == "Guest":
+        return
+    bootinfo.sr_medication_class_filters = CLASS_FILTERS
+    bootinfo.sr_medication_class_map_version = get_map_version()
+
+# ---------------- server-side guard ----------------
+
+def validate_prescription_classes(doc, method=None):
+    """Patient Encounter.validate: reject medications whose class does not fit their table."""
+    rows = [
+        (table, row)
+        for table in CLASS_FILTERS
+        for row in (doc.get(table) or [])
+        if row.get("medication")
+    ]
+    if not rows:
+        return
+
+    names = list({row.medication for _table, row in rows})
+    classes = dict(frappe.db.sql(
+        "SELECT name, medication_class FROM `tabMedication` WHERE name IN %(names)s",
+        {"names": tuple(names)},
+    ))
+
+    errors = []
+    for table, row in rows:
+        cls = classes.get(row.medication)
+        if cls and cls not in CLASS_FILTERS[table]:
+            errors.append(_("{0} row #{1}: {2} is {3}").format(
+                _(TABLE_LABELS[table]), row.idx, frappe.bold(row.medication), frappe.bold(cls)
+            ))
+
+    if errors:
+        frappe.throw("<br>".join(errors), title=_("Wrong Medication Class"))
@@ -0,0 +1,183 @@
+# sriaas_clinic/api/medication_template.py
+"""
+SR Medication Template expansion.
+
+A template is compiled once into display/billing-ready rows (per-day count, days, total
+quantity, print label) and cached until the template changes. The same compiled form is
+used by:
+  - the Patient Encounter form (pe_template_medication.js -> expand_medication_template)
+  - the "Patient Encounter New" print context (label fallback)
+  - server-side encounter creation (apply_template_to_encounter)
+"""
+import math
+import re
+
+import frappe
+
+CACHE_KEY = "sr_medication_template_compiled"  # redis hash: template -> compiled dict
+TABLE = "drug_prescription"  # templates fill the Ayurvedic table
+COUNTABLE_FORMS = ("tablet", "capsule")
+
+# ---------------- parsing (kept in step with the old client-side rules) ----------------
+
+_QID = re.compile(r"\b(qid|4\s*times|four\s*times|4x)\b")
+_TDS = re.compile(r"\b(tds|thrice|three\s*times|3\s*times|3x)\b")
+_BD = re.compile(r"\b(bd|twice|two\s*times|2\s*times|2x)\b")
+_OD = re.compile(r"\b(od|once|1\s*time|1x|hs|bed\s*time|at\s*bedtime)\b")
+_ALT = re.compile(r"\balternate\s*day\b")
+
+def parse_days(period: str) -> int:
+    """"2 Week" -> 14, "1 Month" -> 30, "5 Day" -> 5; a bare number is days; default 1."""
+    p = (period or "").lower().strip()
+    m = re.match(r"[+-]?\d+", p)
+    n = int(m.group()) if m and int(m.group()) else 1
+    if "month" in p:
+        return n * 30
+    if "week" in p:
+        return n * 7
+    return n
+
+def parse_per_day(dosage: str) -> float:
+    """"1-0-1" -> 2; OD/BD/TDS/QID; HS/bed time -> 1; "alternate day" -> 0.5; unknown -> 0."""
+    d = (dosage or "").lower().strip()
+    nums = re.findall(r"\d+", d)
+    if nums and (re.search(r"[-\s/]", d) or len(nums) > 1):
+        return sum(int(n) for n in nums)
+    if _QID.search(d):
+        return 4
+    if _TDS.search(d):
+        return 3
+    if _BD.search(d):
+        return 2
+    if _OD.search(d):
+        return 1
+    if _ALT.search(d):
+        return 0.5
+    return 0
+
+def short_form(dosage_form: str) -> str:
+    f = (dosage_form or "").lower()
+    if "tablet" in f:
+        return "Tab"
+    if "capsule" in f:
+        return "Cap"
+    return ""
+
+def compile_row(medication, dosage, period, dosage_form, drug_code=None, instruction=None) -> dict:
+    per_day = parse_per_day(dosage)
+    days = parse_days(period)
+    total_qty = math.ceil(per_day * days)
+    is_countable = (dosage_form or "").lower() in COUNTABLE_FORMS
+    short = short_form(dosage_form)
+    label = f"{medication} ({total_qty} {short})" if is_countable and short and total_qty > 0 else medication
+    return {
+        "medication": medication or "",
+        "drug_code": drug_code or "",
+        "dosage": dosage or "",
+        "period": period or "",
+        "dosage_form": dosage_form or "",
+        "instruction": instruction or "",
+        "per_day": per_day,
+        "days": days,
+        "total_qty": total_qty,
+        "is_countable": is_countable,
+        "print_label": label,
+    }
+
+# ---------------- compiled templates (cached) ----------------
+
+def _compile(template: str) -> dict | None:
+    header = frappe.db.get_value(
+        "SR Medication Template", template, ["name", "sr_tmpl_instruction", "modified"], as_dict=True
+    )
+    if not header:
+        return None
+    items = frappe.get_all(
+        "SR Medication Template Item",
+        filters={"parent": template, "parenttype": "SR Medication Template"},
+        fields=["sr_medication", "sr_drug_code", "sr_dosage", "sr_period", "sr_dosage_form", "sr_instruction"],
+        order_by="idx asc",
+    )
+    return {
+        "name": header.name,
+        "modified": str(header.modified),
+        "instruction": header.sr_tmpl_instruction or "",
+        "rows": [
+            compile_row(i.sr_medication, i.sr_dosage, i.sr_period, i.sr_dosage_form, i.sr_drug_code, i.sr_instruction)
+            for i in items
+        ],
+    }
+
+def get_compiled_template(template: str) -> dict | None:
+    """Compiled template from cache (compiled on first use)."""
+    if not template:
+        return None
+    compiled = frappe.cache().hget(CACHE_KEY, template)
+    if compiled is None:
+        compiled = _compile(template)
+        if compiled is None:
+            return None
+        frappe.cache().hset(CACHE_KEY, template, compiled)
+    return compiled
+
+def clear_compiled_template(doc=None, method=None, *args):
+    """SR Medication Template.on_update / on_trash / after_rename."""
+    if doc is not None and method != "after_rename":
+        frappe.cache().hdel(CACHE_KEY, doc.name)
+    else:
+        frappe.cache().delete_value(CACHE_KEY)
+
+@frappe.whitelist()
+def expand_medication_template(template: str) -> dict:
+    """Compiled rows for the Patient Encounter form."""
+    frappe.has_permission("SR Medication Template", "read", template, throw=True)
+    compiled = get_compiled_template(template)
+    if not compiled:
+        frappe.throw(frappe._("Medication Template {0} not found.").format(template))
+    return compiled
+
+def print_labels(template: str) -> dict:
+    """{medication: print label} for a template (print format fallback)."""
+    compiled = get_compiled_template(template) or {}
+    return {r["medication"]: r["print_label"] for r in compiled.get("rows", [])}
+
+# ---------------- server-side apply ----------------
+
+def apply_template_to_encounter(doc, template: str | None = None) -> None:
+    """
+    Replace the Ayurvedic prescription rows of an (unsaved) Patient Encounter with the
+    template's rows — same mapping as the form. For encounters created in code.
+    """
+    template = template or doc.get("sr_medication_template")
+    compiled = get_compiled_template(template)
+    if not compiled:
+        return
+
+    child_meta = frappe.get_meta(doc.meta.get_field(TABLE).options)
+    has = child_meta.has_field
+
+    if compiled["instruction"]:
+        doc.sr_pe_instruction = compiled["instruction"]
+
+    doc.set(TABLE, [])
+    for r in compiled["rows"]:
+        row = {"medication": r["medication"]}
+        if has("drug_code"):
+            row["drug_code"] = r["drug_code"]
+        if has("dosage"):
+            row["dosage"] = r["dosage"]
+        if has("period"):
+            row["period"] = r["period"]
+        if has("dosage_form"):
+            row["dosage_form"] = r["dosage_form"]
+        if has("sr_drug_instruction"):
+            row["sr_drug_instruction"] = r["instruction"]
+        if has("no_of_tablets_per_day_for_calculation"):
+            row["no_of_tablets_per_day_for_calculation"] = r["per_day"]
+        if has("quantity") and r["is_countable"]:
+            row["quantity"] = r["total_qty"]
+        if has("sr_medication_name_print"):
+            row["sr_medication_name_print"] = r["print_label"]
+        elif has("custom_instruction"):
+            row["custom_instruction"] = f"{r['print_label']} — {r['instruction']}" if r["instruction"] else r["print_label"]
+        doc.append(TABLE, row)
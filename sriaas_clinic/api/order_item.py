@@ -0,0 +1,102 @@
+# sriaas_clinic/api/order_item.py
+"""
+Item details for SR Order Item rows (public/js/pe_order_item.js).
+
+get_item_info (whitelisted) resolves many item codes in one call: UOM, name, description,
+stock flag and the default selling rate from the given (or default) selling Price List.
+Results are cached per day and price list (rates depend on valid_from / valid_upto) and
+dropped when an Item or Item Price changes.
+"""
+import frappe
+from frappe.utils import nowdate
+
+CACHE_PREFIX = "sr_item_info::"  # redis hash per day + price list: item_code -> info
+CACHE_TTL = 24 * 60 * 60  # seconds; a day's hash is useless after that day
+MAX_ITEMS = 500
+
+def _cache_key(price_list: str) -> str:
+    return f"{CACHE_PREFIX}{nowdate()}::{price_list or ''}"
+
+def _default_price_list() -> str | None:
+    return frappe.db.get_single_value("Selling Settings", "selling_price_list")
+
+def _load(item_codes: list[str], price_list: str | None) -> dict:
+    """Item fields + selling rate for `item_codes` in two queries."""
+    items = frappe.get_all(
+        "Item",
+        filters={"name": ["in", item_codes]},
+        fields=["name", "item_name", "stock_uom", "description", "is_stock_item"],
+    )
+    rates = {}
+    if price_list and items:
+        # latest price valid today, without customer-specific prices
+        for r in frappe.db.sql(
+            """
+            SELECT item_code, price_list_rate
+            FROM `tabItem Price`
+            WHERE price_list = %(price_list)s AND selling = 1
+              AND item_code IN %(codes)s
+              AND IFNULL(customer, '') = ''
+              AND (valid_from IS NULL OR valid_from <= %(today)s)
+              AND (valid_upto IS NULL OR valid_upto >= %(today)s)
+            ORDER BY valid_from ASC, modified ASC
+            """,
+            {"price_list": price_list, "codes": tuple(i.name for i in items), "today": nowdate()},
+            as_dict=True,
+        ):
+            rates[r.item_code] = r.price_list_rate  # later rows win
+
+    return {
+        i.name: {
+            "item_name": i.item_name,
+            "stock_uom": i.stock_uom,
+            "description": i.description,
+            "is_stock_item": i.is_stock_item,
+            "rate": rates.get(i.name),
+        }
+        for i in items
+    }
+
+@frappe.whitelist()
+def get_item_info(item_codes, price_list: str | None = None) -> dict:
+    """{item_code: {item_name, stock_uom, description, is_stock_item, rate}} for many items at once."""
+    frappe.has_permission("Item", "read", throw=True)
+
+    codes = frappe.parse_json(item_codes) if isinstance(item_codes, str) else item_codes
+    codes = list(dict.fromkeys(c for c in (codes or []) if c))
+    if len(codes) > MAX_ITEMS:
+        frappe.throw(frappe._("At most {0} items per call.").format(MAX_ITEMS))
+    if not codes:
+        return {}
+
+    price_list = price_list or _default_price_list()
+    key = _cache_key(price_list)
+    cache = frappe.cache()
+
+    out = {}
+    missing = []
+    for code in codes:
+        hit = cache.hget(key, code)
+        if hit is None:
+            missing.append(code)
+        else:
+            out[code] = hit
+
+    if missing:
+        for code, info in _load(missing, price_list).items():
+            cache.hset(key, code, info)
+            out[code] = info
+        cache.expire(cache.make_key(key), CACHE_TTL)
+    return out
+
+# ---------------- invalidation ----------------
+
+def clear_item_info(doc=None, method=None, *args):
+    """Item.on_update / on_trash / after_rename: drop cached info for every price list."""
+    frappe.cache().delete_keys(CACHE_PREFIX)
+
+def clear_item_price_info(doc, method=None):
+    """Item Price.on_update / on_trash: only that price list's entry for the item."""
+    frappe.cache().hdel(_cache_key(doc.price_list), doc.item_code)
+    if doc.has_value_changed("price_list") and doc.get_doc_before_save():
+        frappe.cache().hdel(_cache_key(doc.get_doc_before_save().price_list), doc.item_code)
@@ -2,6 +2,8 @@
 import frappe
 import re
 
+from sriaas_clinic.api.dedupe import set_match_keys
+
 # ----------------------------
 # A) Patient ID auto-generator
 # ----------------------------
@@ -65,6 +67,9 @@ def normalize_phoneish_fields(doc, method=None):
             if cleaned != val:
                 doc.set(field, cleaned)  # in before_save, no extra DB hit
 
+    # duplicate-match keys (api/dedupe.py)
+    set_match_keys(doc)
+
 # -------------------------------------------------------
 # C) Follow-up fields: day cycler + last-digit assignment
 # -------------------------------------------------------
@@ -0,0 +1,160 @@
+# sriaas_clinic/api/patient_ledger.py
+"""
+Patient ledger for the Patient form's "Ledger" tab (public/js/patient_ledger.js).
+
+- get_patient_ledger (whitelisted): submitted Sales Invoices of the patient and submitted
+  Payment Entries of its Customer, merged newest first with a running balance, in one
+  query with keyset pagination (pass back `next_cursor`).
+- Pages are cached per patient in redis for CACHE_TTL and dropped when a Sales Invoice /
+  Payment Entry / Journal Entry touching that patient is submitted or cancelled (an amend
+  is a cancel plus a submit), or the Patient's Customer changes.
+"""
+import frappe
+from frappe.utils import cint
+
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 200
+CACHE_PREFIX = "sr_patient_ledger::"  # redis hash per patient: "<cursor>|<page_length>" -> page
+CACHE_TTL = 60 * 60  # seconds; backstop for writes that bypass the hooks below
+
+def _cache_key(patient: str) -> str:
+    return f"{CACHE_PREFIX}{patient}"
+
+def _encode_cursor(row) -> str:
+    return frappe.as_json([str(row.posting_date), str(row.creation), row.voucher_no], indent=None)
+
+def _decode_cursor(cursor):
+    vals = frappe.parse_json(cursor) if isinstance(cursor, str) else cursor
+    if not isinstance(vals, (list, tuple)) or len(vals) != 3:
+        frappe.throw(frappe._("Invalid cursor."))
+    return vals
+
+def _fetch(patient: str, customer: str | None, cursor, page_length: int) -> dict:
+    """
+    One page, newest first. The running balance (invoices minus receipts) is a window
+    SUM over the whole ledger in ascending order, so it is correct on every page.
+    """
+    params = {"patient": patient, "customer": customer or "", "limit": page_length + 1}
+    cursor_sql = ""
+    if cursor:
+        params["c_date"], params["c_creation"], params["c_name"] = _decode_cursor(cursor)
+        cursor_sql = "WHERE (l.posting_date, l.creation, l.voucher_no) < (%(c_date)s, %(c_creation)s, %(c_name)s)"
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT l.*
+        FROM (
+            SELECT u.*,
+                   SUM(u.debit - u.credit) OVER (
+                       ORDER BY u.posting_date, u.creation, u.voucher_no
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                   ) AS balance
+            FROM (
+                SELECT 'Sales Invoice' AS voucher_type, si.name AS voucher_no, si.posting_date, si.creation,
+                       si.grand_total AS debit, 0 AS credit, si.outstanding_amount, NULL AS mode_of_payment
+                FROM `tabSales Invoice` si
+                WHERE si.patient = %(patient)s AND si.docstatus = 1
+                UNION ALL
+                SELECT 'Payment Entry', pe.name, pe.posting_date, pe.creation,
+                       CASE WHEN pe.payment_type = 'Pay' THEN pe.paid_amount ELSE 0 END,
+                       CASE WHEN pe.payment_type = 'Pay' THEN 0 ELSE pe.paid_amount END,
+                       NULL, pe.mode_of_payment
+                FROM `tabPayment Entry` pe
+                WHERE pe.party_type = 'Customer' AND pe.party = %(customer)s AND pe.docstatus = 1
+            ) u
+        ) l
+        {cursor_sql}
+        ORDER BY l.posting_date DESC, l.creation DESC, l.voucher_no DESC
+        LIMIT %(limit)s
+        """,
+        params,
+        as_dict=True,
+    )
+
+    next_cursor = None
+    if len(rows) > page_length:
+        rows = rows[:page_length]
+        next_cursor = _encode_cursor(rows[-1])
+
+    entries = [
+        {
+            "voucher_type": r.voucher_type,
+            "voucher_no": r.voucher_no,
+            "posting_date": r.posting_date,
+            "debit": r.debit,
+            "credit": r.credit,
+            "balance": r.balance,
+            "outstanding_amount": r.outstanding_amount,
+            "mode_of_payment": r.mode_of_payment,
+        }
+        for r in rows
+    ]
+    return {"entries": entries, "next_cursor": next_cursor}
+
+@frappe.whitelist()
+def get_patient_ledger(patient: str, cursor=None, page_length: int = DEFAULT_PAGE_LENGTH):
+    """
+    One page of the patient's ledger (newest first).
+    Returns {"entries": [...], "next_cursor": str | None}.
+    """
+    if not patient:
+        frappe.throw(frappe._("Patient is required."))
+    frappe.has_permission("Patient", "read", patient, throw=True)
+    customer = frappe.db.get_value("Patient", patient, "customer")
+    if customer:
+        # payments are listed by Customer, so the caller must be able to read that row too
+        frappe.has_permission("Customer", "read", customer, throw=True)
+    frappe.has_permission("Sales Invoice", "read", throw=True)
+    frappe.has_permission("Payment Entry", "read", throw=True)
+
+    page_length = min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+    field = f"{cursor or ''}|{page_length}"
+
+    cache = frappe.cache()
+    key = _cache_key(patient)
+    page = cache.hget(key, field)
+    if page is None:
+        page = _fetch(patient, customer, cursor, page_length)
+        cache.hset(key, field, page)
+        cache.expire(cache.make_key(key), CACHE_TTL)
+    return page
+
+# ---------------- invalidation ----------------
+
+def invalidate_patient_ledger(patients):
+    for p in {p for p in (patients or []) if p}:
+        frappe.cache().delete_value(_cache_key(p))
+
+def on_sales_invoice_change(doc, method=None):
+    """Sales Invoice.on_submit / on_cancel."""
+    invalidate_patient_ledger([doc.get("patient")])
+
+def on_payment_entry_change(doc, method=None):
+    """Payment Entry.on_submit / on_cancel: every patient billed to the paying Customer, plus
+    the patients of referenced invoices (their outstanding_amount changes)."""
+    patients = set()
+    if doc.get("party_type") == "Customer" and doc.get("party"):
+        patients.update(frappe.get_all("Patient", filters={"customer": doc.party}, pluck="name"))
+    invoices = {r.reference_name for r in (doc.get("references") or [])
+                if r.get("reference_doctype") == "Sales Invoice" and r.get("reference_name")}
+    if invoices:
+        patients.update(frappe.get_all("Sales Invoice", filters={"name": ["in", list(invoices)]}, pluck="patient"))
+    invalidate_patient_ledger(patients)
+
+def on_journal_entry_change(doc, method=None):
+    """Journal Entry.on_submit / on_cancel: patients of referenced invoices and of Customer parties."""
+    invoices = {r.reference_name for r in (doc.get("accounts") or [])
+                if r.get("reference_type") == "Sales Invoice" and r.get("reference_name")}
+    customers = {r.party for r in (doc.get("accounts") or [])
+                 if r.get("party_type") == "Customer" and r.get("party")}
+    patients = set()
+    if invoices:
+        patients.update(frappe.get_all("Sales Invoice", filters={"name": ["in", list(invoices)]}, pluck="patient"))
+    if customers:
+        patients.update(frappe.get_all("Patient", filters={"customer": ["in", list(customers)]}, pluck="name"))
+    invalidate_patient_ledger(patients)
+
+def on_patient_update(doc, method=None):
+    """Patient.on_update: payments are looked up through the linked Customer."""
+    if doc.has_value_changed("customer"):
+        invalidate_patient_ledger([doc.name])
@@ -0,0 +1,113 @@
+# sriaas_clinic/api/patient_summary.py
+"""
+Patient financial summary fields (Ledger tab / Patient list):
+  sr_lifetime_billed, sr_lifetime_paid, sr_outstanding, sr_last_visit_date
+
+All four are recomputed from the source documents, never adjusted by deltas:
+- billed      = grand total of the patient's submitted Sales Invoices
+- outstanding = sum of those invoices' outstanding_amount (so Payment Entries, Journal
+                Entries, write-offs and returns all count, per invoice)
+- paid        = billed - outstanding
+- last visit  = latest non-cancelled Patient Encounter date
+
+- Sales Invoice / Payment Entry / Journal Entry submit & cancel recompute the affected
+  patients with one set-based UPDATE
+- Patient.before_save recomputes the row being saved, so a form or hook that saves a
+  Patient loaded before those UPDATEs cannot write stale values back
+- reconcile_patient_summaries rebuilds everything (daily scheduler + manual)
+"""
+import frappe
+
+_INVOICES = """
+    SELECT patient, SUM(grand_total) AS billed, SUM(outstanding_amount) AS outstanding
+    FROM `tabSales Invoice`
+    WHERE docstatus = 1 AND IFNULL(patient, '') != '' {scope}
+    GROUP BY patient
+"""
+_ENCOUNTERS = """
+    SELECT patient, MAX(encounter_date) AS last_visit
+    FROM `tabPatient Encounter`
+    WHERE docstatus < 2 {scope}
+    GROUP BY patient
+"""
+
+def _invoice_patients(invoices) -> list[str]:
+    invoices = tuple({i for i in invoices if i})
+    if not invoices:
+        return []
+    return frappe.get_all(
+        "Sales Invoice", filters={"name": ["in", invoices], "patient": ["is", "set"]}, pluck="patient", distinct=True
+    )
+
+# ---------------- doc_events ----------------
+
+def on_sales_invoice_change(doc, method=None):
+    """Sales Invoice.on_submit / on_cancel (a return also changes the original invoice's outstanding)."""
+    patients = {doc.get("patient")} | set(_invoice_patients([doc.get("return_against")]))
+    reconcile_patient_summaries([p for p in patients if p], commit=False)
+
+def on_payment_change(doc, method=None):
+    """Payment Entry / Journal Entry on_submit / on_cancel: patients of the referenced invoices."""
+    table = "references" if doc.doctype == "Payment Entry" else "accounts"
+    invoices = [
+        r.reference_name for r in (doc.get(table) or [])
+        if r.get("reference_doctype" if doc.doctype == "Payment Entry" else "reference_type") == "Sales Invoice"
+    ]
+    patients = _invoice_patients(invoices)
+    if patients:
+        reconcile_patient_summaries(patients, commit=False)
+
+def on_encounter_update(doc, method=None):
+    """Patient Encounter.on_update."""
+    if doc.get("patient"):
+        reconcile_patient_summaries([doc.patient], commit=False)
+
+def before_patient_save(doc, method=None):
+    """Patient.before_save: overwrite whatever the document carries with current values."""
+    if doc.is_new():
+        return
+    params = {"patient": doc.name}
+    si = frappe.db.sql(_INVOICES.format(scope="AND patient = %(patient)s"), params, as_dict=True)
+    enc = frappe.db.sql(_ENCOUNTERS.format(scope="AND patient = %(patient)s"), params, as_dict=True)
+    billed = (si[0].billed or 0) if si else 0
+    outstanding = (si[0].outstanding or 0) if si else 0
+    doc.sr_lifetime_billed = billed
+    doc.sr_outstanding = outstanding
+    doc.sr_lifetime_paid = billed - outstanding
+    doc.sr_last_visit_date = enc[0].last_visit if enc else None
+
+# ---------------- reconcile ----------------
+
+def reconcile_patient_summaries(patients=None, commit: bool = True):
+    """
+    Rebuild summary fields from scratch in one set-based UPDATE (all patients, or `patients`).
+      bench --site <site> execute sriaas_clinic.api.patient_summary.reconcile_patient_summaries
+    """
+    params = {}
+    where, scope = "", ""
+    if patients is not None:
+        if not patients:
+            return
+        params["patients"] = tuple(patients)
+        where = "WHERE p.name IN %(patients)s"
+        scope = "AND patient IN %(patients)s"
+
+    frappe.db.sql(
+        f"""
+        UPDATE `tabPatient` p
+        LEFT JOIN ({_INVOICES.format(scope=scope)}) si ON si.patient = p.name
+        LEFT JOIN ({_ENCOUNTERS.format(scope=scope)}) enc ON enc.patient = p.name
+        SET p.sr_lifetime_billed = IFNULL(si.billed, 0),
+            p.sr_outstanding = IFNULL(si.outstanding, 0),
+            p.sr_lifetime_paid = IFNULL(si.billed, 0) - IFNULL(si.outstanding, 0),
+            p.sr_last_visit_date = enc.last_visit
+        {where}
+        """,
+        params,
+    )
+    if commit:
+        frappe.db.commit()
+
+def reconcile_all():
+    """Daily scheduler entry: correct any drift (imports, db.set_value edits, deleted encounters)."""
+    reconcile_patient_summaries()
@@ -0,0 +1,92 @@
+# sriaas_clinic/api/payment_entry.py
+"""
+Outstanding invoices for the Payment Entry picker (public/js/payment_entry_outstanding_dialog.js).
+
+get_outstanding_invoices (whitelisted) wraps ERPNext's get_outstanding_reference_documents,
+keeps the full result for a short time per (company, party, account, payment type) and
+returns one sorted page of it, so flipping the party back and forth or paging through the
+dialog does not repeat the ledger query. Submitting / cancelling a Sales Invoice or Payment
+Entry for the party drops its cached lists straight away.
+"""
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+CACHE_PREFIX = "sr_pe_outstanding::"
+CACHE_TTL = 120  # seconds
+DEFAULT_PAGE_LENGTH = 20
+MAX_PAGE_LENGTH = 100
+SORT_FIELDS = ("posting_date", "due_date", "voucher_no", "invoice_amount", "outstanding_amount")
+
+def _party_prefix(company: str, party_type: str, party: str) -> str:
+    return f"{CACHE_PREFIX}{company}::{party_type}::{party}::"
+
+def _load(company, party_type, party, payment_type, party_account, party_account_currency) -> list[dict]:
+    from erpnext.accounts.doctype.payment_entry.payment_entry import get_outstanding_reference_documents
+
+    rows = get_outstanding_reference_documents({
+        "party_type": party_type,
+        "party": party,
+        "payment_type": payment_type,
+        "company": company,
+        "party_account": party_account,
+        "party_account_currency": party_account_currency,
+        "outstanding_amt_greater_than_zero": 1,
+    }) or []
+    keep = ("voucher_type", "voucher_no", "posting_date", "due_date", "invoice_amount",
+            "outstanding_amount", "currency", "exchange_rate", "payment_term")
+    return [{k: r.get(k) for k in keep} for r in rows]
+
+@frappe.whitelist()
+def get_outstanding_invoices(
+    company: str,
+    party_type: str,
+    party: str,
+    payment_type: str,
+    party_account: str | None = None,
+    party_account_currency: str | None = None,
+    page: int = 1,
+    page_length: int = DEFAULT_PAGE_LENGTH,
+    sort_by: str = "posting_date",
+    sort_order: str = "asc",
+) -> dict:
+    """
+    One page of outstanding documents for a party.
+    Returns {"rows", "total", "page", "page_length", "total_outstanding"}.
+    """
+    frappe.has_permission("Payment Entry", "read", throw=True)
+    if sort_by not in SORT_FIELDS:
+        frappe.throw(_("Cannot sort by {0}").format(sort_by))
+
+    key = f"{_party_prefix(company, party_type, party)}{party_account or ''}::{payment_type}"
+    rows = frappe.cache().get_value(key)
+    if rows is None:
+        rows = _load(company, party_type, party, payment_type, party_account, party_account_currency)
+        frappe.cache().set_value(key, rows, expires_in_sec=CACHE_TTL)
+
+    reverse = (sort_order or "").lower() == "desc"
+    # None sorts first ascending (last descending), like the database would
+    ordered = sorted(rows, key=lambda r: (r.get(sort_by) is not None, r.get(sort_by) or 0), reverse=reverse)
+
+    page_length = min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+    page = max(cint(page) or 1, 1)
+    start = (page - 1) * page_length
+
+    return {
+        "rows": ordered[start:start + page_length],
+        "total": len(ordered),
+        "page": page,
+        "page_length": page_length,
+        "total_outstanding": sum(flt(r.get("outstanding_amount")) for r in ordered),
+    }
+
+# ---------------- invalidation ----------------
+
+def clear_outstanding_cache(doc, method=None):
+    """Sales Invoice / Payment Entry on_submit / on_cancel: the party's outstanding changed."""
+    if doc.doctype == "Sales Invoice":
+        party_type, party = "Customer", doc.get("customer")
+    else:
+        party_type, party = doc.get("party_type"), doc.get("party")
+    if party_type and party:
+        frappe.cache().delete_keys(_party_prefix(doc.company, party_type, party))
@@ -0,0 +1,253 @@
+# sriaas_clinic/api/print_cache.py
+"""
+Content-addressed disk cache for rendered print output (HTML / PDF).
+
+Only submitted documents of the app's print doctypes (bulk_print.PRINT_FORMATS) are
+cached. The key is (doctype, name, modified, print format hash, letterhead, language,
+linked rows); "linked rows" is the `modified` of every row outside the document that the
+format's print context (print_context.py) reads - company, customer, addresses, bank
+accounts, patient, medication template - so editing one of them only retires the renders
+that show it.
+Files live under <site>/private/sr_print_cache and are evicted least-recently-used once
+the directory exceeds `sr_print_cache_max_mb` (site config); the size check runs at most
+once every EVICT_INTERVAL seconds.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import nullcontext
+
+import frappe
+
+CACHE_SUBDIR = "sr_print_cache"
+DEFAULT_MAX_MB = 512
+EVICT_TO_RATIO = 0.9  # after eviction, keep the cache at 90% of the limit
+EVICT_INTERVAL = 60  # seconds between directory scans
+FORMAT_HASH_KEY = "sr_print_format_hash"  # redis hash: print format -> content hash
+EVICT_LOCK_KEY = "sr_print_cache_evicted"  # redis: set while an eviction ran recently
+UNCACHED_PDF_OPTIONS = ("settings", "pdf_generator")  # download_pdf args that bypass the cache
+
+# ---------------- disk store ----------------
+
+def _cache_dir() -> str:
+    path = frappe.get_site_path("private", CACHE_SUBDIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _max_bytes() -> int:
+    return int(frappe.conf.get("sr_print_cache_max_mb") or DEFAULT_MAX_MB) * 1024 * 1024
+
+def _path(key: str, ext: str) -> str:
+    return os.path.join(_cache_dir(), f"{key}.{ext}")
+
+def get(key: str, ext: str) -> bytes | None:
+    """Return cached bytes (and mark them recently used) or None."""
+    path = _path(key, ext)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)  # mtime doubles as LRU timestamp
+    except OSError:
+        pass
+    return data
+
+def put(key: str, ext: str, data: bytes) -> None:
+    """Atomically write `data`, then (throttled) evict LRU entries if the cache is over its limit."""
+    folder = _cache_dir()
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, _path(key, ext))
+    _evict(folder)
+
+def delete(key: str, ext: str) -> None:
+    try:
+        os.remove(_path(key, ext))
+    except FileNotFoundError:
+        pass
+
+def _evict(folder: str) -> None:
+    cache = frappe.cache()
+    if cache.get_value(EVICT_LOCK_KEY):
+        return
+    cache.set_value(EVICT_LOCK_KEY, 1, expires_in_sec=EVICT_INTERVAL)
+
+    entries = []
+    total = 0
+    for e in os.scandir(folder):
+        if not e.is_file() or e.name.endswith(".tmp"):
+            continue
+        st = e.stat()
+        entries.append((st.st_mtime, st.st_size, e.path))
+        total += st.st_size
+
+    limit = _max_bytes()
+    if total <= limit:
+        return
+
+    target = int(limit * EVICT_TO_RATIO)
+    for _mtime, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= target:
+            break
+
+def clear() -> None:
+    """Drop every cached render (bench execute sriaas_clinic.api.print_cache.clear)."""
+    for e in os.scandir(_cache_dir()):
+        if e.is_file():
+            os.remove(e.path)
+
+# ---------------- keys ----------------
+
+def _format_hash(print_format: str) -> str | None:
+    h = frappe.cache().hget(FORMAT_HASH_KEY, print_format)
+    if h is None:
+        pf = frappe.db.get_value("Print Format", print_format, ["html", "css", "modified"], as_dict=True)
+        if not pf:
+            return None
+        raw = f"{pf.html or ''}\x00{pf.css or ''}\x00{pf.modified}"
+        h = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        frappe.cache().hset(FORMAT_HASH_KEY, print_format, h)
+    return h
+
+def clear_format_hash(doc=None, method=None):
+    """Print Format.on_update / on_trash: the next render gets a fresh hash (old entries age out)."""
+    if doc is not None:
+        frappe.cache().hdel(FORMAT_HASH_KEY, doc.name)
+    else:
+        frappe.cache().delete_value(FORMAT_HASH_KEY)
+
+def _address_links(link_doctype: str, link_field: str) -> str:
+    return f"""(
+        SELECT MAX(a.modified) FROM `tabAddress` a
+        JOIN `tabDynamic Link` dl ON dl.parent = a.name AND dl.parenttype = 'Address'
+        WHERE dl.link_doctype = '{link_doctype}' AND dl.link_name = {link_field}
+    )"""
+
+def _linked_rows_sql(doctype: str) -> str:
+    """One `modified` stamp per linked source the doctype's print context reads."""
+    if doctype == "Sales Invoice":
+        parts = [
+            "(SELECT modified FROM `tabCompany` WHERE name = d.company)",
+            "(SELECT modified FROM `tabCustomer` WHERE name = d.customer)",
+            """(SELECT MAX(modified) FROM `tabAddress`
+                WHERE name IN (d.customer_address, d.shipping_address_name, d.company_address))""",
+            _address_links("Company", "d.company"),  # company default address
+            "(SELECT MAX(modified) FROM `tabBank Account` WHERE company = d.company)",
+        ]
+    else:  # Patient Encounter
+        parts = [
+            "(SELECT modified FROM `tabPatient` WHERE name = d.patient)",
+            _address_links("Patient", "d.patient"),
+        ]
+        if frappe.db.has_column(doctype, "sr_medication_template"):
+            parts.append("(SELECT modified FROM `tabSR Medication Template` WHERE name = d.sr_medication_template)")
+    return f"SELECT CONCAT_WS('|', {', '.join(parts)}) FROM `tab{doctype}` d WHERE d.name = %s"
+
+def _linked_rows_stamp(doctype: str, name: str) -> str:
+    rows = frappe.db.sql(_linked_rows_sql(doctype), (name,))
+    return (rows[0][0] or "") if rows else ""
+
+def _resolve_format(doctype: str, print_format: str | None) -> str | None:
+    return print_format or frappe.get_meta(doctype).default_print_format
+
+def cache_key(doctype: str, name: str, print_format: str | None, letterhead=None, no_letterhead=0, language=None) -> str | None:
+    """Key for a submitted document's render, or None if it must not be cached."""
+    from .bulk_print import PRINT_FORMATS
+
+    if doctype not in PRINT_FORMATS:
+        return None
+    print_format = _resolve_format(doctype, print_format)
+    if not print_format or print_format == "Standard":
+        return None
+    row = frappe.db.get_value(doctype, name, ["docstatus", "modified"], as_dict=True)
+    if not row or row.docstatus != 1:
+        return None
+    pf_hash = _format_hash(print_format)
+    if not pf_hash:
+        return None
+    raw = "|".join(str(p) for p in (
+        doctype, name, row.modified, print_format, pf_hash,
+        letterhead or "", int(no_letterhead or 0), language or frappe.local.lang,
+        _linked_rows_stamp(doctype, name),
+    ))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# ---------------- cached renders ----------------
+
+def get_print_pdf(doctype: str, name: str, print_format: str | None = None,
+                  letterhead=None, no_letterhead=0, language=None) -> bytes:
+    """PDF bytes for a document, served from cache for unchanged submitted docs."""
+    frappe.has_permission(doctype, "print", name, throw=True)
+    return _cached_render(doctype, name, print_format, letterhead, no_letterhead, language, as_pdf=True)
+
+def get_print_html(doctype: str, name: str, print_format: str | None = None,
+                   letterhead=None, no_letterhead=0, language=None) -> str:
+    """Rendered HTML for a document, served from cache for unchanged submitted docs."""
+    frappe.has_permission(doctype, "print", name, throw=True)
+    data = _cached_render(doctype, name, print_format, letterhead, no_letterhead, language, as_pdf=False)
+    return data.decode("utf-8")
+
+def _cached_render(doctype, name, print_format, letterhead, no_letterhead, language, as_pdf: bool, doc=None) -> bytes:
+    """Callers check permissions."""
+    ext = "pdf" if as_pdf else "html"
+    key = cache_key(doctype, name, print_format, letterhead, no_letterhead, language)
+    if key:
+        hit = get(key, ext)
+        if hit is not None:
+            return hit
+
+    out = _render(doctype, name, print_format, letterhead, no_letterhead, language, as_pdf, doc)
+    data = out if as_pdf else out.encode("utf-8")
+
+    if key:
+        put(key, ext, data)
+    return data
+
+def _render(doctype, name, print_format, letterhead, no_letterhead, language, as_pdf, doc=None):
+    from frappe.translate import print_language
+
+    with print_language(language) if language else nullcontext():
+        return frappe.get_print(
+            doctype, name,
+            print_format=_resolve_format(doctype, print_format),
+            doc=doc,
+            as_pdf=as_pdf,
+            letterhead=letterhead,
+            no_letterhead=no_letterhead,
+        )
+
+@frappe.whitelist(allow_guest=True)
+def download_pdf(doctype, name, format=None, doc=None, no_letterhead=0, language=None, letterhead=None, **kwargs):
+    """
+    Override of frappe.utils.print_format.download_pdf: the app's print doctypes are served
+    from the render cache, everything else (unsaved docs, PDF options such as `settings` /
+    `pdf_generator`, which the cache key does not cover) goes to the stock function with
+    all arguments.
+    Permissions are checked like the stock one (read/print, website permission or a
+    shared `key`), so guest links keep working.
+    """
+    from frappe.utils.print_format import download_pdf as _download_pdf
+    from frappe.www.printview import validate_print_permission
+
+    from .bulk_print import PRINT_FORMATS
+
+    if doc or doctype not in PRINT_FORMATS or any(kwargs.get(k) for k in UNCACHED_PDF_OPTIONS):
+        return _download_pdf(doctype, name, format=format, doc=doc, no_letterhead=no_letterhead,
+                             language=language, letterhead=letterhead, **kwargs)
+
+    doc = frappe.get_doc(doctype, name)
+    validate_print_permission(doc)
+
+    frappe.local.response.filename = "{name}.pdf".format(name=name.replace(" ", "-").replace("/", "-"))
+    frappe.local.response.filecontent = _cached_render(
+        doctype, name, format, letterhead, no_letterhead, language, as_pdf=True, doc=doc,
+    )
+    frappe.local.response.type = "pdf"
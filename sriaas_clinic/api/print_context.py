@@ -0,0 +1,287 @@
+# sriaas_clinic/api/print_context.py
+"""
+Pre-resolved contexts for the app's Jinja print formats.
+
+Print formats call these through the `jinja.methods` hook instead of running
+frappe.get_doc / get_all inside the template:
+  {% set ctx = sr_sales_invoice_print_context(doc) %}
+  {% set ctx = sr_patient_encounter_print_context(doc) %}
+
+Company-level data (company fields, default address, bank details) is cached
+per company and dropped whenever a Company, Address or Bank Account changes.
+"""
+import time
+
+import frappe
+from frappe.utils import cint
+
+COMPANY_CACHE_PREFIX = "sr_print_ctx_company::"
+COMPANY_CACHE_TTL = 6 * 60 * 60  # seconds
+
+ADDRESS_FIELDS = (
+    "name", "address_title", "address_type", "address_line1", "address_line2",
+    "city", "state", "pincode", "country", "gstin", "gstin_uin", "gst_state_number",
+)
+COMPANY_FIELDS = (
+    "name", "company_logo", "default_currency", "default_bank_account",
+    "email_id", "company_email", "cin", "company_cin", "custom_cin",
+)
+CUSTOMER_FIELDS = ("mobile_no", "phone", "email_id")
+PATIENT_FIELDS = (
+    "patient_name", "sr_patient_id", "sex", "sr_patient_age", "dob", "blood_group",
+    "mobile_no", "phone", "email", "email_id",
+)
+BANK_ACCOUNT_FIELDS = ("name", "branch_code", "ifsc_code", "bank_account_no", "bank", "branch")
+
+def _existing(doctype: str, fields) -> list[str]:
+    """Keep only fields that exist on this site (regional apps add/remove some)."""
+    meta = frappe.get_meta(doctype)
+    valid = set(meta.get_valid_columns())
+    return [f for f in fields if f in valid]
+
+def _get_addresses(names) -> dict:
+    """{address_name: row} for all given Address names in one query."""
+    names = list({n for n in names if n})
+    if not names:
+        return {}
+    rows = frappe.get_all(
+        "Address",
+        filters={"name": ["in", names]},
+        fields=_existing("Address", ADDRESS_FIELDS),
+    )
+    return {r.name: r for r in rows}
+
+# ---------------- Company (cached) ----------------
+
+def _company_default_address(company: str):
+    rows = frappe.get_all(
+        "Dynamic Link",
+        filters={"parenttype": "Address", "link_doctype": "Company", "link_name": company},
+        fields=["parent"],
+        limit=1,
+    )
+    return rows[0].parent if rows else None
+
+def _company_bank_account(company: str, ledger):
+    fields = _existing("Bank Account", BANK_ACCOUNT_FIELDS)
+    ba = None
+    if ledger:
+        ba = frappe.db.get_value("Bank Account", {"account": ledger, "company": company}, fields, as_dict=True)
+    if not ba:
+        ba = frappe.db.get_value("Bank Account", {"is_default": 1, "company": company}, fields, as_dict=True)
+    return ba
+
+def _build_company_context(company: str) -> dict:
+    co = frappe.db.get_value("Company", company, _existing("Company", COMPANY_FIELDS), as_dict=True) or frappe._dict()
+    addr_name = _company_default_address(company)
+    return {
+        "company": co,
+        "default_address_name": addr_name,
+        "default_address": _get_addresses([addr_name]).get(addr_name) if addr_name else None,
+        "bank_account": _company_bank_account(company, co.get("default_bank_account")),
+    }
+
+def get_company_context(company: str) -> frappe._dict:
+    """Company fields + default address + bank account, cached per company."""
+    if not company:
+        return frappe._dict()
+    key = f"{COMPANY_CACHE_PREFIX}{company}"
+    ctx = frappe.cache().get_value(key)
+    if ctx is None:
+        ctx = _build_company_context(company)
+        frappe.cache().set_value(key, ctx, expires_in_sec=COMPANY_CACHE_TTL)
+    return frappe._dict(ctx)
+
+def clear_company_context(doc=None, method=None):
+    """doc_events hook (Company / Address / Bank Account): drop cached company contexts."""
+    if doc is not None and doc.doctype == "Address":
+        # patient/customer addresses are saved all day; only company addresses matter here
+        if not any(l.link_doctype == "Company" for l in (doc.get("links") or [])):
+            return
+    frappe.cache().delete_keys(COMPANY_CACHE_PREFIX)
+
+# ---------------- Sales Invoice New ----------------
+
+def sr_sales_invoice_print_context(doc) -> frappe._dict:
+    """Everything "Sales Invoice New" needs beyond `doc`, in a few batched queries."""
+    cc = get_company_context(doc.company)
+    co = cc.get("company") or frappe._dict()
+
+    # Invoice-specific addresses in one query (company address only if not the cached default)
+    wanted = [doc.get("customer_address"), doc.get("shipping_address_name")]
+    comp_addr_name = doc.get("company_address") or cc.get("default_address_name")
+    if comp_addr_name and comp_addr_name != cc.get("default_address_name"):
+        wanted.append(comp_addr_name)
+    addresses = _get_addresses(wanted)
+    if cc.get("default_address"):
+        addresses.setdefault(cc["default_address_name"], cc["default_address"])
+
+    comp_addr = addresses.get(comp_addr_name) if comp_addr_name else None
+    comp_addr = comp_addr or frappe._dict()
+
+    cust = frappe._dict()
+    if doc.get("customer"):
+        cust = frappe.db.get_value("Customer", doc.customer, _existing("Customer", CUSTOMER_FIELDS), as_dict=True) or cust
+
+    # Place of supply: invoice fields first, else billing address state
+    pos_name = doc.get("place_of_supply") or doc.get("billing_address_gst_state")
+    pos_code = doc.get("billing_address_gst_state_number")
+    if not pos_name and doc.get("customer_address"):
+        addr_po = addresses.get(doc.customer_address) or frappe._dict()
+        pos_name = addr_po.get("state") or pos_name
+        pos_code = addr_po.get("gst_state_number") or pos_code
+
+    return frappe._dict({
+        "company": co,
+        "logo": co.get("company_logo"),
+        "currency": doc.get("currency") or co.get("default_currency") or "INR",
+        "comp_addr": comp_addr,
+        "company_email": co.get("email_id") or co.get("company_email") or "accounts@sriaas.com",
+        "company_cin": co.get("cin") or co.get("company_cin") or co.get("custom_cin") or "",
+        "company_gstin": doc.get("company_gstin") or comp_addr.get("gstin") or "",
+        "addresses": addresses,
+        "customer_mobile": doc.get("contact_mobile") or cust.get("mobile_no") or "",
+        "customer_phone": doc.get("contact_phone") or cust.get("phone") or "",
+        "customer_email": doc.get("contact_email") or cust.get("email_id") or "",
+        "pos_name": pos_name,
+        "pos_code": pos_code,
+        "bank_account": cc.get("bank_account"),
+    })
+
+# ---------------- Patient Encounter New ----------------
+
+# (label, child table field, practitioner name field) in print order
+PRESCRIPTION_TABLES = (
+    ("Ayurvedic", "drug_prescription", "sr_ayurvedic_practitioner_name"),
+    ("Homeopathy", "sr_homeopathy_drug_prescription", "sr_homeopathy_practitioner_name"),
+    ("Allopathy", "sr_allopathy_drug_prescription", "sr_allopathy_practitioner_name"),
+)
+DRUG_NAME_FIELDS = (
+    "sr_medication_name_print", "medication_name", "drug_name", "medication", "drug", "item_name", "drug_code",
+)
+
+def _patient_with_address(patient: str):
+    """(patient row, address row) for the encounter's patient in a single query."""
+    p_cols = _existing("Patient", PATIENT_FIELDS)
+    a_cols = _existing("Address", ADDRESS_FIELDS)
+    select = ", ".join(
+        [f"p.`{c}` AS `{c}`" for c in p_cols] + [f"a.`{c}` AS `addr_{c}`" for c in a_cols]
+    )
+    rows = frappe.db.sql(
+        f"""
+        SELECT {select}
+        FROM `tabPatient` p
+        LEFT JOIN `tabAddress` a ON a.name = (
+            SELECT dl.parent FROM `tabDynamic Link` dl
+            WHERE dl.parenttype = 'Address' AND dl.parentfield = 'links'
+              AND dl.link_doctype = 'Patient' AND dl.link_name = p.name
+            LIMIT 1
+        )
+        WHERE p.name = %s
+        """,
+        (patient,),
+        as_dict=True,
+    )
+    if not rows:
+        return frappe._dict(), None
+    row = rows[0]
+    pat = frappe._dict({c: row.get(c) for c in p_cols})
+    addr = frappe._dict({c: row.get(f"addr_{c}") for c in a_cols})
+    return pat, (addr if addr.get("name") else None)
+
+def _first(row, fields):
+    for f in fields:
+        if row.get(f):
+            return row.get(f)
+    return None
+
+def _prescription_rows(rows, labels=None) -> list:
+    """
+    Display-ready rows (drug/dose/period/form/instr); empty rows are dropped.
+    `labels` ({medication: label} from the encounter's medication template) fills rows
+    that have no sr_medication_name_print.
+    """
+    labels = labels or {}
+    out = []
+    for row in rows or []:
+        if row.get("period") is not None:
+            period = f"{row.get('period')} {row.get('period_uom') or ''}".strip()
+        else:
+            period = row.get("duration") or row.get("custom_period")
+        r = frappe._dict({
+            "drug_name": row.get("sr_medication_name_print") or labels.get(row.get("medication"))
+                         or _first(row, DRUG_NAME_FIELDS) or "-",
+            "dose": _first(row, ("dosage", "dosage_display", "custom_dosage")) or "-",
+            "period": period or "-",
+            "form": _first(row, ("form", "dosage_form", "drug_form")) or "-",
+            "instr": _first(row, ("sr_drug_instruction", "instructions", "remarks", "custom_instruction")) or "-",
+        })
+        if any(v != "-" for v in r.values()):
+            out.append(r)
+    return out
+
+def sr_patient_encounter_print_context(doc) -> frappe._dict:
+    """Everything "Patient Encounter New" needs beyond `doc`: one query for patient + address."""
+    pat, addr = _patient_with_address(doc.patient) if doc.get("patient") else (frappe._dict(), None)
+
+    from .medication_template import TABLE as TEMPLATE_TABLE
+    from .medication_template import print_labels
+
+    template_labels = print_labels(doc.sr_medication_template) if doc.get("sr_medication_template") else {}
+
+    prescriptions = []
+    for label, table, prac_field in PRESCRIPTION_TABLES:
+        practitioner = doc.get(prac_field) or ""
+        rows = doc.get(table) or []
+        # same rule as before: a section needs a practitioner and at least one named drug
+        if not practitioner or not any(_first(r, DRUG_NAME_FIELDS) for r in rows):
+            continue
+        prescriptions.append(frappe._dict({
+            "label": label,
+            "practitioner": practitioner,
+            "rows": _prescription_rows(rows, template_labels if table == TEMPLATE_TABLE else None),
+        }))
+
+    return frappe._dict({
+        "patient_name": doc.get("patient_name") or pat.get("patient_name") or "",
+        "uhid": doc.get("sr_pe_id") or pat.get("sr_patient_id") or doc.get("patient") or "",
+        "sex": doc.get("patient_sex") or pat.get("sex") or "",
+        "age_text": doc.get("sr_pe_age") or pat.get("sr_patient_age") or "",
+        "dob": pat.get("dob") or "",
+        "blood_group": pat.get("blood_group") or "",
+        "address": addr,
+        "phone": pat.get("mobile_no") or pat.get("phone") or "",
+        "email": pat.get("email") or pat.get("email_id") or "",
+        "prescriptions": prescriptions,
+    })
+
+# ---------------- Measurement ----------------
+
+def benchmark_print(doctype: str, name: str, print_format: str | None = None, runs: int = 5) -> dict:
+    """
+    Render a print format `runs` times and report wall time + SQL statements per render.
+      bench --site <site> execute sriaas_clinic.api.print_context.benchmark_print \
+        --kwargs "{'doctype': 'Sales Invoice', 'name': 'ACC-SINV-2025-00001'}"
+    Run it before and after a template change to compare. Statements come from the
+    connection's 'Questions' counter (MariaDB), so nothing in frappe is patched.
+    """
+    def questions() -> int:
+        return cint(frappe.db.sql("SHOW SESSION STATUS LIKE 'Questions'")[0][1])
+
+    runs = max(int(runs or 1), 1)
+    timings, queries = [], []
+    for _ in range(runs):
+        before = questions()
+        start = time.perf_counter()
+        frappe.get_print(doctype, name, print_format=print_format)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(questions() - before - 1)  # the second SHOW STATUS counts itself
+
+    return {
+        "print_format": print_format,
+        "runs": runs,
+        "avg_ms": round(sum(timings) / runs, 2),
+        "min_ms": round(min(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "avg_queries": round(sum(queries) / runs, 1),
+    }
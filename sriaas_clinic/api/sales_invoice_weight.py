@@ -0,0 +1,114 @@
+# sriaas_clinic/api/sales_invoice_weight.py
+import frappe
+from frappe.utils import flt, now
+
+CACHE_KEY = "sr_item_applied_weight"  # redis hash: item_code -> sr_pkg_applied_weight
+
+SI_F_TOTAL_WEIGHT = "sr_si_total_applied_weight"
+SI_F_PACKAGE_COUNT = "sr_si_package_count"
+
+def get_item_weights(item_codes) -> dict:
+    """
+    Return {item_code: applied weight (kg)} from the cached item->weight map.
+    Misses are fetched with a single query and written back to the cache.
+    """
+    codes = {c for c in (item_codes or []) if c}
+    if not codes:
+        return {}
+
+    cache = frappe.cache()
+    weights, missing = {}, []
+    for code in codes:
+        w = cache.hget(CACHE_KEY, code)
+        if w is None:
+            missing.append(code)
+        else:
+            weights[code] = w
+
+    if missing:
+        rows = frappe.get_all(
+            "Item",
+            filters={"name": ["in", missing]},
+            fields=["name", "sr_pkg_applied_weight"],
+        )
+        found = {r.name: flt(r.sr_pkg_applied_weight) for r in rows}
+        for code in missing:
+            weights[code] = found.get(code, 0.0)
+            cache.hset(CACHE_KEY, code, weights[code])
+
+    return weights
+
+def _row_qty(it) -> float:
+    return flt(it.get("stock_qty")) or flt(it.get("qty"))
+
+def before_save(doc, method=None):
+    """Roll up total applied weight + package count on Sales Invoice before save."""
+    items = doc.get("items") or []
+    weights = get_item_weights([it.item_code for it in items])
+
+    total_weight = 0.0
+    packages = 0.0
+    for it in items:
+        w = weights.get(it.item_code) or 0.0
+        if w <= 0:
+            continue
+        qty = _row_qty(it)
+        total_weight += qty * w
+        packages += qty
+
+    doc.set(SI_F_TOTAL_WEIGHT, round(total_weight, 3))
+    doc.set(SI_F_PACKAGE_COUNT, round(packages))
+
+def on_item_update(doc, method=None):
+    """Item.on_update: refresh cached weight and re-roll open invoices using this Item."""
+    if not doc.has_value_changed("sr_pkg_applied_weight"):
+        return
+    frappe.cache().hset(CACHE_KEY, doc.name, flt(doc.get("sr_pkg_applied_weight")))
+    sync_invoices_for_items([doc.name])
+
+def invalidate_item_weights(item_codes=None):
+    """Drop cached weights for the given Items (or the whole map)."""
+    if item_codes is None:
+        frappe.cache().delete_value(CACHE_KEY)
+        return
+    for code in item_codes:
+        frappe.cache().hdel(CACHE_KEY, code)
+
+def sync_invoices_for_items(item_codes):
+    """
+    Recompute the weight rollup for every Sales Invoice containing any of `item_codes`.
+    Only drafts and submitted invoices not yet booked with a courier (no AWB) are touched;
+    booked/cancelled invoices keep the weight they were shipped with. Only invoices whose
+    rollup actually changes are written; submitted ones get a new `modified`, which also
+    retires their cached prints (api/print_cache.py keys on it). Drafts keep theirs so open
+    forms don't hit a timestamp mismatch; before_save recomputes the rollup anyway.
+    """
+    codes = [c for c in (item_codes or []) if c]
+    if not codes:
+        return
+
+    frappe.db.sql(
+        f"""
+        UPDATE `tabSales Invoice` si
+        JOIN (
+            SELECT sii.parent,
+                   SUM(IF(sii.stock_qty > 0, sii.stock_qty, sii.qty) * IFNULL(i.sr_pkg_applied_weight, 0)) AS weight,
+                   SUM(IF(IFNULL(i.sr_pkg_applied_weight, 0) > 0, IF(sii.stock_qty > 0, sii.stock_qty, sii.qty), 0)) AS packages
+            FROM `tabSales Invoice Item` sii
+            LEFT JOIN `tabItem` i ON i.name = sii.item_code
+            WHERE sii.parenttype = 'Sales Invoice'
+              AND sii.parent IN (
+                  SELECT DISTINCT parent FROM `tabSales Invoice Item`
+                  WHERE parenttype = 'Sales Invoice' AND item_code IN ({", ".join(["%s"] * len(codes))})
+              )
+            GROUP BY sii.parent
+        ) t ON t.parent = si.name
+        SET si.modified = IF(si.docstatus = 1, %s, si.modified),
+            si.{SI_F_TOTAL_WEIGHT} = ROUND(t.weight, 3),
+            si.{SI_F_PACKAGE_COUNT} = ROUND(t.packages)
+        WHERE si.docstatus < 2
+          AND IFNULL(si.sr_si_awb_no, '') = ''
+          AND NOT (si.{SI_F_TOTAL_WEIGHT} <=> ROUND(t.weight, 3) AND si.{SI_F_PACKAGE_COUNT} <=> ROUND(t.packages))
+        """,
+        (*codes, now()),
+    )
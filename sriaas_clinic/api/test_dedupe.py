@@ -0,0 +1,45 @@
+# sriaas_clinic/api/test_dedupe.py
+"""keys_for() (before_save) and key_expressions() (backfill) must produce the same keys."""
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sriaas_clinic.api.dedupe import KEY_SOURCES, email_key, key_expressions, keys_for, phone_key
+
+# (first phone field, second phone field, email field)
+SAMPLES = (
+    ("+91 98765-43210", None, "Foo@Example.COM"),
+    ("098765 43210", "", "  foo@example.com  "),
+    ("(022) 2345 6789 ext 12", "9876543210", "\tbar@example.com\n"),
+    ("12345", "+1 (415) 555-0100", ""),
+    ("", "1234567", None),
+    (None, None, "   "),
+    ("abc", "٩٨٧٦٥٤٣٢١٠", "MiXeD@Case.Org"),
+)
+
+class TestDedupeKeys(FrappeTestCase):
+    def test_phone_key(self):
+        self.assertEqual(phone_key("+91 98765-43210"), "9876543210")
+        self.assertEqual(phone_key("1234567"), "1234567")
+        self.assertIsNone(phone_key("123456"))
+        self.assertIsNone(phone_key(None))
+        self.assertIsNone(phone_key("٩٨٧٦٥٤٣٢١٠"))  # non-ASCII digits are not digits for the key
+
+    def test_email_key(self):
+        self.assertEqual(email_key("  Foo@Example.COM\n"), "foo@example.com")
+        self.assertIsNone(email_key("   "))
+        self.assertIsNone(email_key(None))
+
+    def test_sql_expressions_match_keys_for(self):
+        for doctype, (phone_fields, email_fields) in KEY_SOURCES.items():
+            if not frappe.db.table_exists(doctype):
+                continue
+            phones = [f for f in phone_fields if frappe.db.has_column(doctype, f)]
+            emails = [f for f in email_fields if frappe.db.has_column(doctype, f)]
+            phone_sql, email_sql = key_expressions(doctype)
+            for sample in SAMPLES:
+                values = dict(zip(phones, sample[:2], strict=False))
+                values.update(dict.fromkeys(emails, sample[2]))
+                # a one-row derived table with the doctype's column names
+                columns = ", ".join(f"%({f})s AS `{f}`" for f in values) or "NULL AS `_`"
+                row = frappe.db.sql(f"SELECT {phone_sql}, {email_sql} FROM (SELECT {columns}) t", values)[0]
+                self.assertEqual(tuple(row), keys_for(doctype, values), f"{doctype}: {sample!r}")
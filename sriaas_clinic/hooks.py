@@ -30,23 +30,43 @@ fixtures = [
     {"dt": "Custom DocPerm", "filters": [["module", "=", "SRIAAS Clinic"]]},
 ]
 
+# Boot bundle of SR masters (sriaas_clinic.api.master_data); keep in step with BOOT_MASTERS
+_master_change_events = {
+    "on_update": "sriaas_clinic.api.master_data.on_master_change",
+    "on_trash": "sriaas_clinic.api.master_data.on_master_change",
+    "after_rename": "sriaas_clinic.api.master_data.on_master_change",
+}
+
 doc_events = {
+    "SR Lead Disposition": _master_change_events,
+    "SR Sales Type": _master_change_events,
+    "SR Delivery Type": _master_change_events,
+    "SR Lead Source": _master_change_events,
+    "SR Encounter Status": _master_change_events,
+    "SR State": _master_change_events,
+    "SR Practitioner Pathy": _master_change_events,
     "Customer": {
         "before_insert": "sriaas_clinic.api.customer.set_sr_customer_id",
         "before_save":   "sriaas_clinic.api.customer.normalize_phoneish_fields",
     },
     "Patient": {
         "before_insert": "sriaas_clinic.api.patient.set_sr_patient_id",
-        "before_save":   "sriaas_clinic.api.patient.normalize_phoneish_fields",
+        "before_save": [
+            "sriaas_clinic.api.patient.normalize_phoneish_fields",
+            "sriaas_clinic.api.patient_summary.before_patient_save",
+        ],
         "after_insert": [
             "sriaas_clinic.api.patient.assign_followup_day",
             "sriaas_clinic.api.patient.set_followup_last_digit",
         ],
         "after_save": "sriaas_clinic.api.address.mirror_links_to_customer",
+        "on_update": "sriaas_clinic.api.patient_ledger.on_patient_update",
     },
     "Address": {
         "before_validate": "sriaas_clinic.api.address.validate_state",
         "before_save": "sriaas_clinic.api.address.ensure_address_has_customer_link",
+        "on_update": "sriaas_clinic.api.print_context.clear_company_context",
+        "on_trash": "sriaas_clinic.api.print_context.clear_company_context",
     },
     "Contact": {
         "before_save": "sriaas_clinic.api.contact.normalize_phoneish_fields",
@@ -56,24 +76,103 @@ doc_events = {
     },
     "Item": {
         "validate": "sriaas_clinic.api.item_package_weight.calculate_pkg_weights",
+        "on_update": [
+            "sriaas_clinic.api.sales_invoice_weight.on_item_update",
+            "sriaas_clinic.api.order_item.clear_item_info",
+        ],
+        "on_trash": "sriaas_clinic.api.order_item.clear_item_info",
+        "after_rename": "sriaas_clinic.api.order_item.clear_item_info",
+    },
+    "Item Price": {
+        "on_update": "sriaas_clinic.api.order_item.clear_item_price_info",
+        "on_trash": "sriaas_clinic.api.order_item.clear_item_price_info",
     },
     "Patient Encounter": {
         "before_save": "sriaas_clinic.api.encounter_flow.handlers.before_save_patient_encounter",
-        "on_update":   "sriaas_clinic.api.encounter_flow.handlers.create_billing_on_save",
+        "validate": "sriaas_clinic.api.medication.validate_prescription_classes",
+        "on_update": [
+            "sriaas_clinic.api.encounter_flow.handlers.create_billing_on_save",
+            "sriaas_clinic.api.patient_summary.on_encounter_update",
+        ],
     },
     "Sales Invoice": {
-        "before_save": "sriaas_clinic.api.sales_invoice_cost.before_save",
-        "on_submit": "sriaas_clinic.api.encounter_flow.handlers.link_pending_payment_entries",
+        "before_save": [
+            "sriaas_clinic.api.sales_invoice_cost.before_save",
+            "sriaas_clinic.api.sales_invoice_weight.before_save",
+        ],
+        "on_submit": [
+            "sriaas_clinic.api.encounter_flow.handlers.link_pending_payment_entries",
+            "sriaas_clinic.api.patient_ledger.on_sales_invoice_change",
+            "sriaas_clinic.api.patient_summary.on_sales_invoice_change",
+            "sriaas_clinic.api.payment_entry.clear_outstanding_cache",
+            "sriaas_clinic.api.campaign_attribution.on_sales_invoice_submit",
+        ],
+        "on_cancel": [
+            "sriaas_clinic.api.patient_ledger.on_sales_invoice_change",
+            "sriaas_clinic.api.patient_summary.on_sales_invoice_change",
+            "sriaas_clinic.api.payment_entry.clear_outstanding_cache",
+            "sriaas_clinic.api.campaign_attribution.on_sales_invoice_cancel",
+        ],
+    },
+    "Payment Entry": {
+        "on_submit": [
+            "sriaas_clinic.api.patient_ledger.on_payment_entry_change",
+            "sriaas_clinic.api.patient_summary.on_payment_change",
+            "sriaas_clinic.api.payment_entry.clear_outstanding_cache",
+        ],
+        "on_cancel": [
+            "sriaas_clinic.api.patient_ledger.on_payment_entry_change",
+            "sriaas_clinic.api.patient_summary.on_payment_change",
+            "sriaas_clinic.api.payment_entry.clear_outstanding_cache",
+        ],
+    },
+    "Journal Entry": {
+        "on_submit": [
+            "sriaas_clinic.api.patient_summary.on_payment_change",
+            "sriaas_clinic.api.patient_ledger.on_journal_entry_change",
+        ],
+        "on_cancel": [
+            "sriaas_clinic.api.patient_summary.on_payment_change",
+            "sriaas_clinic.api.patient_ledger.on_journal_entry_change",
+        ],
     },
     "CRM Lead": {
         "before_save": "sriaas_clinic.api.crm_lead.normalize_phoneish_fields",
+        "on_update": [
+            "sriaas_clinic.api.lead_funnel.on_lead_update",
+            "sriaas_clinic.api.campaign_attribution.on_lead_update",
+        ],
+        "on_trash": "sriaas_clinic.api.lead_funnel.on_lead_trash",
+    },
+    "Medication": {
+        "on_update": "sriaas_clinic.api.medication.clear_medication_class_map",
+        "on_trash": "sriaas_clinic.api.medication.clear_medication_class_map",
+        "after_rename": "sriaas_clinic.api.medication.clear_medication_class_map",
+    },
+    "SR Medication Template": {
+        "on_update": "sriaas_clinic.api.medication_template.clear_compiled_template",
+        "on_trash": "sriaas_clinic.api.medication_template.clear_compiled_template",
+        "after_rename": "sriaas_clinic.api.medication_template.clear_compiled_template",
+    },
+    # Cached print contexts (sriaas_clinic.api.print_context)
+    "Company": {
+        "on_update": "sriaas_clinic.api.print_context.clear_company_context",
+    },
+    "Print Format": {
+        "on_update": "sriaas_clinic.api.print_cache.clear_format_hash",
+        "on_trash": "sriaas_clinic.api.print_cache.clear_format_hash",
+    },
+    "Bank Account": {
+        "on_update": "sriaas_clinic.api.print_context.clear_company_context",
+        "on_trash": "sriaas_clinic.api.print_context.clear_company_context",
     },
 }
 
 doctype_js = {
     "Patient": [
-        "public/js/patient_invoices.js",
-        "public/js/patient_payments.js",
+        # "public/js/patient_invoices.js",
+        # "public/js/patient_payments.js",
+        "public/js/patient_ledger.js",
         "public/js/patient_pex_launcher.js",
         # "public/js/patient_clinical_history.js",
         "public/js/clinical_history_modal.js",
@@ -104,6 +203,7 @@ web_include_css = "/assets/sriaas_clinic/css/theme_overrides.css"
 
 app_include_js = [
     "/assets/sriaas_clinic/js/patient_quick_entry_patch.js",
+    "/assets/sriaas_clinic/js/sr_masters.js",
 ]
 
 # Load list behavior for Sales Invoice
@@ -180,10 +280,21 @@ list_js = {
 # ----------
 
 # add methods and filters to jinja environment
-# jinja = {
-# 	"methods": "sriaas_clinic.utils.jinja_methods",
-# 	"filters": "sriaas_clinic.utils.jinja_filters"
-# }
+jinja = {
+    "methods": [
+        "sriaas_clinic.api.print_context.sr_sales_invoice_print_context",
+        "sriaas_clinic.api.print_context.sr_patient_encounter_print_context",
+    ],
+}
+
+# Boot
+# ----------
+
+# extra keys on frappe.boot for every desk session
+extend_bootinfo = [
+    "sriaas_clinic.api.medication.boot_session",
+    "sriaas_clinic.api.master_data.boot_session",
+]
 
 # Installation
 # ------------
@@ -254,6 +365,12 @@ list_js = {
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+    "daily": [
+        "sriaas_clinic.api.patient_summary.reconcile_all",
+    ],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"sriaas_clinic.tasks.all"
@@ -280,9 +397,10 @@ list_js = {
 # Overriding Methods
 # ------------------------------
 #
-# override_whitelisted_methods = {
-# 	"frappe.desk.doctype.event.event.get_events": "sriaas_clinic.event.get_events"
-# }
+override_whitelisted_methods = {
+    # serve re-prints of unchanged submitted docs from sriaas_clinic's render cache
+    "frappe.utils.print_format.download_pdf": "sriaas_clinic.api.print_cache.download_pdf",
+}
 #
 # each overriding function accepts a `data` argument;
 # generated from the base implementation of the doctype dashboard,
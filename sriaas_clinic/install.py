@@ -2,7 +2,8 @@
 from .setup.runner import setup_all
 
 def after_install():
-    setup_all()
+    # fresh site: nothing is in place yet, run every step regardless of stored fingerprints
+    setup_all(force=True)
 
 def after_migrate():
     setup_all()
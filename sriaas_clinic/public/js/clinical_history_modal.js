@@ -7,15 +7,6 @@ function _esc(t) {
 function _clean(t) {
   return (t || "").replace(/<[^>]*>/g, "").replace(/&nbsp;/g, " ").trim();
 }
-function _has_notes(e) {
-  return (
-    _clean(e.sr_complaints).length ||
-    _clean(e.sr_observations).length ||
-    _clean(e.sr_investigations).length ||
-    _clean(e.sr_notes).length
-  );
-}
-
 // Global + content CSS (cards, sticky footer, etc)
 function _css_block() {
   return `
@@ -100,32 +91,20 @@ function _build_blocks(rows) {
   }).join("");
 }
 
-async function _fetch_patient(patient_name) {
-  const { message: patient = {} } = await frappe.call({
-    method: "frappe.client.get",
-    args: { doctype: "Patient", name: patient_name }
-  });
-  return patient;
-}
+const CH_METHOD = "sriaas_clinic.api.clinical_history.get_clinical_history";
+const CH_PDF_METHOD = "sriaas_clinic.api.clinical_history.download_clinical_history_pdf";
+const CH_PAGE_LENGTH = 20;
 
-async function _fetch_encounters(patient_name) {
-  const { message: allRows = [] } = await frappe.call({
-    method: "frappe.client.get_list",
-    args: {
-      doctype: "Patient Encounter",
-      filters: { patient: patient_name },
-      fields: [
-        "name", "encounter_date", "practitioner", "practitioner_name",
-        "sr_complaints", "sr_observations", "sr_investigations", "sr_notes"
-      ],
-      order_by: "encounter_date asc, creation asc",
-      limit_page_length: 1000
-    }
+// One server page: only encounters with notes, slim columns, keyset cursor
+async function _fetch_page(patient_name, cursor, with_patient) {
+  const { message = {} } = await frappe.call({
+    method: CH_METHOD,
+    args: { patient: patient_name, cursor, page_length: CH_PAGE_LENGTH, with_patient: with_patient ? 1 : 0 }
   });
-  return allRows.filter(_has_notes);
+  return message;
 }
 
-// opens a modal with history; prints same content on click
+// opens a modal with history; loads more on scroll, prints same content on click
 async function openClinicalHistoryDialog({ patient_name, current_encounter = null }) {
   try {
     if (!patient_name) {
@@ -142,7 +121,7 @@ async function openClinicalHistoryDialog({ patient_name, current_encounter = nul
     // Make dialog extra wide & tall; enable internal scrolling
     const $dlg = d.$wrapper.find(".modal-dialog");
     $dlg.addClass("modal-xl");                                // Bootstrap 5 wide
-    d.$wrapper.find(".modal-body").css({
+    const $scroller = d.$wrapper.find(".modal-body").css({
       maxHeight: "80vh",
       overflow: "auto",
       paddingBottom: 0
@@ -152,35 +131,53 @@ async function openClinicalHistoryDialog({ patient_name, current_encounter = nul
     d.$body.html("<div class='text-muted' style='padding:16px;'>Loading clinical history…</div>");
     d.show();
 
-    const [patient, rows] = await Promise.all([
-      _fetch_patient(patient_name),
-      _fetch_encounters(patient_name)
-    ]);
+    const first = await _fetch_page(patient_name, null, true);
+    const patient = first.patient || { name: patient_name };
+    const state = { cursor: first.next_cursor, pending: null };
 
     const header = _build_header(patient, current_encounter);
-    const blocks = rows.length
-      ? _build_blocks(rows)
-      : "<p class='muted' style='padding:0 16px;'>No encounters with Clinical Notes found.</p>";
+    const empty = "<p class='muted' style='padding:0 16px;'>No encounters with Clinical Notes found.</p>";
 
-    const inner = `
+    d.$body.html(`
       ${_css_block()}
       <div class="history-wrap">
         ${header}
-        ${blocks}
+        <div class="enc-list">${(first.encounters || []).length ? _build_blocks(first.encounters) : empty}</div>
+        <div class="enc-more muted" style="padding:8px 0;${state.cursor ? "" : "display:none;"}">Loading more…</div>
         <div class="dialog-actions">
           <button class="btn btn-primary" data-action="print-history">🖨️ Print</button>
           <button class="btn btn-default" data-action="close">Close</button>
         </div>
-      </div>`;
-
-    d.$body.html(inner);
+      </div>`);
+
+    const $list = d.$body.find(".enc-list");
+    const $more = d.$body.find(".enc-more");
+
+    // Returns the in-flight request if one is running, so callers can await it
+    const load_more = () => {
+      if (state.pending || !state.cursor) return state.pending;
+      state.pending = _fetch_page(patient_name, state.cursor, false)
+        .then((page) => {
+          $list.append(_build_blocks(page.encounters || []));
+          state.cursor = page.next_cursor;
+        })
+        .finally(() => {
+          state.pending = null;
+          $more.toggle(!!state.cursor);
+        });
+      return state.pending;
+    };
+
+    // Infinite scroll: fetch the next page when close to the bottom
+    $scroller.on("scroll", () => {
+      const el = $scroller.get(0);
+      if (el.scrollTop + el.clientHeight >= el.scrollHeight - 200) load_more();
+    });
 
-    // Print the same content
+    // Print: server-rendered PDF of the full history (cached until the notes change)
     d.$body.find('[data-action="print-history"]').on("click", () => {
-      const w = window.open("", "_blank");
-      w.document.write(`<html><head><title>Patient Clinical History</title></head><body>${inner}</body></html>`);
-      w.document.close();
-      setTimeout(() => { try { w.focus(); w.print(); } catch(e) {} }, 150);
+      const url = `/api/method/${CH_PDF_METHOD}?patient=${encodeURIComponent(patient_name)}`;
+      window.open(frappe.urllib.get_full_url(url), "_blank");
     });
     d.$body.find('[data-action="close"]').on("click", () => d.hide());
 
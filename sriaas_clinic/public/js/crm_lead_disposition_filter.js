@@ -32,10 +32,14 @@ frappe.ui.form.on('CRM Lead', {
       }
     }));
 
-    // Check if any dispositions exist for this status
-    frappe.db.count('SR Lead Disposition', {
-      filters: { sr_lead_status: status, is_active: 1 }
-    }).then(count => {
+    // Check if any dispositions exist for this status (boot bundle, no round trip)
+    const filters = { sr_lead_status: status, is_active: 1 };
+    const masters = window.sriaas_clinic && sriaas_clinic.masters;
+    const count_promise = masters && masters.has('SR Lead Disposition')
+      ? Promise.resolve(masters.count('SR Lead Disposition', filters))
+      : frappe.db.count('SR Lead Disposition', { filters });
+
+    count_promise.then(count => {
       const show = count > 0;
 
       // Show/hide
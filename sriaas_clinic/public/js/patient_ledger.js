@@ -0,0 +1,72 @@
+// Patient: Ledger tab (invoices + payments with running balance) from one cached server call
+const SR_LEDGER_METHOD = "sriaas_clinic.api.patient_ledger.get_patient_ledger";
+
+frappe.ui.form.on("Patient", {
+	refresh(frm) {
+		const html_field = frm.get_field("sr_patient_ledger_html");
+		if (!html_field || frm.is_new()) return;
+
+		const $wrapper = html_field.$wrapper;
+		$wrapper.html(`
+			<table class="table table-bordered table-condensed" style="margin:12px 0 6px;">
+				<thead>
+					<tr>
+						<th>${__("Date")}</th>
+						<th>${__("Voucher")}</th>
+						<th>${__("Mode / Outstanding")}</th>
+						<th class="text-right">${__("Debit")}</th>
+						<th class="text-right">${__("Credit")}</th>
+						<th class="text-right">${__("Balance")}</th>
+					</tr>
+				</thead>
+				<tbody class="sr-ledger-rows">
+					<tr><td colspan="6" class="text-muted">${__("Loading…")}</td></tr>
+				</tbody>
+			</table>
+			<button class="btn btn-xs btn-default sr-ledger-more" style="display:none;">${__("Load more")}</button>
+		`);
+
+		const $rows = $wrapper.find(".sr-ledger-rows");
+		const $more = $wrapper.find(".sr-ledger-more");
+		let cursor = null;
+		let first = true;
+
+		const load = () => {
+			$more.prop("disabled", true);
+			frappe
+				.call({ method: SR_LEDGER_METHOD, args: { patient: frm.doc.name, cursor } })
+				.then((r) => {
+					const page = r.message || {};
+					if (first) $rows.empty();
+					first = false;
+					(page.entries || []).forEach((e) => $rows.append(sr_ledger_row(e)));
+					if (!$rows.children().length) {
+						$rows.html(`<tr><td colspan="6" class="text-muted">${__("No submitted invoices or payments.")}</td></tr>`);
+					}
+					cursor = page.next_cursor;
+					$more.toggle(!!cursor).prop("disabled", false);
+				});
+		};
+
+		$more.on("click", load);
+		load();
+	},
+});
+
+function sr_ledger_row(e) {
+	const fmt = (v) => (v ? format_currency(v) : "");
+	const is_invoice = e.voucher_type === "Sales Invoice";
+	const detail = is_invoice
+		? (e.outstanding_amount ? `${__("Outstanding")}: ${format_currency(e.outstanding_amount)}` : __("Paid"))
+		: frappe.utils.escape_html(e.mode_of_payment || "");
+	return `
+		<tr>
+			<td>${frappe.datetime.str_to_user(e.posting_date)}</td>
+			<td><a href="/app/${frappe.router.slug(e.voucher_type)}/${encodeURIComponent(e.voucher_no)}">${frappe.utils.escape_html(e.voucher_no)}</a>
+				<span class="text-muted small">${__(e.voucher_type)}</span></td>
+			<td>${detail}</td>
+			<td class="text-right">${fmt(e.debit)}</td>
+			<td class="text-right">${fmt(e.credit)}</td>
+			<td class="text-right">${format_currency(e.balance || 0)}</td>
+		</tr>`;
+}
@@ -1,5 +1,10 @@
 // Payment Entry — pick outstanding invoices into references table
-// Shows a dialog with outstanding invoices when Party is selected (non–Internal Transfer)
+// Shows a dialog with outstanding invoices when Party is selected (non–Internal Transfer).
+// Rows come page by page from sriaas_clinic.api.payment_entry.get_outstanding_invoices
+// (sorted + paged server-side, cached briefly per party/account).
+
+const SR_OUTSTANDING_METHOD = "sriaas_clinic.api.payment_entry.get_outstanding_invoices";
+const SR_OUTSTANDING_PAGE_LENGTH = 20;
 
 frappe.ui.form.on('Payment Entry', {
   party(frm) {
@@ -8,67 +13,134 @@ frappe.ui.form.on('Payment Entry', {
       frm.doc.party &&
       frm.doc.payment_type !== "Internal Transfer"
     ) {
-      frappe.call({
-        method: "erpnext.accounts.doctype.payment_entry.payment_entry.get_outstanding_reference_documents",
-        args: {
-          args: {
-            party_type: frm.doc.party_type,
-            party: frm.doc.party,
-            payment_type: frm.doc.payment_type,
-            company: frm.doc.company,
-            party_account: frm.doc.paid_from || frm.doc.paid_to,
-            party_account_currency: frm.doc.paid_from_account_currency || frm.doc.paid_to_account_currency,
-            outstanding_amt_greater_than_zero: 1
-          }
-        },
-        callback(r) {
-          const rows = (r && r.message) || [];
-          if (!Array.isArray(rows) || rows.length === 0) return;
-
-          const d = new frappe.ui.Dialog({
-            title: __("Select Invoices"),
-            fields: [
-              {
-                fieldtype: "Table",
-                fieldname: "references",
-                label: __("Outstanding Invoices"),
-                cannot_add_rows: true,
-                in_place_edit: true,
-                data: rows,
-                get_data: () => rows,
-                fields: [
-                  { fieldtype: "Data",     fieldname: "voucher_no",        label: __("Invoice No"),  in_list_view: true, read_only: 1 },
-                  { fieldtype: "Data",     fieldname: "voucher_type",      label: __("Type"),        in_list_view: true, read_only: 1 },
-                  { fieldtype: "Date",     fieldname: "posting_date",      label: __("Posting Date"),in_list_view: true, read_only: 1 },
-                  { fieldtype: "Date",     fieldname: "due_date",          label: __("Due Date"),    in_list_view: true, read_only: 1 },
-                  { fieldtype: "Currency", fieldname: "invoice_amount",    label: __("Invoice Amt"), in_list_view: true, read_only: 1 },
-                  { fieldtype: "Currency", fieldname: "outstanding_amount",label: __("Outstanding"), in_list_view: true, read_only: 1 },
-                  { fieldtype: "Currency", fieldname: "allocated_amount",  label: __("Allocate"),    in_list_view: true }
-                ]
-              }
-            ],
-            primary_action_label: __("Add"),
-            primary_action(values) {
-              const selected_rows = d.fields_dict.references.grid.get_selected_children() || [];
-              selected_rows.forEach(row => {
-                const ref = frm.add_child("references");
-                ref.reference_doctype   = row.voucher_type;
-                ref.reference_name      = row.voucher_no;
-                ref.due_date            = row.due_date;
-                ref.posting_date        = row.posting_date;
-                ref.total_amount        = row.invoice_amount;
-                ref.outstanding_amount  = row.outstanding_amount;
-                // default allocate full outstanding (user can edit later)
-                ref.allocated_amount    = row.allocated_amount || row.outstanding_amount;
-              });
-              frm.refresh_field("references");
-              d.hide();
-            }
-          });
-
-          d.show();
-        }
-      });
+      sr_outstanding_dialog(frm);
     }
   }
 });
+
+function sr_outstanding_dialog(frm) {
+  const state = { page: 1, sort_by: "posting_date", sort_order: "asc", total: 0 };
+  const picked = new Map();   // voucher_no -> row, kept across pages
+  let rows = [];
+  let d = null;
+
+  const fetch_page = () => frappe.call({
+    method: SR_OUTSTANDING_METHOD,
+    args: {
+      company: frm.doc.company,
+      party_type: frm.doc.party_type,
+      party: frm.doc.party,
+      payment_type: frm.doc.payment_type,
+      party_account: frm.doc.paid_from || frm.doc.paid_to,
+      party_account_currency: frm.doc.paid_from_account_currency || frm.doc.paid_to_account_currency,
+      page: state.page,
+      page_length: SR_OUTSTANDING_PAGE_LENGTH,
+      sort_by: state.sort_by,
+      sort_order: state.sort_order,
+    },
+  }).then((r) => r.message || { rows: [], total: 0 });
+
+  // remember ticks on the page being left
+  const stash_selection = () => {
+    if (!d) return;
+    const grid = d.fields_dict.references.grid;
+    const selected = new Set((grid.get_selected_children() || []).map((r) => r.voucher_no));
+    rows.forEach((r) => {
+      if (selected.has(r.voucher_no)) picked.set(r.voucher_no, r);
+      else picked.delete(r.voucher_no);
+    });
+  };
+
+  const render = (page) => {
+    state.total = page.total || 0;
+    rows = (page.rows || []).map((r) => {
+      const prev = picked.get(r.voucher_no);
+      return Object.assign({}, r, prev ? { allocated_amount: prev.allocated_amount, __checked: 1 } : {});
+    });
+    const table = d.fields_dict.references;
+    table.df.data = rows;
+    table.grid.refresh();
+
+    const pages = Math.max(1, Math.ceil(state.total / SR_OUTSTANDING_PAGE_LENGTH));
+    d.fields_dict.pager.$wrapper.html(`
+      <div class="flex" style="align-items:center; justify-content:space-between;">
+        <span class="text-muted">${__("{0} outstanding document(s) · {1} selected", [state.total, picked.size])}</span>
+        <span>
+          <button class="btn btn-xs btn-default" data-nav="-1" ${state.page <= 1 ? "disabled" : ""}>${__("Prev")}</button>
+          <span style="margin:0 6px;">${state.page} / ${pages}</span>
+          <button class="btn btn-xs btn-default" data-nav="1" ${state.page >= pages ? "disabled" : ""}>${__("Next")}</button>
+        </span>
+      </div>`);
+    d.fields_dict.pager.$wrapper.find("[data-nav]").on("click", (e) => {
+      stash_selection();
+      state.page += Number($(e.currentTarget).attr("data-nav"));
+      fetch_page().then(render);
+    });
+  };
+
+  fetch_page().then((first) => {
+    if (!first.total) return;
+
+    d = new frappe.ui.Dialog({
+      title: __("Select Invoices"),
+      size: "large",
+      fields: [
+        {
+          fieldtype: "Select", fieldname: "sort", label: __("Sort By"), default: "posting_date asc",
+          options: [
+            "posting_date asc", "posting_date desc", "due_date asc", "due_date desc",
+            "outstanding_amount desc", "outstanding_amount asc", "voucher_no asc",
+          ].join("\n"),
+          change() {
+            const [sort_by, sort_order] = (d.get_value("sort") || "posting_date asc").split(" ");
+            if (sort_by === state.sort_by && sort_order === state.sort_order) return;
+            stash_selection();
+            Object.assign(state, { sort_by, sort_order, page: 1 });
+            fetch_page().then(render);
+          },
+        },
+        {
+          fieldtype: "Table",
+          fieldname: "references",
+          label: __("Outstanding Invoices"),
+          cannot_add_rows: true,
+          in_place_edit: true,
+          data: [],
+          get_data: () => rows,
+          fields: [
+            { fieldtype: "Data",     fieldname: "voucher_no",        label: __("Invoice No"),  in_list_view: true, read_only: 1 },
+            { fieldtype: "Data",     fieldname: "voucher_type",      label: __("Type"),        in_list_view: true, read_only: 1 },
+            { fieldtype: "Date",     fieldname: "posting_date",      label: __("Posting Date"),in_list_view: true, read_only: 1 },
+            { fieldtype: "Date",     fieldname: "due_date",          label: __("Due Date"),    in_list_view: true, read_only: 1 },
+            { fieldtype: "Currency", fieldname: "invoice_amount",    label: __("Invoice Amt"), in_list_view: true, read_only: 1 },
+            { fieldtype: "Currency", fieldname: "outstanding_amount",label: __("Outstanding"), in_list_view: true, read_only: 1 },
+            { fieldtype: "Currency", fieldname: "allocated_amount",  label: __("Allocate"),    in_list_view: true }
+          ]
+        },
+        { fieldtype: "HTML", fieldname: "pager" },
+      ],
+      primary_action_label: __("Add"),
+      primary_action() {
+        stash_selection();
+        const existing = new Set((frm.doc.references || []).map((r) => r.reference_name));
+        picked.forEach((row) => {
+          if (existing.has(row.voucher_no)) return;
+          const ref = frm.add_child("references");
+          ref.reference_doctype   = row.voucher_type;
+          ref.reference_name      = row.voucher_no;
+          ref.due_date            = row.due_date;
+          ref.posting_date        = row.posting_date;
+          ref.total_amount        = row.invoice_amount;
+          ref.outstanding_amount  = row.outstanding_amount;
+          // default allocate full outstanding (user can edit later)
+          ref.allocated_amount    = row.allocated_amount || row.outstanding_amount;
+        });
+        frm.refresh_field("references");
+        d.hide();
+      }
+    });
+
+    d.show();
+    render(first);
+  });
+}
@@ -1,14 +1,56 @@
 /** Filter Medication by Medication Class per child table in Patient Encounter. */
 
-// Map your PE child-table fieldnames -> allowed medication_class values
-const CLASS_FILTERS = {
-  // Patient Encounter child table fieldname : allowed classes (strings in Medication.medication_class)
-  drug_prescription:               ["Ayurvedic Medicine", "Ayurvedic"],       // allow both labels if you use variants
+// Patient Encounter child table fieldname -> allowed medication_class values.
+// Source of truth is sriaas_clinic.api.medication.CLASS_FILTERS (sent in frappe.boot);
+// the literal below is only a fallback for an old boot payload.
+const CLASS_FILTERS = frappe.boot.sr_medication_class_filters || {
+  drug_prescription:               ["Ayurvedic Medicine", "Ayurvedic"],
   sr_homeopathy_drug_prescription: ["Homeopathic Medicine", "Homeopathic"],
   sr_allopathy_drug_prescription:  ["Allopathic Medicine", "Allopathic"],
 };
 
+// Medication -> class map, cached in localStorage and refetched only when the
+// server-side version (frappe.boot.sr_medication_class_map_version) changes.
+const SR_MED_MAP_STORAGE_KEY = "sr_medication_class_map";
+let sr_med_map_promise = null;
+
+function sr_get_medication_class_map() {
+  if (sr_med_map_promise) return sr_med_map_promise;
+
+  const version = frappe.boot.sr_medication_class_map_version;
+  try {
+    const stored = JSON.parse(localStorage.getItem(SR_MED_MAP_STORAGE_KEY) || "null");
+    if (stored && version && stored.version === version) {
+      sr_med_map_promise = Promise.resolve(stored.map || {});
+      return sr_med_map_promise;
+    }
+  } catch (e) {
+    // corrupted entry: fall through and refetch
+  }
+
+  sr_med_map_promise = frappe
+    .call({ method: "sriaas_clinic.api.medication.get_medication_class_map" })
+    .then((r) => {
+      const data = r.message || {};
+      try {
+        localStorage.setItem(SR_MED_MAP_STORAGE_KEY, JSON.stringify(data));
+      } catch (e) {
+        // storage full / disabled: keep the in-memory copy only
+      }
+      return data.map || {};
+    })
+    .catch((e) => {
+      sr_med_map_promise = null;
+      throw e;
+    });
+  return sr_med_map_promise;
+}
+
 frappe.ui.form.on("Patient Encounter", {
+  onload() {
+    // warm the map before the first pick
+    sr_get_medication_class_map();
+  },
   refresh(frm) {
     // For each child table, set a query on its `medication` link
     Object.entries(CLASS_FILTERS).forEach(([parentfield, allowedClasses]) => {
@@ -28,26 +70,30 @@ frappe.ui.form.on("Patient Encounter", {
 /**
  * Hard-guard: if someone picks a Medication whose class doesn't belong to
  * the current table, show a message and clear it.
- * (Assumes the child row doctype is the standard "Drug Prescription".
- * If your child doctypes are different, duplicate this block for each doctype.)
+ * The same rule is enforced on save by sriaas_clinic.api.medication.validate_prescription_classes.
  */
 frappe.ui.form.on("Drug Prescription", {
-  medication(frm, cdt, cdn) {
+  async medication(frm, cdt, cdn) {
     const row = locals[cdt][cdn];
     const allowed = CLASS_FILTERS[row.parentfield] || null;
     if (!allowed || !row.medication) return;
 
-    frappe.db.get_value("Medication", row.medication, "medication_class").then((r) => {
-      const cls = r?.message?.medication_class;
-      if (cls && !allowed.includes(cls)) {
-        frappe.msgprint({
-          message: `Selected Medication is <b>${frappe.utils.escape_html(cls)}</b> which is not allowed in this section.`,
-          title: "Wrong Medication Class",
-          indicator: "red",
-        });
-        row.medication = null;
-        frm.refresh_field(row.parentfield);
-      }
-    });
+    const map = await sr_get_medication_class_map();
+    let cls = map[row.medication];
+    if (cls === undefined) {
+      // created after the map was built: single lookup
+      const r = await frappe.db.get_value("Medication", row.medication, "medication_class");
+      cls = r?.message?.medication_class;
+    }
+
+    if (cls && !allowed.includes(cls)) {
+      frappe.msgprint({
+        message: `Selected Medication is <b>${frappe.utils.escape_html(cls)}</b> which is not allowed in this section.`,
+        title: "Wrong Medication Class",
+        indicator: "red",
+      });
+      row.medication = null;
+      frm.refresh_field(row.parentfield);
+    }
   },
 });
@@ -1,30 +1,86 @@
 /**
  * SR Order Item – inline helpers (sriaas_clinic)
- * - On sr_item_code: fetch stock_uom, item_name, description
+ * - On sr_item_code: fetch stock_uom, item_name, description, selling rate
+ *   (codes entered in quick succession — paste, copy-forward — go out as one batched call)
  * - On sr_item_qty / sr_item_rate: amount = qty * rate
+ * - On refresh: rows still missing details get uom / name / description in place (locals +
+ *   refresh_field), without marking the form dirty; rate and amount are only set on an
+ *   item / qty / rate change, so an unrelated save never stores prices nobody saw
  */
 
+const SR_ITEM_INFO_METHOD = 'sriaas_clinic.api.order_item.get_item_info';
+const SR_ITEM_INFO_DEBOUNCE_MS = 60;
+const sr_item_info_queue = new Map();   // cdn -> { frm, cdt, cdn, silent }
+let sr_item_info_timer = null;
+
 frappe.ui.form.on('SR Order Item', {
   sr_item_qty(frm, cdt, cdn)  { sr_set_amount(cdt, cdn); },
   sr_item_rate(frm, cdt, cdn) { sr_set_amount(cdt, cdn); },
 
   sr_item_code(frm, cdt, cdn) {
     const row = locals[cdt][cdn];
-    const item_code = row.sr_item_code;
-    if (!item_code) return;
+    if (!row || !row.sr_item_code) return;
+    sr_queue_item_info(frm, cdt, cdn);
+  },
+});
+
+frappe.ui.form.on('Patient Encounter', {
+  refresh(frm) {
+    // Rows added without triggers (copy-forward / drafts) but still missing details
+    if (frm.doc.docstatus !== 0) return;
+    (frm.doc.sr_pe_order_items || [])
+      .filter((r) => r.sr_item_code && !r.sr_item_name)
+      .forEach((r) => sr_queue_item_info(frm, r.doctype, r.name, true));
+  },
+});
+
+function sr_queue_item_info(frm, cdt, cdn, silent = false) {
+  // a user edit queued for the same row wins over a silent refresh fill
+  const prev = sr_item_info_queue.get(cdn);
+  sr_item_info_queue.set(cdn, { frm, cdt, cdn, silent: silent && (!prev || prev.silent) });
+  clearTimeout(sr_item_info_timer);
+  sr_item_info_timer = setTimeout(sr_flush_item_info, SR_ITEM_INFO_DEBOUNCE_MS);
+}
 
-    frappe.db.get_value('Item', item_code, ['stock_uom','item_name','description']).then(r => {
-      const m = (r && r.message) || {};
-      sr_set_if_exists(cdt, cdn, 'sr_item_uom',  m.stock_uom);
-      sr_set_if_exists(cdt, cdn, 'sr_item_name', m.item_name);
+function sr_flush_item_info() {
+  const pending = Array.from(sr_item_info_queue.values());
+  sr_item_info_queue.clear();
+  if (!pending.length) return;
+
+  const codes = [...new Set(pending.map((p) => (locals[p.cdt][p.cdn] || {}).sr_item_code).filter(Boolean))];
+  if (!codes.length) return;
+
+  frappe.call({
+    method: SR_ITEM_INFO_METHOD,
+    args: { item_codes: codes },  // default selling price list (Selling Settings)
+  }).then((r) => {
+    const info = r.message || {};
+    const refreshed = new Set();
+    pending.forEach(({ frm, cdt, cdn, silent }) => {
+      const row = locals[cdt][cdn];
+      const m = row && info[row.sr_item_code];
+      if (!m) return;
+      sr_set_if_exists(cdt, cdn, 'sr_item_uom',  m.stock_uom, silent);
+      sr_set_if_exists(cdt, cdn, 'sr_item_name', m.item_name, silent);
       // prefer custom description; fall back to standard
-      if (!sr_set_if_exists(cdt, cdn, 'sr_item_description', m.description)) {
-        sr_set_if_exists(cdt, cdn, 'description', m.description);
+      if (!sr_set_if_exists(cdt, cdn, 'sr_item_description', m.description, silent)) {
+        sr_set_if_exists(cdt, cdn, 'description', m.description, silent);
+      }
+      if (silent) {
+        refreshed.add(frm);
+        return;
+      }
+      // default selling rate only when the user has not entered one
+      if (m.rate && !Number(row.sr_item_rate ?? row.rate)) {
+        if (!sr_set_if_exists(cdt, cdn, 'sr_item_rate', m.rate)) {
+          sr_set_if_exists(cdt, cdn, 'rate', m.rate);
+        }
       }
       sr_set_amount(cdt, cdn);
     });
-  },
-});
+    refreshed.forEach((frm) => frm.refresh_field('sr_pe_order_items'));
+  });
+}
 
 function sr_set_amount(cdt, cdn) {
   const d    = locals[cdt][cdn] || {};
@@ -38,10 +94,15 @@ function sr_set_amount(cdt, cdn) {
   }
 }
 
-// set only if field exists on the child doctype
-function sr_set_if_exists(cdt, cdn, fieldname, value) {
-  const exists = Boolean(frappe.meta.get_docfield('SR Order Item', fieldname, (locals[cdt][cdn] || {}).parent));
+// set only if field exists on the child doctype; `silent` writes locals directly (no dirty flag)
+function sr_set_if_exists(cdt, cdn, fieldname, value, silent = false) {
+  const row = locals[cdt][cdn] || {};
+  const exists = Boolean(frappe.meta.get_docfield('SR Order Item', fieldname, row.parent));
   if (!exists) return false;
-  frappe.model.set_value(cdt, cdn, fieldname, value);
+  if (silent) {
+    row[fieldname] = value;
+  } else {
+    frappe.model.set_value(cdt, cdn, fieldname, value);
+  }
   return true;
 }
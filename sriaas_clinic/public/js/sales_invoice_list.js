@@ -1,6 +1,11 @@
 // Admin-only cost summary in Sales Invoice list
 frappe.listview_settings['Sales Invoice'] = {
   onload(listview) {
+    // Bulk print — rendered server-side in a background job. The Actions menu only shows
+    // with a selection, so the filters path lives in the list's menu.
+    listview.page.add_action_item(__('Bulk Print (Sales Invoice New)'), () => sr_bulk_print(listview));
+    listview.page.add_menu_item(__('Bulk Print (current filters)'), () => sr_bulk_print(listview, true));
+
     const isAdmin =
       frappe.user.has_role('System Manager') || frappe.user.name === 'Administrator';
 
@@ -28,3 +33,47 @@ frappe.listview_settings['Sales Invoice'] = {
     };
   }
 };
+
+function sr_bulk_print(listview, use_filters = false) {
+  const names = use_filters ? [] : listview.get_checked_items(true);
+  const d = new frappe.ui.Dialog({
+    title: __('Bulk Print'),
+    fields: [
+      {
+        fieldtype: 'HTML',
+        options: names.length
+          ? `<p>${__('{0} selected invoice(s)', [names.length])}</p>`
+          : `<p>${__('All invoices matching the current filters')}</p>`,
+      },
+      { fieldtype: 'Select', fieldname: 'output', label: __('Output'), options: 'pdf\nzip', default: 'pdf' },
+    ],
+    primary_action_label: __('Start'),
+    primary_action(values) {
+      frappe.call({
+        method: 'sriaas_clinic.api.bulk_print.enqueue_bulk_print',
+        args: {
+          doctype: 'Sales Invoice',
+          names: names.length ? names : null,
+          filters: names.length ? null : listview.get_filters_for_args(),
+          output: values.output,
+        },
+      }).then((r) => {
+        const m = r.message || {};
+        frappe.show_alert({ message: __('Bulk print queued for {0} document(s)', [m.count]), indicator: 'blue' });
+      });
+      d.hide();
+    },
+  });
+  d.show();
+}
+
+// Download link once the background job finishes
+frappe.realtime.on('sr_bulk_print_done', (data) => {
+  const failed = (data.failed || []).length;
+  frappe.msgprint({
+    title: __('Bulk Print Ready'),
+    indicator: failed ? 'orange' : 'green',
+    message: `${__('{0} document(s) printed', [data.printed])}${failed ? ` — ${__('{0} failed', [failed])}` : ''}.
+      <br><a href="${data.file_url}" target="_blank">${__('Download')}</a>`,
+  });
+});
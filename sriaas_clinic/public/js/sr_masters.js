@@ -0,0 +1,40 @@
+// sr_masters.js — in-memory SR master data from frappe.boot.sr_masters
+// (built by sriaas_clinic.api.master_data; refreshed when the server announces a new version)
+frappe.provide("sriaas_clinic");
+
+sriaas_clinic.masters = {
+  _bundle: (frappe.boot && frappe.boot.sr_masters) || { version: null, masters: {} },
+
+  get version() {
+    return this._bundle.version;
+  },
+
+  // rows of a master, optionally filtered by exact field values: get("SR Lead Disposition", { is_active: 1 })
+  get(doctype, filters) {
+    const rows = this._bundle.masters[doctype] || [];
+    if (!filters) return rows;
+    const pairs = Object.entries(filters);
+    return rows.filter((r) => pairs.every(([k, v]) => r[k] == v));
+  },
+
+  count(doctype, filters) {
+    return this.get(doctype, filters).length;
+  },
+
+  // true when the master was bundled (callers fall back to a server call otherwise)
+  has(doctype) {
+    return Object.prototype.hasOwnProperty.call(this._bundle.masters, doctype);
+  },
+
+  refresh() {
+    return frappe
+      .call({ method: "sriaas_clinic.api.master_data.get_master_bundle" })
+      .then((r) => {
+        if (r.message) this._bundle = r.message;
+      });
+  },
+};
+
+$(document).on("app_ready", () => {
+  frappe.realtime.on("sr_masters_changed", () => sriaas_clinic.masters.refresh());
+});
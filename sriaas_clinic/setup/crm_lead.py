@@ -1,7 +1,7 @@
 # sriaas_clinic/setup/crm_lead.py
 
 import frappe
-from .utils import create_cf_with_module, upsert_property_setter
+from .utils import create_cf_with_module, bulk_upsert_property_setters, hide_fields
 
 DT = "CRM Lead"
 
@@ -208,6 +208,32 @@ def _make_crm_lead_fields():
                 "read_only": 1,
                 "insert_after": "sr_meta_facebook_sb",
             },
+
+            # ---- Section: Duplicates (api/lead_ingest.py, "attach" policy) ----
+            {
+                "fieldname": "sr_meta_duplicate_sb",
+                "label": "Duplicates",
+                "fieldtype": "Section Break",
+                "insert_after": "sr_fbclid",
+            },
+            {
+                "fieldname": "sr_duplicate_of",
+                "label": "Duplicate Of",
+                "fieldtype": "Link",
+                "options": "CRM Lead",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "sr_meta_duplicate_sb",
+            },
+            {
+                "fieldname": "sr_matched_patient",
+                "label": "Matched Patient",
+                "fieldtype": "Link",
+                "options": "Patient",
+                "read_only": 1,
+                "no_copy": 1,
+                "insert_after": "sr_duplicate_of",
+            },
         ]
     })
 
@@ -221,16 +247,18 @@ def _apply_crm_lead_ui_customizations():
     if not frappe.db.exists("DocType", DT):
         return
 
-    upsert_property_setter(DT, "first_name", "reqd", "0", "Check")
+    rows = [
+        (DT, "first_name", "reqd", "0", "Check"),
 
-    upsert_property_setter(DT, "mobile_no", "reqd", "1", "Check")
-    upsert_property_setter(DT, "mobile_no", "in_list_view", "1", "Check")
-    upsert_property_setter(DT, "mobile_no", "in_standard_filter", "1", "Check")
+        (DT, "mobile_no", "reqd", "1", "Check"),
+        (DT, "mobile_no", "in_list_view", "1", "Check"),
+        (DT, "mobile_no", "in_standard_filter", "1", "Check"),
 
-    upsert_property_setter(DT, "source", "label", "Lead Source", "Data")
-    upsert_property_setter(DT, "source", "options", "SR Lead Source", "Link")
-    upsert_property_setter(DT, "source", "in_list_view", "1", "Check")
-    upsert_property_setter(DT, "source", "in_standard_filter", "1", "Check")
+        (DT, "source", "label", "Lead Source", "Data"),
+        (DT, "source", "options", "SR Lead Source", "Link"),
+        (DT, "source", "in_list_view", "1", "Check"),
+        (DT, "source", "in_standard_filter", "1", "Check"),
+    ]
 
     # 5) Hide unwanted flags/fieldss
     targets = (
@@ -245,15 +273,6 @@ def _apply_crm_lead_ui_customizations():
         "image",
         "converted",
     )
-    for f in targets:
-        cfname = frappe.db.get_value("Custom Field", {"dt": DT, "fieldname": f}, "name")
-        if cfname:
-            cf = frappe.get_doc("Custom Field", cfname)
-            cf.hidden = 1
-            cf.in_list_view = 0
-            cf.in_standard_filter = 0
-            cf.save(ignore_permissions=True)
-        else:
-            upsert_property_setter(DT, f, "hidden", "1", "Check")
-            upsert_property_setter(DT, f, "in_list_view", "0", "Check")
-            upsert_property_setter(DT, f, "in_standard_filter", "0", "Check")
\ No newline at end of file
+    rows += hide_fields(DT, targets)
+
+    bulk_upsert_property_setters(rows)
\ No newline at end of file
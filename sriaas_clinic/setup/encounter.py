@@ -1,6 +1,6 @@
 # sriaas_clinic/setup/encounter.py
 import frappe
-from .utils import create_cf_with_module, upsert_property_setter, collapse_section, set_label
+from .utils import create_cf_with_module, upsert_property_setter, bulk_upsert_property_setters, hide_fields
 
 DT = "Patient Encounter"
 
@@ -140,6 +140,8 @@ def _setup_draft_invoice_tab():
 
 def _apply_encounter_ui_customizations():
     """Apply various UI customizations to Patient Encounter"""
+    meta = frappe.get_meta(DT)
+    rows = []
     
     # --------------------------
     # 1) Collapse selected sections
@@ -151,26 +153,30 @@ def _apply_encounter_ui_customizations():
         "rehabilitation_section",
         "section_break_33"
     ]:
-        collapse_section(DT, f, True)
+        if meta.get_field(f):
+            rows.append((DT, f, "collapsible", "1", "Check"))
 
     # Rename section for clarity
-    set_label(DT, "section_break_33", "Review")
+    if meta.get_field("section_break_33"):
+        rows.append((DT, "section_break_33", "label", "Review", "Data"))
 
     # Make drug prescription section collapsible
-    upsert_property_setter(DT, "sb_drug_prescription", "collapsible", "1", "Check")
+    rows.append((DT, "sb_drug_prescription", "collapsible", "1", "Check"))
 
-    upsert_property_setter(DT, "sr_pe_mode_of_payment", "depends_on", "eval:doc.sr_pe_paid_amount>0", "Data")
-    upsert_property_setter(DT, "sr_pe_mode_of_payment", "mandatory_depends_on", "eval:doc.sr_pe_paid_amount>0", "Data")
+    rows.append((DT, "sr_pe_mode_of_payment", "depends_on", "eval:doc.sr_pe_paid_amount>0", "Data"))
+    rows.append((DT, "sr_pe_mode_of_payment", "mandatory_depends_on", "eval:doc.sr_pe_paid_amount>0", "Data"))
 
-    upsert_property_setter(DT, "sr_payment_receipt_sb", "depends_on", "eval:doc.sr_pe_paid_amount>0", "Data")
+    rows.append((DT, "sr_payment_receipt_sb", "depends_on", "eval:doc.sr_pe_paid_amount>0", "Data"))
     for f in ["sr_pe_payment_reference_no","sr_pe_payment_reference_date","sr_payment_receipt_cb"]:
-        upsert_property_setter(DT, f, "depends_on", "eval:doc.sr_pe_paid_amount>0", "Data")
+        rows.append((DT, f, "depends_on", "eval:doc.sr_pe_paid_amount>0", "Data"))
     for f in ["sr_pe_payment_reference_no","sr_pe_payment_reference_date"]:
-        upsert_property_setter(DT, f, "mandatory_depends_on", "eval:doc.sr_pe_paid_amount>0", "Data")
+        rows.append((DT, f, "mandatory_depends_on", "eval:doc.sr_pe_paid_amount>0", "Data"))
     
     # Rename drug prescription section to Ayurvedic Medications
-    set_label(DT, "sb_drug_prescription", "Ayurvedic Medications")
-    set_label(DT, "drug_prescription", "Ayurvedic Drug Prescription")
+    if meta.get_field("sb_drug_prescription"):
+        rows.append((DT, "sb_drug_prescription", "label", "Ayurvedic Medications", "Data"))
+    if meta.get_field("drug_prescription"):
+        rows.append((DT, "drug_prescription", "label", "Ayurvedic Drug Prescription", "Data"))
 
     # --------------------------
     # 2) Hide unwanted flags/fields
@@ -188,15 +194,6 @@ def _apply_encounter_ui_customizations():
         "appointment",
         # "sr_pe_payment_proof",
     )
-    for f in targets:
-        cfname = frappe.db.get_value("Custom Field", {"dt": DT, "fieldname": f}, "name")
-        if cfname:
-            cf = frappe.get_doc("Custom Field", cfname)
-            cf.hidden = 1
-            cf.in_list_view = 0
-            cf.in_standard_filter = 0
-            cf.save(ignore_permissions=True)
-        else:
-            upsert_property_setter(DT, f, "hidden", "1", "Check")
-            upsert_property_setter(DT, f, "in_list_view", "0", "Check")
-            upsert_property_setter(DT, f, "in_standard_filter", "0", "Check")
+    rows += hide_fields(DT, targets)
+
+    bulk_upsert_property_setters(rows)
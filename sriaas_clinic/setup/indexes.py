@@ -0,0 +1,140 @@
+# sriaas_clinic/setup/indexes.py
+"""
+Composite indexes for the app's hot queries.
+
+- INDEXES: declared indexes; apply() (a setup_all step) creates the missing ones. An
+  index is skipped when one of its columns is missing on this site or an existing
+  index already starts with the same columns.
+- QUERIES / check_indexes(): EXPLAIN the known queries and flag full table scans
+    bench --site <site> execute sriaas_clinic.setup.indexes.check_indexes
+"""
+import frappe
+
+from .utils import is_dry_run
+
+# (doctype, index name, columns) — leftmost column is the most selective equality filter
+INDEXES = (
+    # encounter_flow.handlers.link_pending_payment_entries
+    ("Payment Entry", "sr_pe_intended_si", ("intended_sales_invoice",)),
+    # patient_ledger / patient_summary / payment_entry picker
+    ("Payment Entry", "sr_pe_party_docstatus_date", ("party_type", "party", "docstatus", "posting_date")),
+    ("Sales Invoice", "sr_si_patient_docstatus_date", ("patient", "docstatus", "posting_date")),
+    # patient_summary (customer -> patient), patient_ledger
+    ("Patient", "sr_patient_customer", ("customer",)),
+    # follow-up lists filter by day + digit
+    ("Patient", "sr_patient_followup", ("sr_followup_day", "sr_followup_id")),
+    # order_item.get_item_info selling rates
+    ("Item Price", "sr_ip_item_price_list_selling", ("item_code", "price_list", "selling")),
+    # address lookups for Patient / Customer / Company (print context, encounter flow)
+    ("Dynamic Link", "sr_dl_link_parenttype", ("link_doctype", "link_name", "parenttype")),
+    # clinical_history paging, last visit
+    ("Patient Encounter", "sr_pe_patient_date", ("patient", "encounter_date")),
+    # lead_funnel.get_lead_funnel (created-on range, per stage)
+    ("SR Lead Funnel", "sr_lf_created_status", ("sr_lead_created", "sr_status")),
+    # campaign_attribution: last lead before an invoice by match key
+    ("CRM Lead", "sr_lead_phone_key_creation", ("sr_phone_key", "creation")),
+    ("CRM Lead", "sr_lead_email_key_creation", ("sr_email_key", "creation")),
+    # campaign_attribution.get_campaign_revenue (posting date range per campaign)
+    ("SR Campaign Attribution", "sr_ca_date_campaign", ("sr_posting_date", "sr_utm_campaign")),
+)
+
+# (label, query, params) — representative shapes of the app's queries for EXPLAIN
+QUERIES = (
+    (
+        "Draft PE for an invoice",
+        "SELECT name FROM `tabPayment Entry` WHERE docstatus = 0 AND intended_sales_invoice = %(v)s",
+        {"v": "SINV-X"},
+    ),
+    (
+        "Patient ledger: invoices",
+        "SELECT name FROM `tabSales Invoice` WHERE patient = %(v)s AND docstatus = 1 ORDER BY posting_date DESC",
+        {"v": "PAT-X"},
+    ),
+    (
+        "Patient ledger: payments",
+        "SELECT name FROM `tabPayment Entry` WHERE party_type = 'Customer' AND party = %(v)s AND docstatus = 1",
+        {"v": "CUST-X"},
+    ),
+    (
+        "Patient by customer",
+        "SELECT name FROM `tabPatient` WHERE customer = %(v)s",
+        {"v": "CUST-X"},
+    ),
+    (
+        "Follow-up list",
+        "SELECT name FROM `tabPatient` WHERE sr_followup_day = %(d)s AND sr_followup_id = %(i)s",
+        {"d": "Mon", "i": "0"},
+    ),
+    (
+        "Item selling rate",
+        "SELECT price_list_rate FROM `tabItem Price` WHERE item_code = %(v)s AND price_list = %(p)s AND selling = 1",
+        {"v": "ITEM-X", "p": "Standard Selling"},
+    ),
+    (
+        "Address links",
+        "SELECT parent FROM `tabDynamic Link` WHERE parenttype = 'Address' AND link_doctype = 'Patient' AND link_name = %(v)s",
+        {"v": "PAT-X"},
+    ),
+    (
+        "Clinical history page",
+        "SELECT name FROM `tabPatient Encounter` WHERE patient = %(v)s AND docstatus < 2 ORDER BY encounter_date, creation",
+        {"v": "PAT-X"},
+    ),
+    (
+        "Lead funnel range",
+        "SELECT sr_status, COUNT(DISTINCT sr_lead) FROM `tabSR Lead Funnel`"
+        " WHERE sr_lead_created >= %(f)s AND sr_lead_created < %(t)s GROUP BY sr_status",
+        {"f": "2000-01-01", "t": "2000-02-01"},
+    ),
+    (
+        "Campaign revenue range",
+        "SELECT sr_utm_campaign, SUM(sr_net_revenue) FROM `tabSR Campaign Attribution`"
+        " WHERE sr_posting_date BETWEEN %(f)s AND %(t)s GROUP BY sr_utm_campaign",
+        {"f": "2000-01-01", "t": "2000-01-31"},
+    ),
+)
+
+def _index_prefixes(doctype: str) -> set[tuple]:
+    """Every leading-column prefix of the table's existing indexes."""
+    cols = {}
+    for r in frappe.db.sql(f"SHOW INDEX FROM `tab{doctype}`", as_dict=True):
+        cols.setdefault(r.Key_name, {})[r.Seq_in_index] = r.Column_name
+    prefixes = set()
+    for by_seq in cols.values():
+        ordered = tuple(by_seq[i] for i in sorted(by_seq))
+        prefixes.update(ordered[:n] for n in range(1, len(ordered) + 1))
+    return prefixes
+
+def apply():
+    if is_dry_run():
+        return
+    for doctype, index_name, columns in INDEXES:
+        if not frappe.db.table_exists(doctype):
+            continue
+        if not all(frappe.db.has_column(doctype, c) for c in columns):
+            continue
+        if tuple(columns) in _index_prefixes(doctype):
+            continue
+        frappe.db.add_index(doctype, list(columns), index_name)
+
+def check_indexes() -> list[dict]:
+    """EXPLAIN every entry of QUERIES; rows with access type ALL are flagged as full scans."""
+    findings = []
+    for label, query, params in QUERIES:
+        try:
+            plan = frappe.db.sql(f"EXPLAIN {query}", params, as_dict=True)
+        except Exception as e:
+            findings.append({"query": label, "status": "error", "detail": str(e)})
+            continue
+        scans = [p for p in plan if (p.get("type") or "").upper() == "ALL"]
+        findings.append({
+            "query": label,
+            "status": "full scan" if scans else "ok",
+            "detail": ", ".join(f"{p.get('table')} (~{p.get('rows')} rows)" for p in scans)
+                      or ", ".join(f"{p.get('table')}: {p.get('key') or p.get('type')}" for p in plan),
+        })
+
+    print("sriaas_clinic index check")
+    for f in findings:
+        print(f"  {f['status']:<9} {f['query']:<26} {f['detail']}")
+    return findings
@@ -1,8 +1,10 @@
 # sriaas_clinic/setup/masters.py
 import frappe
-from .utils import MODULE_DEF_NAME
+from .utils import MODULE_DEF_NAME, is_dry_run
 
 def apply():
+    if is_dry_run():
+        return  # DocTypes / master records are not diffed
     _ensure_sr_patient_disable_reason()
     _ensure_sr_patient_invoice_view()
     _ensure_sr_patient_payment_view()
@@ -18,6 +20,8 @@ def apply():
     _ensure_sr_state()
     _ensure_sr_lead_disposition()
     _ensure_sr_lead_pipeline()
+    _ensure_sr_lead_funnel()
+    _ensure_sr_campaign_attribution()
 
 # Note: If you want to add more masters, create similar functions here and call them in apply()
 
@@ -517,4 +521,113 @@ def _ensure_sr_lead_pipeline():
         ],
     }).insert(ignore_permissions=True)
 
+def _ensure_sr_lead_funnel():
+    """Create SR Lead Funnel fact table (one row per CRM Lead status interval, api/lead_funnel.py)."""
+    if frappe.db.exists("DocType", "SR Lead Funnel"):
+        return
+
+    frappe.get_doc({
+        "doctype": "DocType",
+        "name": "SR Lead Funnel",
+        "module": MODULE_DEF_NAME,
+        "custom": 1,       # no doctype folder / controller in the app
+        "istable": 0,
+        "issingle": 0,
+        "in_create": 1,       # maintained from CRM Lead saves only
+        "read_only": 1,
+        "track_changes": 0,
+        "autoname": "hash",
+
+        "field_order": [
+            "sr_lead", "sr_status", "sr_next_status", "sr_seq", "sr_is_current",
+            "sr_entered_on", "sr_exited_on", "sr_dwell_seconds",
+            "sr_dims_sb", "sr_lead_created", "sr_lead_pipeline", "sr_lead_disposition",
+            "sr_source", "sr_utm_campaign",
+        ],
+        "fields": [
+            {"fieldname": "sr_lead", "label": "Lead", "fieldtype": "Link", "options": "CRM Lead",
+             "in_list_view": 1, "in_standard_filter": 1, "search_index": 1},
+            {"fieldname": "sr_status", "label": "Status", "fieldtype": "Data",
+             "in_list_view": 1, "in_standard_filter": 1, "search_index": 1},
+            {"fieldname": "sr_next_status", "label": "Next Status", "fieldtype": "Data", "in_list_view": 1},
+            {"fieldname": "sr_seq", "label": "Sequence", "fieldtype": "Int"},
+            {"fieldname": "sr_is_current", "label": "Current", "fieldtype": "Check", "default": "0"},
+            {"fieldname": "sr_entered_on", "label": "Entered On", "fieldtype": "Datetime"},
+            {"fieldname": "sr_exited_on", "label": "Exited On", "fieldtype": "Datetime"},
+            {"fieldname": "sr_dwell_seconds", "label": "Dwell (seconds)", "fieldtype": "Int", "in_list_view": 1},
+
+            {"fieldname": "sr_dims_sb", "label": "Dimensions", "fieldtype": "Section Break"},
+            {"fieldname": "sr_lead_created", "label": "Lead Created", "fieldtype": "Datetime", "search_index": 1},
+            {"fieldname": "sr_lead_pipeline", "label": "Pipeline", "fieldtype": "Data", "in_standard_filter": 1},
+            {"fieldname": "sr_lead_disposition", "label": "Disposition", "fieldtype": "Data", "in_standard_filter": 1},
+            {"fieldname": "sr_source", "label": "Source", "fieldtype": "Data", "in_standard_filter": 1},
+            {"fieldname": "sr_utm_campaign", "label": "UTM Campaign", "fieldtype": "Data", "in_standard_filter": 1},
+        ],
+
+        "permissions": [
+            {"role": "System Manager", "read": 1, "report": 1, "export": 1},
+            {"role": "Sales Manager", "read": 1, "report": 1, "export": 1},
+        ],
+    }).insert(ignore_permissions=True)
+
+def _ensure_sr_campaign_attribution():
+    """Create SR Campaign Attribution (one row per submitted Sales Invoice, api/campaign_attribution.py)."""
+    if frappe.db.exists("DocType", "SR Campaign Attribution"):
+        return
+
+    frappe.get_doc({
+        "doctype": "DocType",
+        "name": "SR Campaign Attribution",
+        "module": MODULE_DEF_NAME,
+        "custom": 1,       # no doctype folder / controller in the app
+        "istable": 0,
+        "issingle": 0,
+        "in_create": 1,       # maintained from Sales Invoice submit / cancel only
+        "read_only": 1,
+        "track_changes": 0,
+        "autoname": "field:sr_sales_invoice",
+
+        "field_order": [
+            "sr_sales_invoice", "sr_posting_date", "sr_company", "sr_patient", "sr_customer",
+            "sr_net_revenue", "sr_grand_total",
+            "sr_source_sb", "sr_order_source", "sr_encounter", "sr_encounter_source",
+            "sr_lead", "sr_lead_source",
+            "sr_utm_sb", "sr_utm_source", "sr_utm_medium", "sr_utm_campaign", "sr_utm_campaign_id",
+            "sr_gclid", "sr_fbclid",
+        ],
+        "fields": [
+            {"fieldname": "sr_sales_invoice", "label": "Sales Invoice", "fieldtype": "Link", "options": "Sales Invoice",
+             "reqd": 1, "unique": 1, "in_list_view": 1},
+            {"fieldname": "sr_posting_date", "label": "Posting Date", "fieldtype": "Date",
+             "in_list_view": 1, "in_standard_filter": 1, "search_index": 1},
+            {"fieldname": "sr_company", "label": "Company", "fieldtype": "Link", "options": "Company", "in_standard_filter": 1},
+            {"fieldname": "sr_patient", "label": "Patient", "fieldtype": "Link", "options": "Patient"},
+            {"fieldname": "sr_customer", "label": "Customer", "fieldtype": "Link", "options": "Customer"},
+            {"fieldname": "sr_net_revenue", "label": "Net Revenue", "fieldtype": "Currency", "in_list_view": 1},
+            {"fieldname": "sr_grand_total", "label": "Grand Total", "fieldtype": "Currency"},
+
+            {"fieldname": "sr_source_sb", "label": "Source", "fieldtype": "Section Break"},
+            {"fieldname": "sr_order_source", "label": "Order Source", "fieldtype": "Data", "in_standard_filter": 1},
+            {"fieldname": "sr_encounter", "label": "Encounter", "fieldtype": "Link", "options": "Patient Encounter"},
+            {"fieldname": "sr_encounter_source", "label": "Encounter Source", "fieldtype": "Data"},
+            {"fieldname": "sr_lead", "label": "Lead", "fieldtype": "Link", "options": "CRM Lead", "search_index": 1},
+            {"fieldname": "sr_lead_source", "label": "Lead Source", "fieldtype": "Data", "in_standard_filter": 1},
+
+            {"fieldname": "sr_utm_sb", "label": "Campaign", "fieldtype": "Section Break"},
+            {"fieldname": "sr_utm_source", "label": "UTM Source", "fieldtype": "Data", "in_standard_filter": 1},
+            {"fieldname": "sr_utm_medium", "label": "UTM Medium", "fieldtype": "Data"},
+            {"fieldname": "sr_utm_campaign", "label": "UTM Campaign", "fieldtype": "Data",
+             "in_list_view": 1, "in_standard_filter": 1},
+            {"fieldname": "sr_utm_campaign_id", "label": "UTM Campaign ID", "fieldtype": "Data"},
+            {"fieldname": "sr_gclid", "label": "GCLID", "fieldtype": "Data"},
+            {"fieldname": "sr_fbclid", "label": "FBCLID", "fieldtype": "Data"},
+        ],
+
+        "permissions": [
+            {"role": "System Manager", "read": 1, "report": 1, "export": 1},
+            {"role": "Sales Manager", "read": 1, "report": 1, "export": 1},
+            {"role": "Accounts Manager", "read": 1, "report": 1, "export": 1},
+        ],
+    }).insert(ignore_permissions=True)
+
 # End of sriaas_clinic/setup/masters.py
\ No newline at end of file
@@ -0,0 +1,37 @@
+# sriaas_clinic/setup/match_keys.py
+"""Duplicate-match keys (api/dedupe.py) on CRM Lead, Patient, Customer and Contact."""
+import frappe
+
+from sriaas_clinic.api.dedupe import KEY_SOURCES, backfill_keys
+
+from .utils import create_cf_with_module, is_dry_run
+
+
+def apply():
+    _make_key_fields()
+    if not is_dry_run():
+        _backfill()
+
+def _key_fields(insert_after: str) -> list[dict]:
+    return [
+        {"fieldname": "sr_phone_key", "label": "Phone Match Key", "fieldtype": "Data", "hidden": 1, "read_only": 1,
+         "no_copy": 1, "search_index": 1, "insert_after": insert_after},
+        {"fieldname": "sr_email_key", "label": "Email Match Key", "fieldtype": "Data", "hidden": 1, "read_only": 1,
+         "no_copy": 1, "search_index": 1, "insert_after": "sr_phone_key"},
+    ]
+
+def _make_key_fields():
+    """Hidden, indexed key fields next to each doctype's phone field"""
+    mapping = {}
+    for dt, (phone_fields, _email_fields) in KEY_SOURCES.items():
+        if not frappe.db.exists("DocType", dt):
+            continue
+        meta = frappe.get_meta(dt)
+        anchor = next((f for f in phone_fields if meta.get_field(f)), None)
+        mapping[dt] = _key_fields(anchor or meta.fields[-1].fieldname)
+    create_cf_with_module(mapping)
+
+def _backfill():
+    for dt in KEY_SOURCES:
+        if frappe.db.table_exists(dt):
+            backfill_keys(dt)
@@ -1,5 +1,6 @@
 # sriaas_clinic/setup/patient.py
-from .utils import create_cf_with_module, upsert_property_setter, set_label
+import frappe
+from .utils import create_cf_with_module, bulk_upsert_property_setters
 
 DT = "Patient"
 
@@ -23,11 +24,20 @@ def _make_patient_fields():
             {"fieldname": "sr_followup_disable_reason","label":"Followup Disable Reason","fieldtype":"Link","options":"SR Patient Disable Reason","insert_after":"status","depends_on":'eval:doc.status=="Disabled"',"mandatory_depends_on":'eval:doc.status=="Disabled"'},
             {"fieldname": "sr_followup_status","label":"Followup Status","fieldtype":"Select","options":"\nPending\nDone","insert_after":"user_id","in_list_view":1,"in_standard_filter":1},
 
-            {"fieldname": "sr_invoices_tab","label":"Invoices","fieldtype":"Tab Break","insert_after":"other_risk_factors"},
-            {"fieldname": "sr_sales_invoice_list","label":"Sales Invoices","fieldtype":"Table","options":"SR Patient Invoice View","read_only":1,"insert_after":"sr_invoices_tab"},
+            {"fieldname": "sr_invoices_tab","label":"Ledger","fieldtype":"Tab Break","insert_after":"other_risk_factors"},
+            # maintained by api/patient_summary.py (submit/cancel hooks + daily reconcile)
+            {"fieldname": "sr_lifetime_billed","label":"Lifetime Billed","fieldtype":"Currency","read_only":1,"no_copy":1,"insert_after":"sr_invoices_tab"},
+            {"fieldname": "sr_lifetime_paid","label":"Lifetime Paid","fieldtype":"Currency","read_only":1,"no_copy":1,"insert_after":"sr_lifetime_billed"},
+            {"fieldname": "sr_summary_cb","fieldtype":"Column Break","insert_after":"sr_lifetime_paid"},
+            {"fieldname": "sr_outstanding","label":"Outstanding","fieldtype":"Currency","read_only":1,"no_copy":1,"in_list_view":1,"search_index":1,"insert_after":"sr_summary_cb"},
+            {"fieldname": "sr_last_visit_date","label":"Last Visit Date","fieldtype":"Date","read_only":1,"no_copy":1,"search_index":1,"insert_after":"sr_outstanding"},
+            {"fieldname": "sr_ledger_sb","fieldtype":"Section Break","insert_after":"sr_last_visit_date"},
+            {"fieldname": "sr_patient_ledger_html","label":"Patient Ledger","fieldtype":"HTML","read_only":1,"insert_after":"sr_ledger_sb"},
+            # superseded by the ledger (api/patient_ledger.py); kept hidden so existing rows stay readable
+            {"fieldname": "sr_sales_invoice_list","label":"Sales Invoices","fieldtype":"Table","options":"SR Patient Invoice View","read_only":1,"hidden":1,"insert_after":"sr_patient_ledger_html"},
 
-            {"fieldname": "sr_payments_tab","label":"Payments","fieldtype":"Tab Break","insert_after":"sr_sales_invoice_list"},
-            {"fieldname": "sr_payment_entry_list","label":"Payment Entries","fieldtype":"Table","options":"SR Patient Payment View","read_only":1,"insert_after":"sr_payments_tab"},
+            {"fieldname": "sr_payments_tab","label":"Payments","fieldtype":"Tab Break","hidden":1,"insert_after":"sr_sales_invoice_list"},
+            {"fieldname": "sr_payment_entry_list","label":"Payment Entries","fieldtype":"Table","options":"SR Patient Payment View","read_only":1,"hidden":1,"insert_after":"sr_payments_tab"},
 
             {"fieldname": "sr_pex_tab","label":"PEX","fieldtype":"Tab Break","insert_after":"sr_payment_entry_list"},
             {"fieldname": "sr_pex_launcher_html","label":"PE Launcher","fieldtype":"HTML","read_only":1,"insert_after":"sr_pex_tab"},
@@ -41,15 +51,21 @@ def _make_patient_fields():
 
 def _make_patient_status_editable():
     """Make Patient Status editable"""
-    upsert_property_setter(DT, "status", "read_only", "0", "Check")
-    upsert_property_setter(DT, "status", "read_only_depends_on", "", "Text")
+    bulk_upsert_property_setters([
+        (DT, "status", "read_only", "0", "Check"),
+        (DT, "status", "read_only_depends_on", "", "Text"),
+    ])
 
 def _apply_patient_ui_customizations():
     """Apply various UI customizations to Patient"""
-    upsert_property_setter(DT, "invite_user", "default", "0", "Check")
-    upsert_property_setter(DT, "status", "in_standard_filter", "1", "Select")
-    upsert_property_setter(DT, "age", "hidden", "1", "Check")
-    upsert_property_setter(DT, "age", "in_list_view", "0", "Check")
-    upsert_property_setter(DT, "age", "in_standard_filter", "0", "Check")
-    upsert_property_setter(DT, "uid", "in_standard_filter", "0", "Check")
-    set_label(DT, "status", "Patient Status")
+    rows = [
+        (DT, "invite_user", "default", "0", "Check"),
+        (DT, "status", "in_standard_filter", "1", "Select"),
+        (DT, "age", "hidden", "1", "Check"),
+        (DT, "age", "in_list_view", "0", "Check"),
+        (DT, "age", "in_standard_filter", "0", "Check"),
+        (DT, "uid", "in_standard_filter", "0", "Check"),
+    ]
+    if frappe.get_meta(DT).get_field("status"):
+        rows.append((DT, "status", "label", "Patient Status", "Data"))
+    bulk_upsert_property_setters(rows)
@@ -1,6 +1,6 @@
 # sriaas_clinic/setup/print_formats.py
 import os, frappe
-from .utils import MODULE_DEF_NAME, upsert_property_setter
+from .utils import MODULE_DEF_NAME, upsert_property_setter, is_dry_run
 
 def _load(relpath: str) -> str:
     app_path = frappe.get_app_path("sriaas_clinic")
@@ -18,20 +18,29 @@ def _upsert_pf(name: str, doctype: str, relpath: str):
         "standard": "No",
         "html": html,
     }
-    if frappe.db.exists("Print Format", name):
+    if is_dry_run():
+        pass  # the format itself is not diffed, only the default setter below
+    elif frappe.db.exists("Print Format", name):
         pf = frappe.get_doc("Print Format", name)
-        pf.update(payload)
-        pf.save(ignore_permissions=True)
+        # saving clears the doctype's cache: only when something changed
+        if any(pf.get(k) != v for k, v in payload.items()):
+            pf.update(payload)
+            pf.save(ignore_permissions=True)
     else:
         pf = frappe.get_doc({"doctype": "Print Format", "name": name, **payload})
         pf.insert(ignore_permissions=True)
 
     # set as default for this doctype
     upsert_property_setter(doctype, None, "default_print_format", name, "Data", module=MODULE_DEF_NAME)
-    frappe.clear_cache(doctype=doctype)
+
+# (print format name, doctype, template path relative to the app)
+FORMATS = (
+    ("Patient Encounter New", "Patient Encounter", "print_formats/patient_encounter_new.html"),
+    ("Sales Invoice New", "Sales Invoice", "print_formats/sales_invoice_new.html"),
+)
+# templates are part of this step's fingerprint (setup/runner.py)
+FINGERPRINT_FILES = tuple(relpath for _name, _doctype, relpath in FORMATS)
 
 def apply():
-    # Patient Encounter
-    _upsert_pf("Patient Encounter New", "Patient Encounter", "print_formats/patient_encounter_new.html")
-    # Sales Invoice
-    _upsert_pf("Sales Invoice New", "Sales Invoice", "print_formats/sales_invoice_new.html")
+    for name, doctype, relpath in FORMATS:
+        _upsert_pf(name, doctype, relpath)
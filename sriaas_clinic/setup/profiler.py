@@ -0,0 +1,83 @@
+# sriaas_clinic/setup/profiler.py
+"""
+Per-step profile of setup_all (runner.py): wall time, SQL statements and cache clears.
+
+- profile_step(name) wraps one step; statements are read from the connection's
+  'Questions' status counter and cache clears from the runner's batch (utils.py), so
+  nothing in frappe is patched
+- save_run() keeps the last HISTORY_SIZE runs in a global (frappe.db.set_global) so
+  migrates can be compared over time: get_history()
+- print_summary() prints the steps slowest first
+"""
+import json
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint, now
+
+from .utils import CACHE_CLEAR_FLAG
+
+HISTORY_KEY = "sr_setup_profile_runs"
+HISTORY_SIZE = 20
+
+def _statements() -> int:
+    """Statements sent on this connection so far (MariaDB), including this one; 0 elsewhere."""
+    if frappe.db.db_type != "mariadb":
+        return 0
+    rows = frappe.db.sql("SHOW SESSION STATUS LIKE 'Questions'")
+    return cint(rows[0][1]) if rows else 0
+
+def _cache_clears() -> int:
+    """Clears requested through utils.clear_doctype_cache in the open batch so far."""
+    batch = frappe.flags.get(CACHE_CLEAR_FLAG)
+    return batch.requested if batch else 0
+
+@contextmanager
+def profile_step(name: str):
+    """Yields the step's row; seconds / queries / cache_clears are filled in on exit."""
+    row = {"step": name, "status": "ran", "seconds": 0.0, "queries": 0, "cache_clears": 0}
+    statements, clears = _statements(), _cache_clears()
+    start = time.perf_counter()
+    try:
+        yield row
+    finally:
+        row["seconds"] = round(time.perf_counter() - start, 2)
+        row["queries"] = max(_statements() - statements - 1, 0)  # minus the closing SHOW STATUS
+        row["cache_clears"] = _cache_clears() - clears
+
+def get_history() -> list[dict]:
+    """Stored runs, oldest first: [{"at", "force", "steps": [row, ...]}]."""
+    raw = frappe.db.get_global(HISTORY_KEY)
+    try:
+        return json.loads(raw) if raw else []
+    except ValueError:
+        return []
+
+def save_run(report: list[dict], force: bool = False):
+    history = get_history()
+    history.append({"at": now(), "force": int(force), "steps": report})
+    frappe.db.set_global(HISTORY_KEY, json.dumps(history[-HISTORY_SIZE:]))
+
+def previous_seconds() -> dict:
+    """{step: seconds} from the most recent stored run in which the step ran."""
+    out = {}
+    for run in get_history():
+        for r in run.get("steps", []):
+            if r.get("status") == "ran":
+                out[r["step"]] = r.get("seconds", 0.0)
+    return out
+
+def print_summary(report: list[dict], previous: dict | None = None):
+    """Slowest step first; `previous` adds the last recorded time for comparison."""
+    ran = [r for r in report if r["status"] == "ran"]
+    print(f"sriaas_clinic setup: {len(ran)} of {len(report)} step(s) ran, "
+          f"{sum(r['seconds'] for r in ran):.2f}s, {sum(r['queries'] for r in ran)} queries")
+    for r in sorted(ran, key=lambda r: r["seconds"], reverse=True):
+        line = f"  {r['step']:<18} {r['seconds']:>7.2f}s {r['queries']:>6} sql {r['cache_clears']:>4} cache clears"
+        if previous and r["step"] in previous:
+            line += f"   (last {previous[r['step']]:.2f}s)"
+        print(line)
+    for r in report:
+        if r["status"] != "ran":
+            print(f"  {r['step']:<18} {r['status']}")
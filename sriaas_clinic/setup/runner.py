@@ -1,5 +1,13 @@
 # sriaas_clinic/setup/runner.py
-from .utils import ensure_module_def, reload_local_json_doctypes
+import hashlib
+import inspect
+import json
+import os
+
+import frappe
+
+from .utils import ensure_module_def, reload_local_json_doctypes, dry_run_counts, batched_cache_clears
+from .profiler import profile_step, save_run, print_summary, previous_seconds
 from . import (
     masters,
     patient, customer,
@@ -7,13 +15,82 @@ from . import (
     item_price,
     sales_invoice, item_package, payment_entry,
     crm_lead,
-    print_formats, ui
+    print_formats, ui,
+    match_keys, indexes
 )
+from . import utils
+
+# Ordered setup steps: (name, module). Each module exposes apply() and may list extra
+# app-relative files its output depends on in FINGERPRINT_FILES (e.g. print format HTML).
+STEPS = [
+    ("masters", masters),                      # Masters (Create DocTypes if missing)
+    ("patient", patient),                      # Patient fields/customizations
+    ("customer", customer),                    # Customer fields/customizations
+    ("encounter", encounter),                  # Patient Encounter customizations
+    ("practitioner", practitioner),            # Healthcare Practitioner customizations
+    ("drug_prescription", drug_prescription),  # Drug Prescription customizations
+    ("item_price", item_price),                # Item Price customizations (Cost Price field)
+    ("sales_invoice", sales_invoice),          # Sales Invoice customizations
+    ("item_package", item_package),            # Item Package customizations
+    ("payment_entry", payment_entry),          # Payment Entry customizations
+    ("crm_lead", crm_lead),                    # CRM Lead custom fields
+    ("print_formats", print_formats),          # Print Formats (Patient Encounter New etc.)
+    ("ui", ui),                                # UI customizations (desk, workspace, tweaks, hide flags, status etc)
+    ("match_keys", match_keys),                # Duplicate-match keys (phone/email) + backfill
+    ("indexes", indexes),                      # Composite indexes for hot queries (after all custom fields exist)
+]
+
+# Stored with frappe.db.set_global: {step name: fingerprint of the last successful run}
+FINGERPRINT_KEY = "sr_setup_fingerprints"
+
+def _read(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+def step_fingerprint(module) -> str:
+    """sha256 over the step's source, the shared setup helpers and its declared files."""
+    h = hashlib.sha256()
+    h.update(_read(inspect.getsourcefile(module)))
+    h.update(_read(inspect.getsourcefile(utils)))
+    app_path = frappe.get_app_path("sriaas_clinic")
+    for rel in getattr(module, "FINGERPRINT_FILES", ()):
+        h.update(rel.encode("utf-8"))
+        h.update(_read(os.path.join(app_path, rel)))
+    return h.hexdigest()
+
+def _stored_fingerprints() -> dict:
+    raw = frappe.db.get_global(FINGERPRINT_KEY)
+    try:
+        return json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+
+def _save_fingerprints(fps: dict):
+    frappe.db.set_global(FINGERPRINT_KEY, json.dumps(fps, sort_keys=True))
+
+def setup_all(force: bool = False, dry_run: bool = False) -> list[dict]:
+    """
+    Run every setup step whose fingerprint changed since its last successful run
+    (all of them with force=True). Returns one report row per step:
+      {"step", "status": "ran" | "skipped" | "pending", "seconds", "queries", "cache_clears"}
+    Each run is profiled (profiler.py) and kept for comparison with earlier runs.
+    dry_run=True writes nothing: pending steps run against the site in diff mode and
+    report how many Custom Fields / Property Setters each would insert or update.
+    Manual full run:
+      bench --site <site> execute sriaas_clinic.setup.runner.setup_all --kwargs "{'force': 1}"
+    """
+    force = bool(int(force or 0))
+    dry_run = bool(int(dry_run or 0))
+
+    if dry_run:
+        return _dry_run(force)
 
-def setup_all():
     # Make sure Module Def exists
     ensure_module_def()
-    
+
     # If you want to specify module/app name manually, use this instead:
     # ensure_module_def("SRIAAS Clinic", "sriaas_clinic")
 
@@ -27,41 +104,51 @@ def setup_all():
         # "sr_delivery_type","sr_order_item","sr_lead_source"
     ])
 
-    # Masters (Create DocTypes if missing)
-    masters.apply()
-
-    # Patient fields/customizations
-    patient.apply()
-
-    # Customer fields/customizations
-    customer.apply()
-
-    # Patient Encounter customizations
-    encounter.apply()
-
-    # Healthcare Practitioner customizations
-    practitioner.apply()
-
-    # Drug Prescription customizations
-    drug_prescription.apply()
-
-    # Item Price customizations (Cost Price field)
-    item_price.apply()
-
-    # Sales Invoice customizations
-    sales_invoice.apply()
-
-    # Item Package customizations
-    item_package.apply()
+    previous = previous_seconds()
+    stored = _stored_fingerprints()
+    report = []
+    # the setup helpers' doctype cache clears run once per doctype, after the last step
+    with batched_cache_clears():
+        for name, module in STEPS:
+            fp = step_fingerprint(module)
+            if not force and stored.get(name) == fp:
+                report.append({"step": name, "status": "skipped", "seconds": 0.0, "queries": 0, "cache_clears": 0})
+                continue
 
-    # Payment Entry customizations
-    payment_entry.apply()
+            with profile_step(name) as row:
+                module.apply()
+            stored[name] = fp
+            _save_fingerprints(stored)  # per step, so a failure later still keeps earlier progress
+            report.append(row)
 
-    # CRM Lead custom fields
-    crm_lead.apply()
+    save_run(report, force)
+    print_summary(report, previous)
+    return report
 
-    # Print Formats (Patient Encounter New etc.)
-    print_formats.apply()
+def _dry_run(force: bool) -> list[dict]:
+    """
+    Steps setup_all would run now, each applied in diff mode (setup/utils.dry_run_counts):
+    custom fields and property setters are compared with the site, nothing is written.
+    Counts are against the current site, so fields a step would create count as missing
+    for later steps too. DocTypes, print formats, indexes and backfills are not diffed.
+    """
+    stored = _stored_fingerprints()
+    report = []
+    frappe.db.savepoint("sr_setup_dry_run")  # belt and braces: nothing here should write
+    try:
+        for name, module in STEPS:
+            if not force and stored.get(name) == step_fingerprint(module):
+                report.append({"step": name, "status": "skipped"})
+                continue
+            with dry_run_counts() as counts:
+                module.apply()
+            report.append({"step": name, "status": "pending", **counts})
+    finally:
+        frappe.db.rollback(save_point="sr_setup_dry_run")
 
-    # UI customizations (desk, workspace, tweaks, hide flags, status etc)
-    ui.apply()
+    pending = [r for r in report if r["status"] == "pending"]
+    print(f"sriaas_clinic setup (dry run): {len(pending)} of {len(report)} step(s) would run")
+    for r in pending:
+        print(f"  {r['step']:<18} custom fields +{r['cf_inserted']} ~{r['cf_updated']}"
+              f"   property setters +{r['ps_inserted']} ~{r['ps_updated']}")
+    return report
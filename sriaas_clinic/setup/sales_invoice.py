@@ -1,6 +1,6 @@
 # sriaas_clinic/setup/sales_invoice.py
 import frappe
-from .utils import create_cf_with_module, upsert_property_setter
+from .utils import create_cf_with_module, bulk_upsert_property_setters
 
 DT = "Sales Invoice"
 RIGHT_COL_CB = "column_break1"
@@ -76,6 +76,8 @@ def _setup_order_tracking_tab():
     Adds a new tab 'Order Tracking' with two columns:
       Left column:  sr_si_shipping_status (Data, RO), sr_si_delivery_date (Datetime, RO)
       Right column: sr_si_courier_partner (Data, RO), sr_si_awb_no (Data, RO)
+    Plus shipping weight rollup (filled on save from Item applied weights):
+      sr_si_total_applied_weight (Float, RO), sr_si_package_count (Int, RO)
     """
 
     create_cf_with_module({
@@ -93,6 +95,12 @@ def _setup_order_tracking_tab():
 
             {"fieldname": "sr_si_courier_partner","label": "Courier Partner","fieldtype": "Data","read_only": 1,"insert_after": "sr_si_order_tracking_cb"},
             {"fieldname": "sr_si_awb_no","label": "AWB No","fieldtype": "Data","read_only": 1,"insert_after": "sr_si_courier_partner"},
+
+            # Shipping weight (for courier booking / exports)
+            {"fieldname": "sr_si_shipping_weight_sb","label": "Shipping Weight","fieldtype": "Section Break","insert_after": "sr_si_awb_no"},
+            {"fieldname": "sr_si_total_applied_weight","label": "Total Applied Weight (kg)","fieldtype": "Float","precision": 3,"read_only": 1,"no_copy": 1,"insert_after": "sr_si_shipping_weight_sb"},
+            {"fieldname": "sr_si_shipping_weight_cb","fieldtype": "Column Break","insert_after": "sr_si_total_applied_weight"},
+            {"fieldname": "sr_si_package_count","label": "Package Count","fieldtype": "Int","read_only": 1,"no_copy": 1,"insert_after": "sr_si_shipping_weight_cb"},
         ]
     })
 
@@ -101,20 +109,25 @@ def _hide_invoice_fields():
     targets = ("customer", "customer_name", "ref_practitioner", "service_unit", "allocate_advances_automatically", "get_advances", "advances", "redeem_loyalty_points")
 
     meta = frappe.get_meta(DT)
+    rows = []
     for f in targets:
         if not meta.get_field(f):
             continue  # skip if field doesn't exist on this site
-        upsert_property_setter(DT, f, "hidden", "1", "Check")
-        upsert_property_setter(DT, f, "print_hide", "1", "Check")
-        upsert_property_setter(DT, f, "in_list_view", "0", "Check")
-        upsert_property_setter(DT, f, "in_standard_filter", "0", "Check")
+        rows += [
+            (DT, f, "hidden", "1", "Check"),
+            (DT, f, "print_hide", "1", "Check"),
+            (DT, f, "in_list_view", "0", "Check"),
+            (DT, f, "in_standard_filter", "0", "Check"),
+        ]
 
     # Tweak list/standard filter visibility
     if meta.get_field("company"):
-        upsert_property_setter(DT, "company", "in_standard_filter", "0", "Check")  # hide from filters
+        rows.append((DT, "company", "in_standard_filter", "0", "Check"))  # hide from filters
     if meta.get_field("contact_mobile"):
-        upsert_property_setter(DT, "contact_mobile", "in_list_view", "1", "Check")  # show in list
-        upsert_property_setter(DT, "contact_mobile", "in_standard_filter", "1", "Check")  # show in filters
+        rows.append((DT, "contact_mobile", "in_list_view", "1", "Check"))  # show in list
+        rows.append((DT, "contact_mobile", "in_standard_filter", "1", "Check"))  # show in filters
+
+    bulk_upsert_property_setters(rows)
 
 def _parent_fields():
     create_cf_with_module({
@@ -0,0 +1,22 @@
+# sriaas_clinic/setup/test_runner.py
+"""setup_all clears each doctype's cache once per run, not once per helper call."""
+from collections import Counter
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from sriaas_clinic.setup.runner import setup_all
+
+
+class TestSetupCacheClears(FrappeTestCase):
+    def test_one_clear_per_doctype(self):
+        setup_all(force=1)  # bring the site up to date first; the counted run changes nothing new
+
+        with patch("frappe.clear_cache", wraps=frappe.clear_cache) as clear_cache:
+            setup_all(force=1)
+
+        calls = [c.kwargs.get("doctype") for c in clear_cache.call_args_list]
+        self.assertNotIn(None, calls, "setup_all must not clear the whole site cache")
+        repeated = {dt: n for dt, n in Counter(calls).items() if n > 1}
+        self.assertEqual(repeated, {})
@@ -1,9 +1,61 @@
 # sriaas_clinic/setup/utils.py
+from contextlib import contextmanager
+
 import frappe
 from frappe.custom.doctype.custom_field.custom_field import create_custom_fields as _ccf
+from frappe.utils import cstr, now
 
 MODULE_DEF_NAME = "SRIAAS Clinic"   # Desk Module Def label
 APP_PY_MODULE   = "sriaas_clinic"   # Python package
+DRY_RUN_FLAG    = "sr_setup_dry_run"  # frappe.flags key holding the dry-run counters
+CACHE_CLEAR_FLAG = "sr_setup_cache_clears"  # frappe.flags key holding the runner's clear batch
+
+@contextmanager
+def dry_run_counts():
+    """While active, the helpers below only diff against the site and count what they
+    would write (custom fields / property setters inserted or updated). Yields the counters."""
+    counts = {"cf_inserted": 0, "cf_updated": 0, "ps_inserted": 0, "ps_updated": 0}
+    frappe.flags[DRY_RUN_FLAG] = counts
+    try:
+        yield counts
+    finally:
+        frappe.flags.pop(DRY_RUN_FLAG, None)
+
+def is_dry_run() -> bool:
+    """Steps guard their other writes (DocTypes, print formats, backfills) with this."""
+    return frappe.flags.get(DRY_RUN_FLAG) is not None
+
+@contextmanager
+def batched_cache_clears():
+    """Opened by runner.setup_all around its steps.
+
+    Doctypes changed through the helpers below are collected (only their cached meta is
+    dropped straight away, so get_meta in later steps sees the change) and
+    frappe.clear_cache(doctype=...) runs once per doctype on exit. A nested block joins
+    the outer one. Yields {"doctypes": set, "requested": number of clears collected}.
+    """
+    batch = frappe.flags.get(CACHE_CLEAR_FLAG)
+    if batch is not None:
+        yield batch
+        return
+    batch = frappe._dict(doctypes=set(), requested=0)
+    frappe.flags[CACHE_CLEAR_FLAG] = batch
+    try:
+        yield batch
+    finally:
+        frappe.flags.pop(CACHE_CLEAR_FLAG, None)
+        for dt in sorted(batch.doctypes):
+            frappe.clear_cache(doctype=dt)
+
+def clear_doctype_cache(doctype: str):
+    """frappe.clear_cache(doctype=...) now, or once at the end of the runner's batch."""
+    batch = frappe.flags.get(CACHE_CLEAR_FLAG)
+    if batch is None:
+        frappe.clear_cache(doctype=doctype)
+        return
+    batch.requested += 1
+    batch.doctypes.add(doctype)
+    frappe.cache().hdel("doctype_meta", doctype)
 
 def ensure_module_def():
     """Make sure the Module Def row exists."""
@@ -36,7 +88,76 @@ def create_cf_with_module(mapping: dict, module: str = MODULE_DEF_NAME):
     for dt, fields in mapping.items():
         for f in fields:
             f.setdefault("module", module)
-    _ccf(mapping, ignore_validate=True)
+    counts = frappe.flags.get(DRY_RUN_FLAG)
+    if counts is not None:
+        inserted, updated = _diff_custom_fields(mapping)
+        counts["cf_inserted"] += inserted
+        counts["cf_updated"] += updated
+        return
+    if frappe.flags.get(CACHE_CLEAR_FLAG) is None:
+        _ccf(mapping, ignore_validate=True)
+        return
+    _create_custom_fields(mapping)
+
+def _doctypes(key) -> tuple:
+    """create_custom_fields mapping keys are a doctype or a tuple of doctypes."""
+    return key if isinstance(key, (list, tuple)) else (key,)
+
+def _existing_custom_fields(dt: str, fields: list[dict]) -> dict:
+    return {
+        cf.fieldname: cf
+        for cf in frappe.get_all(
+            "Custom Field",
+            filters={"dt": dt, "fieldname": ["in", [f["fieldname"] for f in fields]]},
+            fields=["*"],
+        )
+    }
+
+def _cf_changed(cur, f: dict) -> bool:
+    return any(cstr(cur.get(k)) != cstr(v) for k, v in f.items() if k in cur)
+
+def _create_custom_fields(mapping: dict):
+    """create_custom_fields for the runner's batch: unchanged fields are not saved and the
+    doctype's cache clear goes to the batch instead of running once per call."""
+    from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+    frappe.flags.in_create_custom_fields = True  # Custom Field.on_update skips its own clear
+    try:
+        for key, fields in mapping.items():
+            for dt in _doctypes(key):
+                existing = _existing_custom_fields(dt, fields)
+                touched = False
+                for f in fields:
+                    cur = existing.get(f["fieldname"])
+                    if cur is None:
+                        create_custom_field(dt, {**f, "owner": "Administrator"}, ignore_validate=True)
+                    elif _cf_changed(cur, f):
+                        cf = frappe.get_doc("Custom Field", cur.name)
+                        cf.flags.ignore_validate = True
+                        cf.update(f)
+                        cf.save()
+                    else:
+                        continue
+                    touched = True
+                if touched:
+                    frappe.db.updatedb(dt)
+                    clear_doctype_cache(dt)
+    finally:
+        frappe.flags.in_create_custom_fields = False
+
+def _diff_custom_fields(mapping: dict) -> tuple[int, int]:
+    """(missing, changed) Custom Fields of a create_custom_fields mapping, one query per doctype."""
+    inserted = updated = 0
+    for key, fields in mapping.items():
+        for dt in _doctypes(key):
+            existing = _existing_custom_fields(dt, fields)
+            for f in fields:
+                cur = existing.get(f["fieldname"])
+                if cur is None:
+                    inserted += 1
+                elif _cf_changed(cur, f):
+                    updated += 1
+    return inserted, updated
 
 # def upsert_property_setter(doctype, fieldname, prop, value, property_type, module: str = MODULE_DEF_NAME):
 #     """Idempotent PS with module tagging."""
@@ -64,6 +185,11 @@ def upsert_property_setter(doctype, fieldname, prop, value, property_type, modul
     """Idempotent Property Setter with module tagging.
        If fieldname is falsy (None/""), create a DocType-level PS; else DocField-level.
     """
+    if is_dry_run() or frappe.flags.get(CACHE_CLEAR_FLAG) is not None:
+        # counted / cache clear batched like the bulk path
+        bulk_upsert_property_setters([(doctype, fieldname, prop, value, property_type)], module)
+        return
+
     is_dt_level = not fieldname
     ps_name = f"{doctype}-{prop}" if is_dt_level else f"{doctype}-{fieldname}-{prop}"
 
@@ -83,6 +209,143 @@ def upsert_property_setter(doctype, fieldname, prop, value, property_type, modul
     ps.module = module
     ps.save(ignore_permissions=True)
 
+def _ps_name(doctype, fieldname, prop) -> str:
+    return f"{doctype}-{prop}" if not fieldname else f"{doctype}-{fieldname}-{prop}"
+
+def _ps_property_type(prop, is_dt_level) -> str:
+    """Fieldtype of `prop` on DocField / DocType, as Frappe's make_property_setter infers it."""
+    df = frappe.get_meta("DocType" if is_dt_level else "DocField").get_field(prop)
+    return df.fieldtype if df else "Data"
+
+def bulk_upsert_property_setters(rows, module: str = MODULE_DEF_NAME, batch_size: int = 200) -> dict:
+    """Upsert many Property Setters at once.
+
+    rows: (doctype, fieldname, prop, value) or (doctype, fieldname, prop, value, property_type);
+    a falsy fieldname means a DocType-level setter, as in upsert_property_setter.
+    Existing setters are read in one query; only missing or changed ones are written, and
+    each touched doctype's cache is cleared once at the end (or once per setup_all run, see
+    batched_cache_clears). In a setup dry run
+    (dry_run_counts) nothing is written; the counts are only added to the dry-run counters.
+    Returns {"inserted": n, "updated": n, "unchanged": n}.
+    """
+    wanted = {}
+    for row in rows or []:
+        doctype, fieldname, prop, value = row[:4]
+        is_dt_level = not fieldname
+        property_type = row[4] if len(row) > 4 and row[4] else _ps_property_type(prop, is_dt_level)
+        # last declaration wins, like repeated upsert_property_setter calls
+        wanted[_ps_name(doctype, fieldname, prop)] = frappe._dict(
+            doc_type=doctype,
+            doctype_or_field="DocType" if is_dt_level else "DocField",
+            field_name=None if is_dt_level else fieldname,
+            property=prop,
+            value=str(value) if value is not None else None,
+            property_type=property_type,
+        )
+    if not wanted:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    existing = {
+        r.name: r
+        for r in frappe.get_all(
+            "Property Setter",
+            filters={"name": ["in", list(wanted)]},
+            fields=["name", "value", "property_type", "module"],
+        )
+    }
+
+    to_insert, to_update = [], []
+    for name, ps in wanted.items():
+        cur = existing.get(name)
+        if cur is None:
+            to_insert.append((name, ps))
+        elif (cur.value, cur.property_type, cur.module) != (ps.value, ps.property_type, module):
+            to_update.append((name, ps))
+    result = {
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "unchanged": len(wanted) - len(to_insert) - len(to_update),
+    }
+
+    counts = frappe.flags.get(DRY_RUN_FLAG)
+    if counts is not None:
+        counts["ps_inserted"] += result["inserted"]
+        counts["ps_updated"] += result["updated"]
+        return result
+
+    ts, user = now(), frappe.session.user
+    fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus", "idx",
+              "doc_type", "doctype_or_field", "field_name", "property", "value", "property_type", "module"]
+    if to_insert:
+        frappe.db.bulk_insert(
+            "Property Setter",
+            fields,
+            [
+                (name, ts, ts, user, user, 0, 0, ps.doc_type, ps.doctype_or_field, ps.field_name,
+                 ps.property, ps.value, ps.property_type, module)
+                for name, ps in to_insert
+            ],
+            chunk_size=batch_size,
+        )
+
+    for i in range(0, len(to_update), batch_size):
+        batch = to_update[i:i + batch_size]
+        params = {"module": module, "now": ts, "user": user, "names": tuple(n for n, _ps in batch)}
+        value_case, type_case = [], []
+        for j, (name, ps) in enumerate(batch):
+            params[f"n{j}"], params[f"v{j}"], params[f"t{j}"] = name, ps.value, ps.property_type
+            value_case.append(f"WHEN %(n{j})s THEN %(v{j})s")
+            type_case.append(f"WHEN %(n{j})s THEN %(t{j})s")
+        frappe.db.sql(
+            f"""
+            UPDATE `tabProperty Setter`
+            SET value = CASE name {' '.join(value_case)} END,
+                property_type = CASE name {' '.join(type_case)} END,
+                module = %(module)s, modified = %(now)s, modified_by = %(user)s
+            WHERE name IN %(names)s
+            """,
+            params,
+        )
+
+    for doctype in sorted({ps.doc_type for _name, ps in to_insert + to_update}):
+        clear_doctype_cache(doctype)
+
+    return result
+
+def hide_fields(dt: str, fieldnames) -> list[tuple]:
+    """Hide fields everywhere (form, list view, standard filters).
+
+    Custom Fields are flipped in place (one lookup for all of them); for standard fields
+    the Property Setter rows are returned, to be passed to bulk_upsert_property_setters.
+    """
+    custom = {
+        cf.fieldname: cf
+        for cf in frappe.get_all(
+            "Custom Field",
+            filters={"dt": dt, "fieldname": ["in", list(fieldnames)]},
+            fields=["name", "fieldname", "hidden", "in_list_view", "in_standard_filter"],
+        )
+    }
+    counts = frappe.flags.get(DRY_RUN_FLAG)
+    rows, changed = [], False
+    for f in fieldnames:
+        cf = custom.get(f)
+        if cf is None:
+            rows += [
+                (dt, f, "hidden", "1", "Check"),
+                (dt, f, "in_list_view", "0", "Check"),
+                (dt, f, "in_standard_filter", "0", "Check"),
+            ]
+        elif (cf.hidden, cf.in_list_view, cf.in_standard_filter) != (1, 0, 0):
+            if counts is not None:
+                counts["cf_updated"] += 1
+                continue
+            frappe.db.set_value("Custom Field", cf.name, {"hidden": 1, "in_list_view": 0, "in_standard_filter": 0})
+            changed = True
+    if changed:
+        clear_doctype_cache(dt)
+    return rows
+
 def collapse_section(dt: str, fieldname: str, collapse: bool = True):
     if not frappe.get_meta(dt).get_field(fieldname):
         return
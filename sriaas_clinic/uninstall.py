@@ -21,15 +21,104 @@ CUSTOMIZATION_DT_LIST = [
     "Custom DocPerm",
 ]
 
-def _delete_all(dt, filters):
-    names = frappe.get_all(dt, pluck="name", filters=filters)
-    for name in names:
-        try:
-            frappe.delete_doc(dt, name, force=True, ignore_permissions=True, delete_permanently=True)
-        except Exception:
-            # Fallback: mark as deprecated/disabled (rarely needed)
-            if frappe.db.has_column(dt, "disabled"):
-                frappe.db.set_value(dt, name, "disabled", 1)
+# Rows the skipped on_trash hooks would remove along with ours: dt -> (dependent doctype, condition)
+DEPENDENTS = {
+    "Custom Field": ("Property Setter",
+                     "(doc_type, field_name) IN (SELECT dt, fieldname FROM `tabCustom Field` WHERE {where})"),
+    "Server Script": ("Scheduled Job Type",
+                      "server_script IN (SELECT name FROM `tabServer Script` WHERE {where})"),
+}
+
+# Column naming the doctype a customization applies to; its cache is cleared after the delete
+TARGET_DOCTYPE_COLUMN = {
+    "Custom Field": "dt",
+    "Property Setter": "doc_type",
+    "Client Script": "dt",
+    "Server Script": "reference_doctype",
+    "Custom DocPerm": "parent",
+}
+
+def _scope(dt):
+    """(WHERE clause, params) for our rows of `dt`, or None if it has no module/app column."""
+    clauses, params = [], {"module": MODULE, "app": APP}
+    if frappe.db.has_column(dt, "module"):
+        clauses.append("`module` = %(module)s")
+    # Extra heuristics: some rows miss 'module' but do have 'app' (e.g. Custom Field)
+    if frappe.db.has_column(dt, "app"):
+        clauses.append("`app` = %(app)s")
+    if not clauses:
+        return None
+    return "(" + " OR ".join(clauses) + ")", params
+
+def bulk_delete_customizations(dry_run=False) -> dict:
+    """
+    Delete module-scoped customization rows with one DELETE per table, child tables
+    (Workspace Link, Form Tour Step, Report Column, ...) before their parents. No
+    per-document on_trash hooks run, so the rows they would remove (DEPENDENTS) are
+    deleted set-based as well; each customized doctype's cache is cleared once at the end.
+    Returns {doctype: rows}; dry_run=True only counts.
+      bench --site <site> execute sriaas_clinic.uninstall.bulk_delete_customizations --kwargs "{'dry_run': 1}"
+    """
+    dry_run = bool(int(dry_run or 0))
+    counts, touched = {}, set()
+    for dt in CUSTOMIZATION_DT_LIST:
+        if not frappe.db.table_exists(dt):
+            continue
+        scope = _scope(dt)
+        if scope is None:
+            continue  # child doctypes are removed with their parents below
+        where, params = scope
+        parents = f"SELECT name FROM `tab{dt}` WHERE {where}"
+
+        column = TARGET_DOCTYPE_COLUMN.get(dt)
+        if column and frappe.db.has_column(dt, column):
+            touched.update(frappe.db.sql_list(
+                f"SELECT DISTINCT `{column}` FROM `tab{dt}` WHERE {where} AND IFNULL(`{column}`, '') != ''",
+                params,
+            ))
+
+        if dt in DEPENDENTS:
+            dep, condition = DEPENDENTS[dt]
+            if frappe.db.table_exists(dep):
+                dep_where = condition.format(where=where)
+                dep_scope = _scope(dep) if dep in CUSTOMIZATION_DT_LIST else None
+                if dep_scope:
+                    dep_where += f" AND NOT {dep_scope[0]}"  # ours anyway; counted in its own pass
+                n = frappe.db.sql(f"SELECT COUNT(*) FROM `tab{dep}` WHERE {dep_where}", params)[0][0]
+                if n:
+                    counts[dep] = counts.get(dep, 0) + n
+                    if not dry_run:
+                        frappe.db.sql(f"DELETE FROM `tab{dep}` WHERE {dep_where}", params)
+
+        for df in frappe.get_meta(dt).get_table_fields():
+            child = df.options
+            n = frappe.db.sql(
+                f"SELECT COUNT(*) FROM `tab{child}` WHERE parenttype = %(parenttype)s AND parent IN ({parents})",
+                {**params, "parenttype": dt},
+            )[0][0]
+            if n:
+                counts[child] = counts.get(child, 0) + n
+                if not dry_run:
+                    frappe.db.sql(
+                        f"DELETE FROM `tab{child}` WHERE parenttype = %(parenttype)s AND parent IN ({parents})",
+                        {**params, "parenttype": dt},
+                    )
+
+        n = frappe.db.sql(f"SELECT COUNT(*) FROM `tab{dt}` WHERE {where}", params)[0][0]
+        if n:
+            counts[dt] = counts.get(dt, 0) + n
+            if not dry_run:
+                frappe.db.sql(f"DELETE FROM `tab{dt}` WHERE {where}", params)
+
+    print(f"sriaas_clinic uninstall{' (dry run)' if dry_run else ''}: "
+          f"{sum(counts.values())} customization row(s)")
+    for dt, n in counts.items():
+        print(f"  {dt:<22} {n}")
+
+    if not dry_run and counts:
+        for dt in sorted(touched):
+            frappe.clear_cache(doctype=dt)
+    return counts
 
 def _delete_app_doctypes():
     """
@@ -50,18 +139,8 @@ def before_uninstall():
     """
     Do heavy cleanup BEFORE the framework drops app schema.
     """
-    frappe.clear_cache()
-
-    # 1) Remove module-scoped customizations on standard doctypes
-    for dt in CUSTOMIZATION_DT_LIST:
-        _delete_all(dt, {"module": MODULE})
-
-    # Extra heuristics: some rows miss 'module' but do have 'app' or 'owner' references.
-    # Try a second pass where 'module' field doesn't exist / wasn't set.
-    # (We check via WHERE name IN fixtures list could be added, but module-scoping should be enough.)
-    # Example for Custom Field missing module:
-    if "app" in frappe.get_meta("Custom Field").get_valid_columns():
-        _delete_all("Custom Field", {"app": APP})
+    # 1) Remove module-scoped customizations on standard doctypes (set-based, one cache clear per doctype)
+    bulk_delete_customizations()
 
     # 2) Safety net: delete any doctypes that were created inside our module
     _delete_app_doctypes()